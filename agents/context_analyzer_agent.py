@@ -5,31 +5,24 @@ Genera insights sobre cómo clima, hora y ubicación influyen en la selección m
 
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
 from langchain_core.messages import SystemMessage
 from typing import Any, Optional, Dict
 
+from agents.llm import agent_middleware, create_chat_model
+
 load_dotenv()
 
 def create_context_analyzer_agent():
     """
     Crea el agente especializado en análisis de contexto ambiental.
     """
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY no encontrada en las variables de entorno")
-    
     # Allow overriding model/temperature from env. If GEMINI_CONTEXT_MODEL is unset,
     # fallback to GEMINI_MODEL used by the main agent.
     gemini_model = os.getenv("GEMINI_CONTEXT_MODEL", os.getenv("GEMINI_MODEL", "gemini-2.0-flash"))
     temperature = float(os.getenv("GEMINI_CONTEXT_TEMPERATURE", os.getenv("GEMINI_TEMPERATURE", "0.7")))
 
-    model = ChatGoogleGenerativeAI(
-        model=gemini_model,
-        temperature=temperature,
-        google_api_key=api_key,
-    )
+    model = create_chat_model(gemini_model, temperature)
     
     # El agente especializado solo necesita las herramientas de contexto ambiental
     from tools.environmental import get_location_and_weather, get_time_context
@@ -46,7 +39,8 @@ def create_context_analyzer_agent():
     # create_agent no acepta system_message directamente, se pasará en el invoke
     agent = create_agent(
         model=model,
-        tools=tools
+        tools=tools,
+        middleware=agent_middleware(),
     )
     
     # Guardar system_prompt para usarlo en el invoke
@@ -63,9 +57,28 @@ def analyze_context(user_query: str = "", callbacks=None) -> str:
     
     Returns:
         Insights sobre el contexto ambiental y su relación con la música
+
+    CONTEXT_INSIGHTS_MODE elige la estrategia: agent (subagente con herramientas, default),
+    rules (tabla precalculada, sin LLM) u oneshot (una sola llamada al LLM con el entorno inline).
     """
     print(f"🔍 Realizando un analisis mas profundo...")
-    agent = create_context_analyzer_agent()
+    # CONTEXT_INSIGHTS_MODE=rules|oneshot: entorno obtenido en Python, sin subagente (agents.context_insights)
+    from agents.context_insights import _insights_mode, fast_context_insights
+
+    from api.deadline import step_allowed, timed_step
+
+    mode = _insights_mode()
+    if mode == "rules":
+        return fast_context_insights(user_query, mode=mode)
+    if not step_allowed("insights"):
+        # Not enough time left in the request for LLM insights: rules table (no LLM).
+        return fast_context_insights(user_query, mode="rules")
+    with timed_step("insights"):
+        return _llm_insights(user_query, mode, callbacks)
+
+
+def _llm_insights(user_query: str, mode: str, callbacks=None) -> str:
+    from agents.context_insights import fast_context_insights
     
     # Construir el prompt para el agente especializado
     prompt = f"""
@@ -85,6 +98,17 @@ Genera insights específicos sobre cómo el clima, hora del día y ubicación se
         label_token = None
         reset_agent_label = None
 
+    if mode == "oneshot":
+        try:
+            return fast_context_insights(user_query, callbacks, mode=mode)
+        finally:
+            if label_token is not None and reset_agent_label is not None:
+                try:
+                    reset_agent_label(label_token)
+                except Exception:
+                    pass
+
+    agent = create_context_analyzer_agent()
     config = {"configurable": {"thread_id": "context_analysis"}}
     if callbacks is not None:
         config["callbacks"] = callbacks
@@ -0,0 +1,200 @@
+"""
+Insights de contexto sin subagente con herramientas (CONTEXT_INSIGHTS_MODE=rules|oneshot).
+
+The environment (location/weather and time) is fetched directly in Python, then:
+
+- rules:   insights from a precomputed table (weather group x time period) plus an
+           activity modifier inferred from the user query; no LLM call at all
+- oneshot: a single non-agentic LLM call with the environment inlined in the prompt, on
+           one shared model instance per (model, temperature) and under the model's
+           quota scheduler unless LLM_SCHEDULER=0
+
+Both avoid the tool-calling round trips of the `agent` mode (see context_analyzer_agent).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from typing import Any, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+# WMO weather codes (open-meteo) grouped by musical effect; matched on the Spanish
+# descriptions of tools.weather_cache.WEATHER_DESCRIPTIONS (and used by the benchmark mocks).
+_WEATHER_GROUPS = (
+    ("tormenta", ("tormenta",)),
+    ("nieve", ("nieve", "granizo")),
+    ("lluvia", ("lluvia", "llovizna", "chubasco")),
+    ("niebla", ("niebla",)),
+    ("nublado", ("nublado",)),
+    ("despejado", ("despejado", "soleado")),
+)
+
+_RULES: dict[tuple[str, str], str] = {
+    ("despejado", "mañana"): "Cielo despejado a la mañana: energía en subida y ánimo positivo; conviene música luminosa con ritmo medio que active sin saturar.",
+    ("despejado", "tarde"): "Tarde despejada: energía alta y ánimo social; el contexto pide música alegre y con groove para acompañar actividades o encuentros.",
+    ("despejado", "noche"): "Noche despejada: ánimo relajado pero abierto; funcionan sonidos cálidos, chill o pop suave para cerrar el día.",
+    ("nublado", "mañana"): "Mañana nublada: arranque lento y algo apagado; música de ritmo moderado y tono cálido ayuda a activar sin forzar.",
+    ("nublado", "tarde"): "Tarde nublada: ambiente neutro e introspectivo, ideal para concentrarse; van bien el lo-fi, el indie suave o instrumentales.",
+    ("nublado", "noche"): "Noche nublada: clima recogido e íntimo; la música tranquila y envolvente acompaña el bajón natural de energía.",
+    ("lluvia", "mañana"): "Lluvia a la mañana: ánimo calmo y contemplativo; el lo-fi, el jazz suave o el acústico acompañan el ritmo lento del día.",
+    ("lluvia", "tarde"): "Tarde de lluvia: invita a quedarse adentro y a la introspección; música suave y ambiental potencia la concentración y la calma.",
+    ("lluvia", "noche"): "Noche lluviosa: ambiente melancólico y acogedor; encajan baladas, jazz nocturno o ambient para bajar un cambio.",
+    ("tormenta", "mañana"): "Mañana de tormenta: el entorno es intenso e inquieto; música estable y contenida ayuda a enfocar y compensa la tensión.",
+    ("tormenta", "tarde"): "Tarde de tormenta: energía cargada; se puede acompañar con rock o electrónica atmosférica, o contrarrestar con ambient.",
+    ("tormenta", "noche"): "Noche de tormenta: clima dramático e introspectivo; sonidos profundos, cinematográficos o ambient oscuro encajan muy bien.",
+    ("nieve", "mañana"): "Mañana con nieve: quietud y frío; música cálida, acústica o clásica suave acompaña el ritmo pausado.",
+    ("nieve", "tarde"): "Tarde con nieve: ambiente hogareño y tranquilo; folk, acústico o jazz cálido refuerzan la sensación de refugio.",
+    ("nieve", "noche"): "Noche con nieve: silencio y calma profunda; ambient, piano o clásica lenta son ideales para relajarse.",
+    ("niebla", "mañana"): "Mañana con niebla: atmósfera difusa y lenta; música ambiental o downtempo acompaña sin sobreestimular.",
+    ("niebla", "tarde"): "Tarde con niebla: clima misterioso e introspectivo; van bien el dream pop, el post-rock o el ambient.",
+    ("niebla", "noche"): "Noche con niebla: ambiente envolvente y nostálgico; sonidos etéreos y lentos complementan el momento.",
+}
+_DEFAULT_RULE = "Sin datos claros de clima: conviene guiarse por la hora y la actividad, con música versátil de energía media."
+
+_ACTIVITIES = (
+    ("estudio", ("estudi", "concentr", "leer", "examen"), "Para estudiar, priorizá música sin letra o con letra mínima y tempo estable (lo-fi, instrumental)."),
+    ("trabajo", ("trabaj", "program", "oficina"), "Para trabajar, sirve música de foco con energía sostenida y pocas distracciones."),
+    ("ejercicio", ("gimnasio", "entren", "correr", "ejercicio"), "Para entrenar, subí la energía: tempo alto (120-140 BPM) y bajos marcados."),
+    ("relax", ("relaj", "descans", "dormir", "medit"), "Para relajarse, bajá el tempo y elegí texturas suaves y repetitivas."),
+    ("fiesta", ("fiesta", "amigos", "previa", "bailar"), "Para una fiesta, conviene música bailable, conocida y con energía creciente."),
+    ("manejo", ("manej", "ruta", "viaje"), "Para manejar, funciona música con ritmo constante que mantenga la atención sin acelerar de más."),
+    ("cocina", ("cocin", "asado", "asando"), "Para cocinar, acompañá con música alegre y liviana, con groove pero sin demandar atención."),
+)
+
+# Mood labels (normalized, as stored in memory metadata) and the word prefixes that signal them.
+_MOODS = (
+    ("triste", ("triste", "bajon", "bajón", "deprim")),
+    ("ansioso", ("ansios", "nervios")),
+    ("estresado", ("estresad", "estrés", "estres", "agobiad")),
+    ("cansado", ("cansad", "agotad")),
+    ("nostalgico", ("nostalgi",)),
+    ("feliz", ("feliz", "contento", "alegre")),
+    ("relajado", ("relaj", "tranquil")),
+    ("concentrado", ("concentr", "enfocad")),
+    ("energetico", ("energ", "motivad", "manija")),
+)
+
+
+def _insights_mode() -> str:
+    # agent: tool-calling sub-agent (default) | rules: table, no LLM | oneshot: single LLM call
+    return os.getenv("CONTEXT_INSIGHTS_MODE", "agent").strip().lower()
+
+
+def weather_group(description: str) -> Optional[str]:
+    text = (description or "").lower()
+    for group, markers in _WEATHER_GROUPS:
+        if any(m in text for m in markers):
+            return group
+    return None
+
+
+def time_period(hour: int) -> str:
+    if 5 <= hour < 12:
+        return "mañana"
+    if 12 <= hour < 18:
+        return "tarde"
+    return "noche"
+
+
+def activity_of(user_query: str) -> Optional[tuple[str, str]]:
+    text = (user_query or "").lower()
+    for name, markers, advice in _ACTIVITIES:
+        if any(m in text for m in markers):
+            return name, advice
+    return None
+
+
+def mood_of(text: str) -> Optional[str]:
+    words = (text or "").lower().split()
+    for mood, markers in _MOODS:
+        if any(w.startswith(m) for w in words for m in markers):
+            return mood
+    return None
+
+
+def fetch_environment() -> dict[str, Any]:
+    """Location/weather and time straight from the environmental tools (no LLM)."""
+    from tools.environmental import get_location_and_weather, get_time_context
+
+    location_weather = get_location_and_weather()
+    time_context = get_time_context()
+    weather = location_weather.split("Clima:", 1)[1].strip() if "Clima:" in location_weather else ""
+    m = re.search(r"(\d{1,2}):(\d{2})", time_context)
+    return {
+        "location_weather": location_weather,
+        "time_context": time_context,
+        "weather_group": weather_group(weather),
+        "time_period": time_period(int(m.group(1))) if m else None,
+    }
+
+
+def rules_insights(env: dict[str, Any], user_query: str = "") -> str:
+    group, period = env.get("weather_group"), env.get("time_period")
+    parts = [_RULES.get((group, period), _DEFAULT_RULE) if group and period else _DEFAULT_RULE]
+    activity = activity_of(user_query)
+    if activity is not None:
+        parts.append(activity[1])
+    return " ".join(parts)
+
+
+_models_lock = threading.Lock()
+_models: dict[tuple[str, float], Any] = {}
+
+
+def _oneshot_model(model: str, temperature: float) -> Any:
+    """Chat model shared by every oneshot call with the same (model, temperature)."""
+    from agents.llm import create_chat_model
+
+    with _models_lock:
+        chat_model = _models.get((model, temperature))
+        if chat_model is None:
+            chat_model = _models[(model, temperature)] = create_chat_model(model, temperature)
+        return chat_model
+
+
+def _oneshot_insights(env: dict[str, Any], user_query: str, callbacks: Any) -> str:
+    from agents.llm import llm_scheduler_enabled
+
+    gemini_model = os.getenv("GEMINI_CONTEXT_MODEL", os.getenv("GEMINI_MODEL", "gemini-2.0-flash"))
+    temperature = float(os.getenv("GEMINI_CONTEXT_TEMPERATURE", os.getenv("GEMINI_TEMPERATURE", "0.7")))
+    model = _oneshot_model(gemini_model, temperature)
+
+    with open('prompts/system_prompt_context_analyzer.txt', 'r', encoding='utf-8') as f:
+        system_prompt = f.read()
+    prompt = (
+        "Contexto ambiental actual (ya obtenido, no hace falta pedirlo):\n"
+        f"- {env['location_weather']}\n"
+        f"- Tiempo: {env['time_context']}\n"
+        + (f"\nContexto adicional del usuario: {user_query}\n" if user_query else "")
+        + "\nGenera los insights sobre cómo este contexto se relaciona con el estado de ánimo y la música apropiada."
+    )
+    messages = [SystemMessage(content=system_prompt), HumanMessage(content=prompt)]
+    config = {"callbacks": callbacks} if callbacks is not None else {}
+
+    if llm_scheduler_enabled():
+        from agents.llm_scheduler import get_llm_scheduler
+
+        # Same per-model quota as the agents' calls (see agents.llm_scheduler).
+        est_tokens = (len(system_prompt) + len(prompt)) // 4 + 256
+        usage = lambda r: (getattr(r, "usage_metadata", None) or {}).get("total_tokens")  # noqa: E731
+        response = get_llm_scheduler(str(getattr(model, "model", gemini_model))).call(
+            lambda: model.invoke(messages, config), est_tokens, usage
+        )
+    else:
+        response = model.invoke(messages, config)
+    content = getattr(response, "content", response)
+    return content if isinstance(content, str) else str(content)
+
+
+def fast_context_insights(user_query: str = "", callbacks: Any = None, mode: Optional[str] = None) -> str:
+    """Insights in `rules` or `oneshot` mode (environment fetched directly in Python)."""
+    mode = mode or _insights_mode()
+    env = fetch_environment()
+    if mode == "rules":
+        return rules_insights(env, user_query)
+    if mode == "oneshot":
+        return _oneshot_insights(env, user_query, callbacks)
+    raise ValueError(f"CONTEXT_INSIGHTS_MODE inválido: {mode!r} (agent|rules|oneshot)")
@@ -0,0 +1,195 @@
+"""Construcción de los modelos de chat (Gemini o stub local para benchmarks)."""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+load_dotenv()
+
+
+def _llm_provider() -> str:
+    # google: Gemini (default) | stub: offline fake model for load tests/benchmarks
+    return os.getenv("LLM_PROVIDER", "google").strip().lower()
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# Calls per stub model in the last 60s, shared by every instance (simulated provider quota).
+_stub_calls: dict[str, deque] = {}
+_stub_lock = threading.Lock()
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Offline chat model: answers with a fixed recommendation after `latency_ms` (plus up
+    to `latency_jitter_ms`) of simulated network wait plus `cpu_ms` of busy CPU work, and
+    reports approximate token usage so expense accounting keeps working. Never calls
+    tools, except for `tool_plan`: on each user message it calls the listed tools that are
+    bound (required string arguments get the user's text), to simulate a tool-using turn.
+
+    Quota errors can be simulated like Gemini's 429 RESOURCE_EXHAUSTED: beyond
+    `quota_rpm` calls per minute, and/or randomly with probability `error_rate`.
+    """
+
+    model: str = "stub"
+    reply: str = "Te recomiendo la playlist Focus Flow: lo-fi tranquilo para concentrarte."
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    cpu_ms: float = 0.0
+    quota_rpm: int = 0
+    error_rate: float = 0.0
+    tool_plan: tuple[str, ...] = ()
+    bound_tools: dict[str, tuple[str, ...]] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model": self.model}
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "StubChatModel":
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        bound: dict[str, tuple[str, ...]] = {}
+        for tool in tools or []:
+            spec = convert_to_openai_tool(tool)["function"]
+            bound[spec["name"]] = tuple(spec.get("parameters", {}).get("required", []))
+        return self.model_copy(update={"bound_tools": bound})
+
+    def _planned_calls(self, messages: list[BaseMessage]) -> list[dict[str, Any]]:
+        if not self.tool_plan or not messages or not isinstance(messages[-1], HumanMessage):
+            return []
+        text = str(messages[-1].content)
+        return [
+            {"name": name, "args": {arg: text for arg in self.bound_tools[name]}, "id": f"stub_{name}_{i}"}
+            for i, name in enumerate(self.tool_plan)
+            if name in self.bound_tools
+        ]
+
+    def _check_quota(self) -> None:
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED (stub: simulated quota error)")
+        if self.quota_rpm <= 0:
+            return
+        now = time.monotonic()
+        with _stub_lock:
+            calls = _stub_calls.setdefault(self.model, deque())
+            while calls and now - calls[0] > 60.0:
+                calls.popleft()
+            if len(calls) >= self.quota_rpm:
+                raise RuntimeError(f"429 RESOURCE_EXHAUSTED (stub: quota of {self.quota_rpm} requests/min)")
+            calls.append(now)
+
+    def _simulate(self) -> None:
+        if self.cpu_ms > 0:
+            end = time.perf_counter() + self.cpu_ms / 1000.0
+            while time.perf_counter() < end:
+                pass
+        latency_ms = self.latency_ms + (random.uniform(0, self.latency_jitter_ms) if self.latency_jitter_ms > 0 else 0.0)
+        if latency_ms > 0:
+            time.sleep(latency_ms / 1000.0)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._check_quota()
+        self._simulate()
+        input_tokens = sum(_approx_tokens(str(m.content)) for m in messages)
+        tool_calls = self._planned_calls(messages)
+        content = "" if tool_calls else self.reply
+        output_tokens = _approx_tokens(content or str(tool_calls))
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        message = AIMessage(
+            content=content, tool_calls=tool_calls, usage_metadata=usage, response_metadata={"model_name": self.model}
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"usage_metadata": usage})
+
+
+def create_chat_model(model: str, temperature: float) -> BaseChatModel:
+    """Chat model for the agents (LLM_PROVIDER=google|stub)."""
+    if _llm_provider() == "stub":
+        return StubChatModel(
+            model=f"stub:{model}",
+            latency_ms=float(os.getenv("STUB_LLM_LATENCY_MS", "0")),
+            latency_jitter_ms=float(os.getenv("STUB_LLM_LATENCY_JITTER_MS", "0")),
+            cpu_ms=float(os.getenv("STUB_LLM_CPU_MS", "0")),
+            quota_rpm=int(os.getenv("STUB_LLM_QUOTA_RPM", "0")),
+            error_rate=float(os.getenv("STUB_LLM_ERROR_RATE", "0")),
+            tool_plan=tuple(t.strip() for t in os.getenv("STUB_LLM_TOOL_PLAN", "").split(",") if t.strip()),
+        )
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY no encontrada en las variables de entorno")
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        google_api_key=api_key,
+    )
+
+
+class DeadlineMiddleware(AgentMiddleware):
+    """
+    Once the request deadline is down to its reserve (api.deadline), the model gets no
+    tools and is told to answer with what it already has, instead of starting more tool calls.
+    """
+
+    NOTE = (
+        "\n\nQueda poco tiempo para responder: no llames más herramientas y respondé ya "
+        "con la información que tenés (si falta clima o contexto, recomendá igual)."
+    )
+
+    def wrap_model_call(self, request, handler):
+        from api.deadline import get_deadline
+
+        deadline = get_deadline()
+        if deadline is None or not deadline.short or not request.tools:
+            return handler(request)
+        deadline.skip("tools")
+        messages = list(request.messages)
+        # Extend the last system message (some providers reject system messages mid-history).
+        idx = max((i for i, m in enumerate(messages) if isinstance(m, SystemMessage)), default=None)
+        if idx is None:
+            messages.insert(0, SystemMessage(content=self.NOTE.strip()))
+        else:
+            messages[idx] = SystemMessage(content=f"{messages[idx].content}{self.NOTE}")
+        return handler(request.override(messages=messages, tools=[]))
+
+
+def llm_scheduler_enabled() -> bool:
+    return os.getenv("LLM_SCHEDULER", "1").strip().lower() not in ("0", "false", "no")
+
+
+def agent_middleware() -> list[Any]:
+    """
+    Middleware shared by every agent: request deadline (tools dropped when time is short)
+    and quota-aware scheduling of model calls (LLM_SCHEDULER=0 disables).
+    """
+    middleware: list[Any] = [DeadlineMiddleware()]
+    if not llm_scheduler_enabled():
+        return middleware
+    from agents.llm_scheduler import LLMSchedulerMiddleware
+
+    return middleware + [LLMSchedulerMiddleware()]
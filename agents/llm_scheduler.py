@@ -0,0 +1,457 @@
+"""
+Planificador de llamadas al LLM con límites de cuota por modelo.
+
+Every model call of the main agent and the context sub-agent goes through
+LLMSchedulerMiddleware, which:
+
+- waits on per-model token buckets (requests/min and tokens/min) and an optional
+  concurrency cap before calling the provider
+- keeps waiters in a bounded priority queue (interactive chat before batch calls made
+  from the same process) with a deadline; a full queue or an expired deadline raises
+  LLMRateLimited
+- retries quota errors (429 / RESOURCE_EXHAUSTED) with jittered exponential backoff,
+  draining the buckets so other waiters back off too
+
+The queue and the concurrency cap are per process; the quota buckets are not: every
+process on the host started from the same directory (API workers, scripts/run_benchmarks.py,
+main.py --batch) draws from one pair of buckets per model kept in a file-locked state file
+under LLM_SHARED_QUOTA_DIR (SharedQuota), so priority holds across processes: a batch
+caller leaves LLM_BATCH_RESERVE_FRACTION=0.5 of the burst for interactive calls and does
+not start while an interactive caller in any process is waiting for quota.
+
+Config (per-model overrides use the model name upper-cased with non-alphanumerics as `_`,
+e.g. LLM_RPM_GEMINI_2_0_FLASH=15): LLM_RPM, LLM_TPM, LLM_MAX_CONCURRENCY (0 = unlimited),
+LLM_BURST_FRACTION=0.25, LLM_QUEUE_MAX=64, LLM_QUEUE_MAX_WAIT_S=30, LLM_MAX_RETRIES=3,
+LLM_BACKOFF_BASE_S=1, LLM_BACKOFF_MAX_S=20, LLM_SHARED_QUOTA_DIR=.llm_quota (empty = per process),
+LLM_BATCH_RESERVE_FRACTION=0.5.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, quota stays per process.
+    fcntl = None
+
+# Lower value = served first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# Poll interval while waiting on a SharedQuota.
+_SHARED_POLL_S = 0.2
+
+
+class LLMRateLimited(Exception):
+    """The call could not be scheduled within the quota (queue full or deadline exceeded)."""
+
+    def __init__(self, message: str, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = max(1.0, float(retry_after))
+
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+def set_llm_priority(priority: int) -> contextvars.Token:
+    return _priority.set(priority)
+
+
+def reset_llm_priority(token: contextvars.Token) -> None:
+    _priority.reset(token)
+
+
+def get_llm_priority() -> int:
+    return _priority.get()
+
+
+def is_quota_error(e: BaseException) -> bool:
+    msg = str(e)
+    return "RESOURCE_EXHAUSTED" in msg or "429" in msg
+
+
+class TokenBucket:
+    """
+    Token bucket that never exceeds `per_minute` in any rolling 60s window (how provider
+    quotas are enforced): up to `burst_fraction` of the quota can go out at once and
+    the rest refills evenly over the minute.
+    """
+
+    def __init__(self, per_minute: float, burst_fraction: float = 0.25) -> None:
+        self.capacity = max(1.0, float(per_minute) * min(1.0, max(0.0, burst_fraction)))
+        self.rate = max(float(per_minute) - self.capacity, 1.0) / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        need = min(amount, self.capacity)
+        return 0.0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def refund(self, amount: float) -> None:
+        # Negative refunds (call used more tokens than estimated) push the bucket into debt.
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self) -> None:
+        self.tokens = min(self.tokens, 0.0)
+
+
+class SharedQuota:
+    """
+    Request/token buckets of one model shared by every process on the host through a
+    state file under LLM_SHARED_QUOTA_DIR (flock-serialized read-modify-write, wall clock).
+    Same refill rules as TokenBucket; `try_acquire` takes both buckets atomically.
+
+    Priority across processes: an interactive caller that has to wait records its demand
+    (`interactive_until`); until it expires batch callers do not start, and they only take
+    quota while `batch_reserve` of each bucket's burst would remain for interactive calls.
+    """
+
+    # How long a recorded interactive wait keeps batch callers off after its expected start.
+    DEMAND_MARGIN_S = 0.5
+
+    def __init__(self, path: str, rpm: float, tpm: float, burst_fraction: float, batch_reserve: float) -> None:
+        self.path = path
+        self._requests = TokenBucket(rpm, burst_fraction) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm, burst_fraction) if tpm > 0 else None
+        self.batch_reserve = min(1.0, max(0.0, float(batch_reserve)))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _buckets(self, est_tokens: float) -> list[tuple[str, TokenBucket, float]]:
+        out = []
+        if self._requests is not None:
+            out.append(("requests", self._requests, 1.0))
+        if self._tokens is not None:
+            out.append(("tokens", self._tokens, float(est_tokens)))
+        return out
+
+    def _update(self, fn: Callable[[dict[str, Any], float], Any]) -> Any:
+        with open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw.strip() else {}
+                except ValueError:
+                    state = {}
+                now = time.time()
+                elapsed = max(0.0, now - float(state.get("updated", now)))
+                for key, bucket, _ in self._buckets(0):
+                    state[key] = min(bucket.capacity, float(state.get(key, bucket.capacity)) + elapsed * bucket.rate)
+                state["updated"] = now
+                result = fn(state, now)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def try_acquire(self, est_tokens: float, priority: int) -> float:
+        """Take one request and `est_tokens` if available (returns 0.0), else the seconds to wait."""
+        batch = priority >= PRIORITY_BATCH
+
+        def take(state: dict[str, Any], now: float) -> float:
+            wait = 0.0
+            for key, bucket, amount in self._buckets(est_tokens):
+                need = min(amount, bucket.capacity)
+                if batch:
+                    need = min(bucket.capacity, need + self.batch_reserve * bucket.capacity)
+                if state[key] < need:
+                    wait = max(wait, (need - state[key]) / bucket.rate)
+            if batch:
+                wait = max(wait, float(state.get("interactive_until", 0.0)) - now)
+            if wait <= 0:
+                for key, _, amount in self._buckets(est_tokens):
+                    state[key] -= amount
+                return 0.0
+            if not batch:
+                state["interactive_until"] = max(float(state.get("interactive_until", 0.0)), now + wait + self.DEMAND_MARGIN_S)
+            return wait
+
+        return self._update(take)
+
+    def refund(self, est_tokens: float, actual_tokens: float) -> None:
+        if self._tokens is None:
+            return
+        capacity = self._tokens.capacity
+
+        def give(state: dict[str, Any], now: float) -> None:
+            state["tokens"] = min(capacity, state["tokens"] + est_tokens - actual_tokens)
+
+        self._update(give)
+
+    def drain(self) -> None:
+        def empty(state: dict[str, Any], now: float) -> None:
+            for key, _, _ in self._buckets(0):
+                state[key] = min(state[key], 0.0)
+
+        self._update(empty)
+
+
+def _shared_quota(model: str, rpm: float, tpm: float, burst_fraction: float) -> Optional[SharedQuota]:
+    directory = os.getenv("LLM_SHARED_QUOTA_DIR", ".llm_quota").strip()
+    if not directory or fcntl is None or (rpm <= 0 and tpm <= 0):
+        return None
+    path = os.path.join(directory, f"llm_quota_{_model_env_suffix(model)}.json")
+    return SharedQuota(path, rpm, tpm, burst_fraction, _limit("LLM_BATCH_RESERVE_FRACTION", model, 0.5))
+
+
+def _model_env_suffix(model: str) -> str:
+    return re.sub(r"[^A-Z0-9]+", "_", model.upper()).strip("_")
+
+
+def _limit(name: str, model: str, default: float) -> float:
+    raw = os.getenv(f"{name}_{_model_env_suffix(model)}") or os.getenv(name)
+    try:
+        return float(raw) if raw not in (None, "") else default
+    except ValueError:
+        return default
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        model: str,
+        *,
+        rpm: float = 0,
+        tpm: float = 0,
+        burst_fraction: float = 0.25,
+        max_concurrency: int = 0,
+        max_queue: int = 64,
+        max_wait_s: float = 30.0,
+        max_retries: int = 3,
+        backoff_base_s: float = 1.0,
+        backoff_max_s: float = 20.0,
+        shared: Optional[SharedQuota] = None,
+    ) -> None:
+        self.model = model
+        # With a SharedQuota the buckets live in its state file instead of this process.
+        self._shared = shared
+        self._requests = TokenBucket(rpm, burst_fraction) if rpm > 0 and shared is None else None
+        self._tokens = TokenBucket(tpm, burst_fraction) if tpm > 0 and shared is None else None
+        self.max_concurrency = int(max_concurrency)
+        self.max_queue = int(max_queue)
+        self.max_wait_s = float(max_wait_s)
+        self.max_retries = int(max_retries)
+        self.backoff_base_s = float(backoff_base_s)
+        self.backoff_max_s = float(backoff_max_s)
+        self._cond = threading.Condition()
+        self._waiters: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+        self.stats: dict[str, Any] = {
+            "granted": 0,
+            "rejected_queue_full": 0,
+            "deadline_exceeded": 0,
+            "quota_errors": 0,
+            "retries": 0,
+            "wait_s_total": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls, model: str) -> "LLMScheduler":
+        rpm = _limit("LLM_RPM", model, 0)
+        tpm = _limit("LLM_TPM", model, 0)
+        burst_fraction = _limit("LLM_BURST_FRACTION", model, 0.25)
+        return cls(
+            model,
+            rpm=rpm,
+            tpm=tpm,
+            burst_fraction=burst_fraction,
+            max_concurrency=int(_limit("LLM_MAX_CONCURRENCY", model, 0)),
+            max_queue=int(_limit("LLM_QUEUE_MAX", model, 64)),
+            max_wait_s=_limit("LLM_QUEUE_MAX_WAIT_S", model, 30.0),
+            max_retries=int(_limit("LLM_MAX_RETRIES", model, 3)),
+            backoff_base_s=_limit("LLM_BACKOFF_BASE_S", model, 1.0),
+            backoff_max_s=_limit("LLM_BACKOFF_MAX_S", model, 20.0),
+            shared=_shared_quota(model, rpm, tpm, burst_fraction),
+        )
+
+    def _wait_time(self, est_tokens: float, now: float) -> Optional[float]:
+        """Seconds until the call may start; None = wait for a running call to finish."""
+        if self.max_concurrency > 0 and self.in_flight >= self.max_concurrency:
+            return None
+        wait = 0.0
+        if self._requests is not None:
+            wait = max(wait, self._requests.wait_time(1, now))
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.wait_time(est_tokens, now))
+        return wait
+
+    def acquire(self, est_tokens: float, *, priority: int, deadline: float) -> None:
+        started = time.monotonic()
+        with self._cond:
+            if len(self._waiters) >= self.max_queue:
+                self.stats["rejected_queue_full"] += 1
+                raise LLMRateLimited(f"LLM queue full for {self.model}", retry_after=self.max_wait_s / 2)
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(est_tokens, now) if self._waiters[0] == entry else None
+                    if wait is not None and wait <= 0:
+                        if self._shared is None:
+                            break
+                        wait = self._shared.try_acquire(est_tokens, priority)
+                        if wait <= 0:
+                            break
+                    remaining = deadline - now
+                    # Raise now if the buckets will not refill before the deadline (no point sleeping).
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        self.stats["deadline_exceeded"] += 1
+                        raise LLMRateLimited(f"LLM quota wait exceeded for {self.model}", retry_after=wait or 1.0)
+                    timeout = min(remaining, wait) if wait is not None else remaining
+                    if self._shared is not None:
+                        # Other processes change the shared buckets without notifying us.
+                        timeout = min(timeout, _SHARED_POLL_S)
+                    self._cond.wait(timeout=timeout)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+            if self._requests is not None:
+                self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(est_tokens)
+            self.in_flight += 1
+            self.stats["granted"] += 1
+            self.stats["wait_s_total"] += time.monotonic() - started
+
+    def release(self, est_tokens: float, actual_tokens: float) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if self._tokens is not None:
+                self._tokens.refund(est_tokens - actual_tokens)
+            self._cond.notify_all()
+        if self._shared is not None and actual_tokens != est_tokens:
+            self._shared.refund(est_tokens, actual_tokens)
+
+    def on_quota_error(self) -> None:
+        # The provider says we are over quota: nobody should start until buckets refill.
+        with self._cond:
+            self.stats["quota_errors"] += 1
+            for bucket in (self._requests, self._tokens):
+                if bucket is not None:
+                    bucket.drain()
+        if self._shared is not None:
+            self._shared.drain()
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: uniform(0, min(cap, base * 2^attempt)).
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt)))
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "model": self.model,
+                "queued": len(self._waiters),
+                "in_flight": self.in_flight,
+                "shared_quota": self._shared is not None,
+                **self.stats,
+            }
+
+    def call(self, fn: Callable[[], Any], est_tokens: float, usage: Callable[[Any], Optional[int]]) -> Any:
+        """
+        Run `fn` under the quota, retrying quota errors with backoff until the deadline:
+        LLM_QUEUE_MAX_WAIT_S, or the time left in the request (api.deadline) if shorter.
+        """
+        from api.deadline import get_deadline
+
+        max_wait_s = self.max_wait_s
+        request_deadline = get_deadline()
+        if request_deadline is not None:
+            max_wait_s = min(max_wait_s, max(0.0, request_deadline.remaining()))
+        deadline = time.monotonic() + max_wait_s
+        attempt = 0
+        while True:
+            self.acquire(est_tokens, priority=get_llm_priority(), deadline=deadline)
+            actual = est_tokens
+            try:
+                result = fn()
+                actual = usage(result) or est_tokens
+                return result
+            except Exception as e:
+                if not is_quota_error(e):
+                    raise
+                self.on_quota_error()
+                delay = self.backoff(attempt)
+                if attempt >= self.max_retries or time.monotonic() + delay > deadline:
+                    raise
+                attempt += 1
+                with self._cond:
+                    self.stats["retries"] += 1
+            finally:
+                self.release(est_tokens, actual)
+            time.sleep(delay)
+
+
+_schedulers: dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_llm_scheduler(model: str) -> LLMScheduler:
+    """Process-wide scheduler for `model` (shared by every agent using it)."""
+    with _schedulers_lock:
+        sched = _schedulers.get(model)
+        if sched is None:
+            sched = LLMScheduler.from_env(model)
+            _schedulers[model] = sched
+        return sched
+
+
+def scheduler_stats() -> list[dict[str, Any]]:
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return [s.snapshot() for s in schedulers]
+
+
+def _estimate_tokens(request: ModelRequest) -> int:
+    # ~4 chars/token over the prompt plus a typical reply; corrected with real usage afterwards.
+    chars = sum(len(str(getattr(m, "content", ""))) for m in request.messages)
+    if request.system_message is not None:
+        chars += len(str(request.system_message.content))
+    return chars // 4 + int(os.getenv("LLM_EST_OUTPUT_TOKENS", "256"))
+
+
+def _response_tokens(response: Any) -> Optional[int]:
+    messages = getattr(response, "result", None) or []
+    for m in messages:
+        usage = getattr(m, "usage_metadata", None)
+        if isinstance(usage, dict) and usage.get("total_tokens"):
+            return int(usage["total_tokens"])
+    return None
+
+
+def _model_name(model: Any) -> str:
+    return str(getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__)
+
+
+class LLMSchedulerMiddleware(AgentMiddleware):
+    """Routes every model call of an agent through its model's LLMScheduler."""
+
+    def wrap_model_call(self, request: ModelRequest, handler: Callable[[ModelRequest], ModelResponse]) -> ModelResponse:
+        scheduler = get_llm_scheduler(_model_name(request.model))
+        return scheduler.call(lambda: handler(request), _estimate_tokens(request), _response_tokens)
@@ -1,11 +1,13 @@
 """Agente principal de recomendación musical."""
 
 import os
+import sqlite3
+import threading
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
+from langchain.agents.middleware import AgentMiddleware
 from langgraph.checkpoint.memory import InMemorySaver
-from langchain_core.messages import SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 
 from tools import (
     get_location_and_weather,
@@ -20,18 +22,81 @@ from tools import (
     search_musical_knowledge
 )
 from vectorstores import initialize_memory_vectorstore, initialize_knowledge_vectorstore
+from agents.llm import agent_middleware, create_chat_model
 
 load_dotenv()
 
 
-def create_music_agent():
+def _create_checkpointer():
+    """
+    Conversation checkpointer (CHECKPOINTER=memory|sqlite).
+    `sqlite` persists threads in CHECKPOINT_DB so every API worker sees the same history.
+    """
+    kind = os.getenv("CHECKPOINTER", "memory").strip().lower()
+    if kind == "memory":
+        return InMemorySaver()
+    if kind != "sqlite":
+        raise ValueError(f"CHECKPOINTER inválido: {kind!r} (memory|sqlite)")
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError as e:
+        raise RuntimeError("CHECKPOINTER=sqlite requiere el paquete langgraph-checkpoint-sqlite") from e
+
+    path = os.getenv("CHECKPOINT_DB", "./checkpoints.db")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    # WAL: readers in other workers don't block the writer (and vice versa).
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    saver = SqliteSaver(conn)
+    saver.setup()
+    return saver
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """Process-wide checkpointer: every tier's agent reads/writes the same conversation threads."""
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = _create_checkpointer()
+        return _checkpointer
+
+
+# Simple tier (agents.router): follow-ups and quick questions, no environment/RAG/insights tools.
+SIMPLE_TIER_TOOLS = [get_time_context, list_playlists, get_similar_contexts]
+
+
+class RecentTurnsMiddleware(AgentMiddleware):
+    """
+    Model sees only the latest system prompt and the last `max_turns` user turns of the
+    thread (cut at a user message so tool calls stay paired with their results).
+    The checkpointed thread itself is untouched.
+    """
+
+    def __init__(self, max_turns: int) -> None:
+        super().__init__()
+        self.max_turns = max(1, int(max_turns))
+
+    def wrap_model_call(self, request, handler):
+        messages = list(request.messages)
+        system = [m for m in messages if isinstance(m, SystemMessage)][-1:]
+        rest = [m for m in messages if not isinstance(m, SystemMessage)]
+        human_idx = [i for i, m in enumerate(rest) if isinstance(m, HumanMessage)]
+        if len(human_idx) > self.max_turns:
+            rest = rest[human_idx[-self.max_turns]:]
+        return handler(request.override(messages=system + rest))
+
+
+def create_music_agent(tier: str = "complex"):
     """
     Crea el agente principal de recomendación musical.
+    `tier="simple"` usa un modelo más barato (GEMINI_SIMPLE_MODEL), menos herramientas y un prompt corto.
     """
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY no encontrada en las variables de entorno")
-    
     # Inicializar vector stores al crear el agente
     initialize_memory_vectorstore()
     initialize_knowledge_vectorstore()
@@ -40,13 +105,16 @@ def create_music_agent():
     gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
     temperature = float(os.getenv("GEMINI_TEMPERATURE", "0.7"))
 
-    model = ChatGoogleGenerativeAI(
-        model=gemini_model,
-        temperature=temperature,
-        google_api_key=api_key,
-    )
+    if tier == "simple":
+        gemini_model = os.getenv("GEMINI_SIMPLE_MODEL", "gemini-2.0-flash-lite")
+        temperature = float(os.getenv("GEMINI_SIMPLE_TEMPERATURE", str(temperature)))
+        prompt_path = 'prompts/system_prompt_simple.txt'
+    else:
+        prompt_path = 'prompts/system_prompt.txt'
+
+    model = create_chat_model(gemini_model, temperature)
     
-    tools = [
+    tools = SIMPLE_TIER_TOOLS if tier == "simple" else [
         get_location_and_weather,
         get_time_context,
         get_context_insights,
@@ -59,20 +127,28 @@ def create_music_agent():
         search_musical_knowledge
     ]
     
-    checkpointer = InMemorySaver()
+    checkpointer = get_checkpointer()
     
-    with open('prompts/system_prompt.txt', 'r', encoding='utf-8') as f:
+    with open(prompt_path, 'r', encoding='utf-8') as f:
         system_prompt = f.read()
     
     # create_agent no acepta system_message directamente, se pasará en el invoke
+    middleware = agent_middleware()
+    if tier == "simple":
+        # Outermost, so the LLM scheduler already sees the trimmed prompt.
+        middleware.insert(0, RecentTurnsMiddleware(int(os.getenv("SIMPLE_TIER_HISTORY_TURNS", "3"))))
+
     agent = create_agent(
         model=model,
         tools=tools,
-        checkpointer=checkpointer
+        checkpointer=checkpointer,
+        middleware=middleware,
     )
     
     # Guardar system_prompt para usarlo en el invoke
     agent._system_prompt = system_prompt
+    agent._tier = tier
+    agent._model_name = gemini_model
     
     return agent
 
@@ -0,0 +1,159 @@
+"""
+Ruteo de turnos por complejidad (model tiering).
+
+Scores each chat turn with cheap local heuristics (length, intent, whether it needs
+context/RAG/playlist-mutation tools). Only turns that positively look simple go to a
+cheaper model with a reduced toolset: whole-message follow-ups ("otra", "gracias") and
+short memory lookups ("¿cuál fue la última playlist?"). Everything else, including new
+requests without a known keyword ("algo chill", "quiero bailar"), keeps the main model. Per-tier latency/token aggregates feed the `expense` savings estimate.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+TIER_SIMPLE = "simple"
+TIER_COMPLEX = "complex"
+
+_WORD_RE = re.compile(r"[a-záéíóúüñ0-9]+", re.IGNORECASE)
+
+# Whole-message follow-ups that never need the full pipeline.
+_FOLLOWUPS = {
+    "otra", "otra mas", "otra más", "otra opcion", "otra opción", "alguna otra", "dame otra",
+    "gracias", "muchas gracias", "genial", "perfecto", "buenisimo", "buenísimo", "joya", "listo",
+    "ok", "oka", "okay", "dale", "si", "sí", "no", "de una", "me gusta", "no me gusta", "chau", "adios", "adiós",
+}
+# Questions about the conversation/memory: get_similar_contexts is enough.
+_MEMORY_MARKERS = ("ultima playlist", "última playlist", "ultima recomendacion", "última recomendación", "que me recomendaste", "qué me recomendaste")
+# Needs the full toolset (environment, RAG, insights) or playlist mutations.
+# Single words match as word prefixes ("recomend" -> "recomendame"), phrases as substrings.
+_RECOMMEND_MARKERS = ("recomend", "musica", "música", "playlist para", "escuch", "cancion", "canción", "tema", "sorprend")
+_CONTEXT_MARKERS = (
+    "estoy", "voy a", "clima", "lluvia", "llueve", "soleado", "frio", "frío", "calor", "noche", "mañana", "tarde",
+    "estudi", "trabaj", "gimnasio", "entren", "manej", "cocin", "fiesta", "triste", "ansios", "estresad",
+    "cansad", "nostalgi", "feliz", "relaj", "concentr",
+)
+_MUTATION_MARKERS = ("agreg", "crea", "edit", "modific", "cambi", "borr", "elimin", "renombr")
+
+
+@dataclass
+class TurnRoute:
+    tier: str
+    score: int
+    reasons: list[str] = field(default_factory=list)
+
+
+def _tiering_enabled() -> bool:
+    return os.getenv("MODEL_TIERING", "1").strip().lower() not in ("0", "false", "no")
+
+
+def _threshold() -> int:
+    # Memory lookups scoring below this go to the simple tier.
+    return int(os.getenv("MODEL_TIER_THRESHOLD", "2"))
+
+
+def _has(words: list[str], normalized: str, markers: tuple[str, ...]) -> bool:
+    padded = f" {normalized} "
+    return any((f" {m} " in padded) if " " in m else any(w.startswith(m) for w in words) for m in markers)
+
+
+def score_turn(message: str) -> TurnRoute:
+    """
+    Complexity score of a user turn (0 = trivial). Tier = simple for follow-ups and for
+    memory lookups scoring below MODEL_TIER_THRESHOLD; complex otherwise.
+    """
+    text = (message or "").strip().lower()
+    normalized = " ".join(_WORD_RE.findall(text))
+    words = normalized.split()
+
+    if normalized in _FOLLOWUPS:
+        return TurnRoute(TIER_SIMPLE, 0, ["followup"])
+
+    score = 0
+    reasons: list[str] = []
+    if len(words) > 25:
+        score += 3
+        reasons.append("long")
+    elif len(words) > 8:
+        score += 1
+        reasons.append("medium_length")
+    if _has(words, normalized, _MEMORY_MARKERS):
+        reasons.append("memory_lookup")
+    else:
+        if _has(words, normalized, _RECOMMEND_MARKERS):
+            score += 2
+            reasons.append("recommendation")
+        if _has(words, normalized, _CONTEXT_MARKERS):
+            score += 2
+            reasons.append("context")
+    if _has(words, normalized, _MUTATION_MARKERS):
+        score += 3
+        reasons.append("playlist_mutation")
+    if text.count("?") > 1 or (len(words) > 6 and "y" in words):
+        score += 1
+        reasons.append("multi_part")
+
+    # Unknown phrasings default to the full pipeline: a missed simple turn costs tokens,
+    # a missed new request loses weather, RAG, insights and memory.
+    simple = "memory_lookup" in reasons and score < _threshold()
+    tier = TIER_SIMPLE if simple else TIER_COMPLEX
+    return TurnRoute(tier, score, reasons)
+
+
+def route_turn(message: str) -> TurnRoute:
+    if not _tiering_enabled():
+        return TurnRoute(TIER_COMPLEX, -1, ["tiering_disabled"])
+    return score_turn(message)
+
+
+class TierStats:
+    """Process-wide per-tier aggregates (turns, latency, tokens)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tiers: dict[str, dict[str, float]] = {}
+
+    def record(self, tier: str, latency_ms: float, total_tokens: int) -> None:
+        with self._lock:
+            t = self._tiers.setdefault(tier, {"turns": 0, "latency_ms": 0.0, "tokens": 0})
+            t["turns"] += 1
+            t["latency_ms"] += latency_ms
+            t["tokens"] += total_tokens
+
+    def avg_tokens(self, tier: str) -> float:
+        with self._lock:
+            t = self._tiers.get(tier)
+            return (t["tokens"] / t["turns"]) if t and t["turns"] else 0.0
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                tier: {
+                    "turns": int(t["turns"]),
+                    "avg_latency_ms": round(t["latency_ms"] / t["turns"], 1),
+                    "avg_tokens": round(t["tokens"] / t["turns"], 1),
+                }
+                for tier, t in self._tiers.items()
+                if t["turns"]
+            }
+
+
+tier_stats = TierStats()
+
+
+def tier_expense(route: TurnRoute, latency_ms: float, total_tokens: int, stats: TierStats = tier_stats) -> dict[str, Any]:
+    """
+    Record the turn and describe it for `expense`: tier, latency and (for simple turns)
+    tokens saved vs the running average of complex turns.
+    """
+    stats.record(route.tier, latency_ms, total_tokens)
+    out: dict[str, Any] = {"tier": route.tier, "score": route.score, "reasons": route.reasons, "latency_ms": round(latency_ms, 1)}
+    if route.tier == TIER_SIMPLE:
+        baseline = stats.avg_tokens(TIER_COMPLEX)
+        if baseline:
+            out["estimated_tokens_saved"] = max(0, int(round(baseline - total_tokens)))
+    return out
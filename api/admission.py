@@ -0,0 +1,142 @@
+"""
+Control de admisión para `/chat` (load shedding).
+
+At most CHAT_MAX_CONCURRENCY chat turns run at once per process; extra requests wait
+on the event loop (not on a threadpool thread) in a FIFO queue of at most
+CHAT_QUEUE_MAX entries for up to CHAT_QUEUE_MAX_WAIT_S. A full queue or an expired wait
+raises AdmissionRejected, which the route turns into a fast 503 with Retry-After, so
+the provider quota is not spent on requests whose clients have already given up.
+CHAT_MAX_CONCURRENCY=0 disables the limiter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int = 16, max_queue: int = 32, max_wait_s: float = 10.0) -> None:
+        self.max_concurrency = int(max_concurrency)
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait_s = max(0.0, float(max_wait_s))
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # EMA of service time, used for the Retry-After estimate.
+        self._avg_service_s = 1.0
+        self.stats: dict[str, Any] = {
+            "admitted": 0,
+            "queued": 0,
+            "shed_queue_full": 0,
+            "shed_timeout": 0,
+            "client_gone": 0,
+            "max_queue_depth": 0,
+            "queue_wait_s_total": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_concurrency=int(os.getenv("CHAT_MAX_CONCURRENCY", "16")),
+            max_queue=int(os.getenv("CHAT_QUEUE_MAX", "32")),
+            max_wait_s=float(os.getenv("CHAT_QUEUE_MAX_WAIT_S", "10")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def _retry_after(self) -> float:
+        # Time for the current queue to drain at the observed service rate.
+        return self._avg_service_s * (len(self._waiters) + 1) / max(1, self.max_concurrency)
+
+    async def acquire(self) -> None:
+        if not self.enabled:
+            return
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.stats["admitted"] += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.stats["shed_queue_full"] += 1
+            raise AdmissionRejected("queue_full", self._retry_after())
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self.stats["queued"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._waiters))
+        started = time.monotonic()
+        try:
+            # asyncio.wait does not cancel `fut`, so a slot handed over right at the timeout is kept.
+            await asyncio.wait({fut}, timeout=self.max_wait_s)
+        except BaseException:
+            # Client disconnected / task cancelled while queued.
+            self._abandon(fut)
+            raise
+        finally:
+            self.stats["queue_wait_s_total"] += time.monotonic() - started
+        if not fut.done():
+            self._abandon(fut)
+            self.stats["shed_timeout"] += 1
+            raise AdmissionRejected("queue_timeout", self._retry_after())
+        # release() transferred its slot to us (self.active unchanged).
+        self.stats["admitted"] += 1
+
+    def _abandon(self, fut: asyncio.Future) -> None:
+        if fut.done() and not fut.cancelled():
+            # The slot was already handed to us: pass it on.
+            self.release()
+            return
+        fut.cancel()
+        try:
+            self._waiters.remove(fut)
+        except ValueError:
+            pass
+
+    def release(self, service_s: float | None = None) -> None:
+        if not self.enabled:
+            return
+        if service_s is not None:
+            self._avg_service_s = 0.8 * self._avg_service_s + 0.2 * service_s
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_wait_s": self.max_wait_s,
+            "active": self.active,
+            "queue_depth": len(self._waiters),
+            "avg_service_s": round(self._avg_service_s, 3),
+            **{k: (round(v, 3) if isinstance(v, float) else v) for k, v in self.stats.items()},
+        }
+
+
+# Per process (each API worker limits its own turns).
+chat_admission = AdmissionController.from_env()
@@ -1,20 +1,21 @@
 from __future__ import annotations
 
 import os
+import threading
+import time
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from dotenv import load_dotenv
 
-from agents import create_music_agent
 from db.session import init_db
-from vectorstores import initialize_knowledge_vectorstore, initialize_memory_vectorstore
 
 from api.routes.auth import router as auth_router
 from api.routes.chat import router as chat_router
 from api.routes.playlists import router as playlists_router
 from api.routes.health import router as health_router
+from api.routes.usage import router as usage_router
 from api import state
 
 
@@ -36,18 +37,73 @@ app.include_router(health_router)
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(chat_router, tags=["chat"])
 app.include_router(playlists_router, tags=["playlists"])
+app.include_router(usage_router, tags=["usage"])
+
+
+def _timed(name: str, fn) -> None:
+    t0 = time.perf_counter()
+    fn()
+    state.warmup_timings[name] = round(time.perf_counter() - t0, 3)
+
+
+def _warmup() -> None:
+    """
+    Heavy initialization, off the event loop so the server listens immediately.
+    Heavy modules (LangChain agents, Chroma, ONNX runtime) are imported here, not at app import.
+    """
+    try:
+        from config.embeddings import EMBEDDING_MODEL
+        from vectorstores import initialize_knowledge_vectorstore, initialize_memory_vectorstore
+        from vectorstores.knowledge_cache import start_history_saver, warm_knowledge_cache
+        from vectorstores.retention import start_compaction_worker
+
+        # Embedding model (first embed also builds the ONNX session)
+        _timed("embeddings", lambda: EMBEDDING_MODEL.embed_query("warmup"))
+
+        # Vectorstores (ensure directories exist / load if present)
+        _timed("memory_vectorstore", initialize_memory_vectorstore)
+        _timed("knowledge_vectorstore", initialize_knowledge_vectorstore)
+        # Most frequent historical knowledge queries, pre-computed (vectorstores.knowledge_cache)
+        _timed("knowledge_cache", warm_knowledge_cache)
+
+        # Agent (heavy init once)
+        def _agent() -> None:
+            from agents import create_music_agent
+            from agents.router import _tiering_enabled
+
+            state.agent = create_music_agent()
+            if _tiering_enabled():
+                state.simple_agent = create_music_agent(tier="simple")
+
+        _timed("agent", _agent)
+
+        # Periodic memory retention/dedup (MEMORY_COMPACTION_INTERVAL_S, 0 disables)
+        start_compaction_worker()
+        start_history_saver()
+        state.ready.set()
+        print(f"✅ API lista ({state.warmup_timings})")
+    except Exception as e:
+        state.startup_error = str(e)
+        print(f"❌ Error en warmup: {str(e)}")
 
 
 @app.on_event("startup")
 def _startup() -> None:
-    # DB tables
+    # DB tables (cheap, needed by auth/playlists right away)
     init_db()
 
-    # Vectorstores (ensure directories exist / load if present)
-    initialize_memory_vectorstore()
-    initialize_knowledge_vectorstore()
+    threading.Thread(target=_warmup, name="warmup", daemon=True).start()
+
 
-    # Agent (heavy init once)
-    state.agent = create_music_agent()
+@app.on_event("shutdown")
+def _shutdown() -> None:
+    # Write usage records still queued in the ledger (see api.usage_ledger).
+    from api.usage_ledger import get_usage_ledger
 
+    get_usage_ledger().stop()
+    if state.ready.is_set():
+        from vectorstores.knowledge_cache import stop_history_saver
+        from vectorstores.retention import stop_compaction_worker
 
+        stop_compaction_worker()
+        stop_history_saver()
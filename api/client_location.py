@@ -0,0 +1,50 @@
+"""
+Request-scoped location of the client (coordinates or IP) for the weather tools.
+
+Without one, get_location_and_weather geolocates the server's own IP.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import ipaddress
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class ClientLocation:
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    ip: Optional[str] = None
+    label: Optional[str] = None  # e.g. "Buenos Aires, Argentina" (coordinates have no city name)
+
+    @property
+    def has_coordinates(self) -> bool:
+        return self.latitude is not None and self.longitude is not None
+
+
+_client_location: contextvars.ContextVar[Optional[ClientLocation]] = contextvars.ContextVar(
+    "client_location", default=None
+)
+
+
+def set_client_location(location: Optional[ClientLocation]) -> contextvars.Token:
+    return _client_location.set(location)
+
+
+def reset_client_location(token: contextvars.Token) -> None:
+    _client_location.reset(token)
+
+
+def get_client_location() -> Optional[ClientLocation]:
+    return _client_location.get()
+
+
+def public_ip(value: Optional[str]) -> Optional[str]:
+    """`value` if it is a globally routable IP (private/loopback addresses geolocate nothing useful)."""
+    try:
+        addr = ipaddress.ip_address((value or "").strip())
+    except ValueError:
+        return None
+    return str(addr) if addr.is_global else None
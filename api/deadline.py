@@ -0,0 +1,130 @@
+"""
+Presupuesto de tiempo por request (deadline) y degradación de pasos opcionales.
+
+Every /chat turn carries a Deadline (CHAT_DEADLINE_S=25 from arrival, 0 = disabled) in a
+contextvar. Optional steps (weather, context insights, knowledge search) ask
+`step_allowed(step)` first: a step runs only if the remaining time still covers its
+expected cost (EMA of its past durations in this process) plus DEADLINE_RESERVE_S=5,
+the time kept for the final answer. Skipped steps are recorded on the deadline (reported
+in the /chat `expense`) and counted per process (/health/load). Once the remaining time
+is below the reserve, the agents' model calls get no tools and are told to answer with
+what they already have (agents.llm.DeadlineMiddleware). Outside a request nothing is skipped.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+# Initial cost estimates (seconds) until a step has been observed in this process.
+_DEFAULT_STEP_COST_S = {"weather": 1.0, "insights": 3.0, "knowledge": 0.5}
+_EMA_ALPHA = 0.2
+
+_costs_lock = threading.Lock()
+_step_cost_s: dict[str, float] = dict(_DEFAULT_STEP_COST_S)
+_skipped_total: dict[str, int] = {}
+
+
+class Deadline:
+    def __init__(self, budget_s: float, reserve_s: float = 5.0) -> None:
+        self.budget_s = float(budget_s)
+        self.reserve_s = max(0.0, float(reserve_s))
+        self.started = time.monotonic()
+        self.expires_at = self.started + self.budget_s
+        self.skipped: list[str] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["Deadline"]:
+        budget_s = float(os.getenv("CHAT_DEADLINE_S", "25"))
+        if budget_s <= 0:
+            return None
+        return cls(budget_s, float(os.getenv("DEADLINE_RESERVE_S", "5")))
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    @property
+    def short(self) -> bool:
+        """Only the reserve for the final answer is left."""
+        return self.remaining() <= self.reserve_s
+
+    def skip(self, step: str) -> None:
+        with self._lock:
+            if step in self.skipped:
+                return
+            self.skipped.append(step)
+        with _costs_lock:
+            _skipped_total[step] = _skipped_total.get(step, 0) + 1
+
+    def allows(self, step: str) -> bool:
+        """True if `step` fits before the reserve; otherwise it is recorded as skipped."""
+        with _costs_lock:
+            cost = _step_cost_s.get(step, 1.0)
+        if self.remaining() - self.reserve_s >= cost:
+            return True
+        self.skip(step)
+        return False
+
+    def report(self) -> dict[str, Any]:
+        with self._lock:
+            skipped = list(self.skipped)
+        return {
+            "budget_s": self.budget_s,
+            "elapsed_s": round(time.monotonic() - self.started, 3),
+            "remaining_s": round(self.remaining(), 3),
+            "skipped": skipped,
+        }
+
+
+_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+def set_deadline(deadline: Optional[Deadline]) -> contextvars.Token:
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _deadline.reset(token)
+
+
+def get_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def step_allowed(step: str) -> bool:
+    deadline = get_deadline()
+    return True if deadline is None else deadline.allows(step)
+
+
+def http_timeout(default_s: float) -> float:
+    """Timeout for an upstream call: `default_s`, capped to the time left before the reserve."""
+    deadline = get_deadline()
+    if deadline is None:
+        return default_s
+    return max(0.5, min(default_s, deadline.remaining() - deadline.reserve_s))
+
+
+@contextmanager
+def timed_step(step: str) -> Iterator[None]:
+    """Measure an optional step to keep its expected cost (EMA) current."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with _costs_lock:
+            prev = _step_cost_s.get(step)
+            _step_cost_s[step] = elapsed if prev is None else (1 - _EMA_ALPHA) * prev + _EMA_ALPHA * elapsed
+
+
+def deadline_stats() -> dict[str, Any]:
+    with _costs_lock:
+        return {
+            "step_cost_s": {k: round(v, 3) for k, v in _step_cost_s.items()},
+            "skipped_total": dict(_skipped_total),
+        }
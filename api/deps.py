@@ -9,14 +9,18 @@ from sqlalchemy.orm import Session
 from auth.jwt import decode_access_token
 from db.models import User
 from db.session import SessionLocal
+from db.unit_of_work import UnitOfWork
 
 
 def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+    # One session per request, shared with the tools of a /chat turn (see db.unit_of_work).
+    uow = UnitOfWork(SessionLocal())
     try:
-        yield db
-    finally:
-        db.close()
+        yield uow.session
+    except BaseException:
+        uow.close(error=True)
+        raise
+    uow.close()
 
 
 _bearer = HTTPBearer(auto_error=False)
@@ -37,6 +41,11 @@ def get_current_user(
     user = db.get(User, int(user_id))
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+    # Give the pooled connection back before the route runs: /chat may then wait in the
+    # admission queue, and a queued request must not hold a connection. The user stays
+    # readable (detached, attributes loaded).
+    db.expunge(user)
+    db.rollback()
     return user
 
 
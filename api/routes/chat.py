@@ -1,26 +1,49 @@
 from __future__ import annotations
 
 import re
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, Field
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, IPvAnyAddress, model_validator
 from langchain_core.messages import SystemMessage, HumanMessage
+from sqlalchemy.orm import Session
 from typing import Any, Optional
 
-from api.deps import get_current_user
+from api.deps import get_current_user, get_db
 from api.user_context import set_current_user_id, reset_current_user_id
+from api.client_location import ClientLocation, public_ip, reset_client_location, set_client_location
+from api.deadline import Deadline, get_deadline, reset_deadline, set_deadline
 from api import state
 from db.models import User
-from tools.memory import get_similar_contexts, save_context
-from tools.playlists import list_playlists
+from db.session import SessionLocal
+from db.unit_of_work import UnitOfWork, reset_unit_of_work, set_unit_of_work
 from api.callback_context import set_callbacks, reset_callbacks, set_agent_label, reset_agent_label
 from api.llm_usage_callback import LLMUsageCallbackHandler
+from api.admission import AdmissionRejected, chat_admission
+from api.tool_memo import ToolMemo, set_tool_memo, reset_tool_memo
+from api.usage_ledger import record_usage
 
 
 router = APIRouter()
 
 
+class ChatLocation(BaseModel):
+    # Browser geolocation (both coordinates) or the client's public IP.
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+    ip: Optional[IPvAnyAddress] = None
+    label: Optional[str] = Field(default=None, max_length=120)
+
+    @model_validator(mode="after")
+    def _coordinates_together(self) -> "ChatLocation":
+        if (self.latitude is None) != (self.longitude is None):
+            raise ValueError("latitude y longitude van juntas")
+        return self
+
+
 class ChatRequest(BaseModel):
     message: str = Field(min_length=1, max_length=4000)
+    location: Optional[ChatLocation] = None
 
 
 class ChatResponse(BaseModel):
@@ -227,6 +250,38 @@ def _content_to_text(content: Any) -> str:
     return str(content)
 
 
+def _summary_fields(user_id: int, message: str, reply: str, memo: ToolMemo) -> dict[str, str]:
+    """
+    Typed fields for the turn's memory summary: mood from the user's message, weather
+    only if a tool already fetched it this request (no extra network call), time period
+    and the first of the user's playlists named in the reply.
+    """
+    from agents.context_insights import mood_of
+    from db.repositories.playlists import list_playlists_for_user
+    from db.unit_of_work import request_session
+    from tools.environmental import get_time_context
+
+    weather = ""
+    location_weather = memo.peek("get_location_and_weather", ((), ()))
+    if isinstance(location_weather, str) and "Clima:" in location_weather:
+        weather = location_weather.split("Clima:", 1)[1].strip()
+
+    playlist = ""
+    reply_l = reply.lower()
+    with request_session() as db:
+        for p in list_playlists_for_user(db, user_id=user_id):
+            if p.name.lower() in reply_l:
+                playlist = p.name
+                break
+
+    return {
+        "mood": mood_of(message) or "",
+        "weather": weather,
+        "time_period": get_time_context(),
+        "playlist_recommended": playlist,
+    }
+
+
 HELP_TEXT = (
     "Comandos disponibles:\n"
     "- help: muestra esta ayuda\n"
@@ -241,19 +296,87 @@ HELP_TEXT = (
 )
 
 
+def _is_fast_path(cmd: str) -> bool:
+    """Cheap commands answered without a model call (they bypass admission control)."""
+    return cmd.lower() in ("help", "playlists", "memory", "memoria") or _is_pure_greeting(cmd)
+
+
 @router.post("/chat", response_model=ChatResponse)
-def chat(
+async def chat(
     payload: ChatRequest,
+    request: Request,
     user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     if state.agent is None:
-        raise HTTPException(status_code=503, detail="Agent not initialized")
+        # Still warming up (see /health/ready).
+        raise HTTPException(status_code=503, detail="Agent not initialized", headers={"Retry-After": "5"})
+
+    location = _client_location(payload, request)
+    if _is_fast_path(payload.message.strip()):
+        return await run_in_threadpool(_chat_turn, payload, user, location, db=db)
+
+    # Started on arrival: time spent queued for admission counts against the budget.
+    deadline = Deadline.from_env()
+
+    # Model turns are admitted at most CHAT_MAX_CONCURRENCY at a time; the rest wait here,
+    # on the event loop, or are shed with a fast 503 (see api.admission).
+    try:
+        async with chat_admission.slot():
+            if await request.is_disconnected():
+                # Gave up while queued: don't spend provider quota on it.
+                chat_admission.stats["client_gone"] += 1
+                raise HTTPException(status_code=503, detail="Client disconnected")
+            return await run_in_threadpool(_chat_turn, payload, user, location, deadline, db)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail="El servidor está saturado en este momento. Probá de nuevo en unos segundos.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _client_location(payload: ChatRequest, request: Request) -> Optional[ClientLocation]:
+    """Location sent in the body; else the caller's public IP (first X-Forwarded-For hop behind a proxy)."""
+    loc = payload.location
+    if loc is not None and loc.latitude is not None:
+        return ClientLocation(latitude=loc.latitude, longitude=loc.longitude, label=loc.label)
+    if loc is not None and loc.ip is not None:
+        ip = public_ip(str(loc.ip))
+        if ip:
+            return ClientLocation(ip=ip, label=loc.label)
+    forwarded = request.headers.get("x-forwarded-for", "").split(",")[0]
+    ip = public_ip(forwarded) or public_ip(request.client.host if request.client else None)
+    return ClientLocation(ip=ip) if ip else None
+
+
+def _chat_turn(
+    payload: ChatRequest,
+    user: User,
+    location: Optional[ClientLocation] = None,
+    deadline: Optional[Deadline] = None,
+    db: Optional[Session] = None,
+) -> ChatResponse:
+    # Imported here so `api.app` stays light; the warmup thread has already loaded them.
+    from tools.memory import get_similar_contexts, save_context
+    from tools.playlists import format_playlists
 
     # Set request-scoped user id so tools (playlists/memory) can behave per-user.
-    token = set_current_user_id(user.id)
+    # Read once: commits by the tools expire the (shared-session) User instance.
+    user_id = user.id
+    token = set_current_user_id(user_id)
+    # Tools and bookkeeping reuse the request's DB session (see db.unit_of_work).
+    uow = UnitOfWork.of(db) if db is not None else UnitOfWork(SessionLocal())
+    uow_token = set_unit_of_work(uow)
+    location_token = set_client_location(location)
+    # Tools skip optional work (weather, insights, knowledge search) when time runs short (see api.deadline).
+    deadline_token = set_deadline(deadline or Deadline.from_env())
     cb = LLMUsageCallbackHandler()
     cb_token = set_callbacks([cb])
     label_token = set_agent_label("main_agent")
+    # Identical read-only tool calls within this request are served once (see api.tool_memo).
+    memo = ToolMemo()
+    memo_token = set_tool_memo(memo)
     try:
         cmd = payload.message.strip()
         cmd_l = cmd.lower()
@@ -262,7 +385,8 @@ def chat(
         if cmd_l == "help":
             return ChatResponse(reply=HELP_TEXT, expense=None)
         if cmd_l == "playlists":
-            return ChatResponse(reply=list_playlists(), expense=None)
+            # The whole catalog: the top-K preselection is only for the model's prompt.
+            return ChatResponse(reply=format_playlists(user_id), expense=None)
         if cmd_l in ("memory", "memoria"):
             return ChatResponse(reply=get_similar_contexts("", top_k=10), expense=None)
         if _is_pure_greeting(cmd):
@@ -271,20 +395,40 @@ def chat(
                 expense=None,
             )
 
-        # Retrieve compact per-user memory (Chroma) and inject it into the prompt.
-        memory = get_similar_contexts(payload.message, top_k=3)
-
-        messages = [
-            SystemMessage(content=state.agent._system_prompt),
-            SystemMessage(content=f"Memoria relevante del usuario (si existe):\n{memory}"),
-            HumanMessage(content=payload.message),
-        ]
+        # Simple turns ("otra", "gracias", ...) go to the cheaper tier (see agents.router).
+        from agents.router import TIER_COMPLEX, TIER_SIMPLE, route_turn, tier_expense
+
+        route = route_turn(cmd)
+        if route.tier == TIER_SIMPLE and state.simple_agent is not None:
+            agent = state.simple_agent
+        else:
+            agent = state.agent
+            route.tier = TIER_COMPLEX
+
+        messages = [SystemMessage(content=agent._system_prompt)]
+        if agent is state.agent:
+            # Retrieve compact per-user memory (Chroma) and inject it into the prompt.
+            # The simple tier skips it: it can call get_similar_contexts if the turn needs it.
+            memory = get_similar_contexts(payload.message, top_k=3)
+            messages.append(SystemMessage(content=f"Memoria relevante del usuario (si existe):\n{memory}"))
+        messages.append(HumanMessage(content=payload.message))
+
+        started = time.perf_counter()
         try:
-            response = state.agent.invoke(
+            response = agent.invoke(
                 {"messages": messages},
-                {"configurable": {"thread_id": f"user:{user.id}"}, "callbacks": [cb]},
+                {"configurable": {"thread_id": f"user:{user_id}"}, "callbacks": [cb]},
             )
         except Exception as e:
+            from agents.llm_scheduler import LLMRateLimited
+
+            # Our own scheduler could not fit the call in the quota: tell the client when to retry.
+            if isinstance(e, LLMRateLimited):
+                raise HTTPException(
+                    status_code=429,
+                    detail="Demasiadas solicitudes al modelo en este momento. Probá de nuevo en unos segundos.",
+                    headers={"Retry-After": str(int(e.retry_after))},
+                )
             # Gemini quota/rate-limit errors should surface as a clean 429 to the client UI.
             msg = str(e)
             if "RESOURCE_EXHAUSTED" in msg or "429" in msg:
@@ -297,23 +441,46 @@ def chat(
                 )
             raise
 
+        latency_ms = (time.perf_counter() - started) * 1000.0
         last = response["messages"][-1]
         reply = _content_to_text(getattr(last, "content", last))
 
         # Persist a compact memory summary for future retrieval (Chroma).
         # Keep it short to minimize embedding/storage cost.
-        summary = f"Usuario: {payload.message.strip()}\nAsistente: {reply.strip()}"
-        if len(summary) > 900:
-            summary = summary[:900]
-        save_context(summary)
+        # Simple-tier turns (thanks, "otra", memory questions) add no new context: not saved.
+        if agent is state.agent:
+            summary = f"Usuario: {payload.message.strip()}\nAsistente: {reply.strip()}"
+            if len(summary) > 900:
+                summary = summary[:900]
+            save_context(summary, **_summary_fields(user_id, payload.message, reply, memo))
 
         breakdown = _group_usage_breakdown(cb.entries)
         total = cb.totals()
-        expense = {"total": total, "breakdown": breakdown}
+        # Persisted asynchronously (batched writer) for /usage.
+        record_usage(user_id, cb.entries)
+        expense = {
+            "total": total,
+            "breakdown": breakdown,
+            "tool_calls": memo.stats(),
+            "tier": {
+                "model": getattr(agent, "_model_name", None),
+                **tier_expense(route, latency_ms, total.get("total_tokens", 0)),
+            },
+        }
+        current_deadline = get_deadline()
+        if current_deadline is not None:
+            expense["deadline"] = current_deadline.report()
+        expense["db"] = uow.stats()
         return ChatResponse(reply=reply, expense=expense)
     finally:
+        reset_tool_memo(memo_token)
         reset_agent_label(label_token)
         reset_callbacks(cb_token)
+        reset_deadline(deadline_token)
+        reset_client_location(location_token)
+        reset_unit_of_work(uow_token)
+        if db is None:
+            uow.close()
         reset_current_user_id(token)
 
 
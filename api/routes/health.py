@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from api import state
 
 
 router = APIRouter()
@@ -8,6 +11,47 @@ router = APIRouter()
 
 @router.get("/health", tags=["ops"])
 def health():
+    # Liveness (kept at /health for existing probes).
+    return {"ok": True}
+
+
+@router.get("/health/live", tags=["ops"])
+def live():
     return {"ok": True}
 
 
+@router.get("/health/ready", tags=["ops"])
+def ready():
+    body = {"ready": state.ready.is_set(), "warmup": dict(state.warmup_timings)}
+    if state.startup_error:
+        body["error"] = state.startup_error
+    if not body["ready"]:
+        return JSONResponse(status_code=503, content=body, headers={"Retry-After": "5"})
+    return body
+
+
+@router.get("/health/load", tags=["ops"])
+def load():
+    # Load counters of this worker: /chat admission queue, weather/geolocation cache, request
+    # deadline (step costs, skipped steps), DB connections per request, playlist index writer,
+    # LLM quota schedulers, knowledge result cache.
+    from api.admission import chat_admission
+    from api.deadline import deadline_stats
+    from db.unit_of_work import db_stats
+    from tools.weather_cache import cache_stats
+    from vectorstores.playlist_index import playlist_index_stats
+
+    body = {
+        "chat_admission": chat_admission.snapshot(),
+        "weather_cache": cache_stats(),
+        "deadline": deadline_stats(),
+        "db": db_stats(),
+        "playlist_index": playlist_index_stats(),
+    }
+    if state.ready.is_set():
+        from agents.llm_scheduler import scheduler_stats
+        from vectorstores.knowledge_cache import knowledge_cache
+
+        body["llm_schedulers"] = scheduler_stats()
+        body["knowledge_cache"] = knowledge_cache.stats()
+    return body
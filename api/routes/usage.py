@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from api.deps import get_current_user, get_db
+from db.models import User
+from db.repositories.usage import get_usage_for_user
+
+
+router = APIRouter()
+
+
+@router.get("/usage")
+def usage(
+    days: int = Query(default=30, ge=0, le=366),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    # Reads the pre-aggregated rollups only; the last USAGE_FLUSH_INTERVAL_MS of chat may not be written yet.
+    return {"user_id": user.id, **get_usage_for_user(db, user_id=user.id, days=days)}
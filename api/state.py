@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import threading
 from typing import Optional, Any
 
 
-# Global app state (single-process). Railway should run 1 instance for SQLite+Volume.
+# Per-process state. With several workers (gunicorn.conf.py) each builds its own agent;
+# conversations, users/playlists and vector stores live in shared storage
+# (CHECKPOINTER=sqlite, SQLite WAL, CHROMA_SERVER_HOST).
 agent: Optional[Any] = None
+# Cheaper model + reduced toolset for simple turns (agents.router); None when MODEL_TIERING=0.
+simple_agent: Optional[Any] = None
 
-
+# Readiness: set by the background warmup once the embedding model, vectorstores and agent are built.
+ready = threading.Event()
+startup_error: Optional[str] = None
+# Seconds spent in each warmup phase (reported by /health/ready).
+warmup_timings: dict[str, float] = {}
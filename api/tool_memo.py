@@ -0,0 +1,124 @@
+"""
+Request-scoped memoization of read-only tool results.
+
+`/chat` and the agent (plus the context sub-agent) often run the same read-only tool
+more than once per turn. A ToolMemo set for the request serves repeated identical calls
+from the first result; mutating tools invalidate the entries they affect. Outside a
+request (CLI, scripts) no memo is set and tools run normally.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+
+
+class ToolMemo:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._results: dict[tuple[str, Hashable], Future] = {}
+        self.calls: dict[str, int] = {}
+        self.deduplicated: dict[str, int] = {}
+
+    def call(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run `fn` once per (name, key); concurrent identical calls wait for the first one."""
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            fut = self._results.get((name, key))
+            if fut is not None:
+                self.deduplicated[name] = self.deduplicated.get(name, 0) + 1
+                owner = False
+            else:
+                fut = Future()
+                self._results[(name, key)] = fut
+                owner = True
+        if not owner:
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                if self._results.get((name, key)) is fut:
+                    del self._results[(name, key)]
+            fut.set_exception(e)
+            raise
+        fut.set_result(result)
+        return result
+
+    def peek(self, name: str, key: Hashable) -> Any:
+        """Result of a completed (name, key) call in this request, or None (never runs the tool)."""
+        with self._lock:
+            fut = self._results.get((name, key))
+        if fut is None or not fut.done() or fut.exception() is not None:
+            return None
+        return fut.result()
+
+    def invalidate(self, *names: str) -> None:
+        with self._lock:
+            for k in [k for k in self._results if k[0] in names]:
+                del self._results[k]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": sum(self.calls.values()),
+                "deduplicated": sum(self.deduplicated.values()),
+                "by_tool": dict(self.deduplicated),
+            }
+
+
+_tool_memo: contextvars.ContextVar[Optional[ToolMemo]] = contextvars.ContextVar("tool_memo", default=None)
+
+
+def set_tool_memo(memo: Optional[ToolMemo]) -> contextvars.Token:
+    return _tool_memo.set(memo)
+
+
+def reset_tool_memo(token: contextvars.Token) -> None:
+    _tool_memo.reset(token)
+
+
+def get_tool_memo() -> Optional[ToolMemo]:
+    return _tool_memo.get()
+
+
+def memoized_tool(key: Optional[Callable[..., Hashable]] = None) -> Callable:
+    """
+    Decorator for read-only tools. `key(*args, **kwargs)` normalizes the arguments
+    (default: args + sorted kwargs). functools.wraps keeps the signature/docstring
+    the agent sees.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            memo = get_tool_memo()
+            if memo is None:
+                return fn(*args, **kwargs)
+            k = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            return memo.call(fn.__name__, k, lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates_tools(*names: str) -> Callable:
+    """Decorator for mutating tools: drops the memoized results of `names` after each call."""
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                memo = get_tool_memo()
+                if memo is not None:
+                    memo.invalidate(*names)
+
+        return wrapper
+
+    return decorator
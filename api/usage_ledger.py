@@ -0,0 +1,152 @@
+"""
+Registro persistente de uso de tokens (usage ledger).
+
+`/chat` hands each request's LLM usage entries (LLMUsageCallbackHandler) to `record()`,
+which only enqueues them. A dedicated writer thread drains the queue every
+USAGE_FLUSH_INTERVAL_MS (or once USAGE_BATCH_MAX records are pending) and writes the
+batch in one transaction: raw `usage_events` rows plus the per-user and per-user-per-day
+rollups that `/usage` reads (see db.repositories.usage). A full queue (USAGE_QUEUE_MAX)
+drops records instead of slowing down chat; USAGE_LEDGER=0 disables recording.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+_STOP = object()
+
+
+def _ledger_enabled() -> bool:
+    return os.getenv("USAGE_LEDGER", "1").strip().lower() not in ("0", "false", "no")
+
+
+class UsageLedger:
+    def __init__(self, *, flush_interval_ms: float = 500.0, batch_max: int = 500, queue_max: int = 10000) -> None:
+        self.flush_interval_s = max(0.0, float(flush_interval_ms)) / 1000.0
+        self.batch_max = max(1, int(batch_max))
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, int(queue_max)))
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats_counters = {"recorded": 0, "dropped": 0, "written_requests": 0, "written_events": 0, "batches": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls) -> "UsageLedger":
+        return cls(
+            flush_interval_ms=float(os.getenv("USAGE_FLUSH_INTERVAL_MS", "500")),
+            batch_max=int(os.getenv("USAGE_BATCH_MAX", "500")),
+            queue_max=int(os.getenv("USAGE_QUEUE_MAX", "10000")),
+        )
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self.stats_counters[key] += n
+
+    # --- worker -------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="usage-ledger", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch: list[dict[str, Any]] = []
+            waiters: list[threading.Event] = []
+            stop = False
+            item = self._queue.get()
+            # Collect for up to flush_interval after the first record; a flush/stop
+            # request or a full batch writes right away.
+            deadline = time.monotonic() + self.flush_interval_s
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or waiters or len(batch) >= self.batch_max:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for ev in waiters:
+                ev.set()
+            if stop:
+                return
+
+    def _write(self, batch: list[dict[str, Any]]) -> None:
+        from db.repositories.usage import apply_usage_batch
+        from db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            events = apply_usage_batch(db, batch)
+            self._count("batches")
+            self._count("written_requests", len(batch))
+            self._count("written_events", events)
+        except Exception as e:
+            db.rollback()
+            self._count("errors")
+            print(f"⚠️ Usage ledger: no se pudo escribir un batch de {len(batch)} registros: {e}")
+        finally:
+            db.close()
+
+    # --- API ------------------------------------------------------------
+
+    def record(self, user_id: int, entries: list[dict[str, Any]]) -> None:
+        """Enqueue one request's usage (never blocks the caller)."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait({"user_id": int(user_id), "at": datetime.utcnow(), "entries": [dict(e) for e in entries]})
+            self._count("recorded")
+        except queue.Full:
+            self._count("dropped")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything recorded so far is written."""
+        if self._worker is None:
+            return True
+        ev = threading.Event()
+        self._queue.put(ev)
+        return ev.wait(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._worker is None:
+            return
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+        self._worker = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            return {**self.stats_counters, "pending": self._queue.qsize()}
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger.from_env()
+        return _ledger
+
+
+def record_usage(user_id: int, entries: list[dict[str, Any]]) -> None:
+    if _ledger_enabled():
+        get_usage_ledger().record(user_id, entries)
@@ -0,0 +1,131 @@
+"""Micro-batching de embeddings entre requests concurrentes."""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+@dataclass
+class _Item:
+    text: str
+    is_query: bool
+    future: Future
+
+
+def _embed_query_batch(model: Any, texts: list[str]) -> list[list[float]]:
+    """One model call for the whole group of queries when the model supports it."""
+    # FastEmbedEmbeddings keeps the fastembed.TextEmbedding in `model`; its query_embed
+    # takes an iterable and runs a single ONNX batch (with the query prefix).
+    inner = getattr(model, "model", None)
+    if inner is not None and hasattr(inner, "query_embed"):
+        kwargs = {k: getattr(model, k) for k in ("batch_size", "parallel") if getattr(model, k, None) is not None}
+        return [v.tolist() for v in inner.query_embed(texts, **kwargs)]
+    # Same encoder for queries and documents: embed_documents is already a batch call.
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    if isinstance(model, DeterministicFakeEmbedding):
+        return model.embed_documents(texts)
+    return [model.embed_query(t) for t in texts]
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Gathers concurrent embed calls for up to `max_wait_ms` (or `max_batch_size` texts)
+    and runs them as one batch on a dedicated worker thread; each caller waits on its
+    own future. Requests that arrive while a batch is running are picked up by the next
+    one. Queries and documents are batched separately (different encoders on some models).
+    """
+
+    def __init__(self, get_model: Callable[[], Embeddings], *, max_batch_size: int = 32, max_wait_ms: float = 2.0) -> None:
+        self._get_model = get_model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue[_Item]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._last_batch_size = 1
+        self.batches = 0
+        self.items = 0
+
+    # --- worker -------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self, first: _Item) -> list[_Item]:
+        batch = [first]
+        # Only wait for stragglers under concurrent load (previous batch > 1): an idle
+        # service embeds a lone request immediately instead of paying max_wait.
+        wait = self.max_wait_s if self._last_batch_size > 1 else 0.0
+        deadline = time.perf_counter() + wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._last_batch_size = len(batch)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect(self._queue.get())
+            for is_query in (True, False):
+                group = [it for it in batch if it.is_query == is_query]
+                if group:
+                    self._process(group, is_query)
+
+    def _process(self, group: list[_Item], is_query: bool) -> None:
+        texts = [it.text for it in group]
+        try:
+            model = self._get_model()
+            vectors = _embed_query_batch(model, texts) if is_query else model.embed_documents(texts)
+        except Exception as e:
+            for it in group:
+                it.future.set_exception(e)
+            return
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(group)
+        for it, vec in zip(group, vectors):
+            it.future.set_result(vec)
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            avg = (self.items / self.batches) if self.batches else 0.0
+            return {"batches": self.batches, "items": self.items, "avg_batch_size": round(avg, 2)}
+
+    # --- Embeddings interface -----------------------------------------
+
+    def submit(self, text: str, *, is_query: bool) -> Future:
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put(_Item(text=text, is_query=is_query, future=fut))
+        return fut
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.submit(text, is_query=True).result()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        futures = [self.submit(t, is_query=False) for t in texts]
+        return [f.result() for f in futures]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await asyncio.wrap_future(self.submit(text, is_query=True))
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return list(await asyncio.gather(*(asyncio.wrap_future(self.submit(t, is_query=False)) for t in texts)))
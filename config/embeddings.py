@@ -1,8 +1,11 @@
 """Configuración de embeddings para vector stores."""
 
 import os
+import threading
+from typing import Any, Optional
 
 from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
 
 # Ensure .env is loaded even when this module is imported before api/app.py startup.
 load_dotenv()
@@ -15,23 +18,108 @@ def _embedding_provider() -> str:
 
 provider = _embedding_provider()
 
-if provider == "google":
-    # Google embeddings (requires API key). Useful if you explicitly want managed embeddings.
-    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+_model: Optional[Embeddings] = None
+_model_lock = threading.Lock()
+_batcher: Optional[Embeddings] = None
 
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_API_KEY is required for embeddings when EMBEDDINGS_PROVIDER=google")
 
-    EMBEDDING_MODEL = GoogleGenerativeAIEmbeddings(
-        model=os.getenv("GEMINI_EMBEDDINGS_MODEL", "text-embedding-004"),
-        google_api_key=api_key,
-    )
-else:
+def _batching_enabled() -> bool:
+    # Cross-request micro-batching (see config.embedding_service). Set to 0 to call the model directly.
+    return os.getenv("EMBEDDING_BATCHING", "1").strip().lower() not in ("0", "false", "no")
+
+
+def _create_embedding_model() -> Embeddings:
+    if provider == "google":
+        # Google embeddings (requires API key). Useful if you explicitly want managed embeddings.
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise RuntimeError("GOOGLE_API_KEY is required for embeddings when EMBEDDINGS_PROVIDER=google")
+
+        return GoogleGenerativeAIEmbeddings(
+            model=os.getenv("GEMINI_EMBEDDINGS_MODEL", "text-embedding-004"),
+            google_api_key=api_key,
+        )
+
+    if provider == "fake":
+        # Deterministic hash-based vectors: no model download, for offline load tests/benchmarks.
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        return DeterministicFakeEmbedding(size=int(os.getenv("FAKE_EMBEDDINGS_DIM", "384")))
+
     # Local embeddings (no torch). Much faster/cheaper to build vectorstores on Railway.
     from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 
-    EMBEDDING_MODEL = FastEmbedEmbeddings(
+    return FastEmbedEmbeddings(
         model_name=os.getenv("FASTEMBED_MODEL", "BAAI/bge-small-en-v1.5")
-)
+    )
+
+
+def embedding_model_id() -> str:
+    """Provider + model of the configured embeddings (stored vectors are only comparable within one id)."""
+    if provider == "google":
+        return f"google:{os.getenv('GEMINI_EMBEDDINGS_MODEL', 'text-embedding-004')}"
+    if provider == "fake":
+        return f"fake:{int(os.getenv('FAKE_EMBEDDINGS_DIM', '384'))}"
+    return f"fastembed:{os.getenv('FASTEMBED_MODEL', 'BAAI/bge-small-en-v1.5')}"
+
+
+def get_embedding_model() -> Embeddings:
+    """Underlying embedding model, created on first use (thread-safe, once per process)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = _create_embedding_model()
+    return _model
+
+
+def embedding_model_loaded() -> bool:
+    return _model is not None
+
+
+def get_embedding_service() -> Embeddings:
+    """Embedder used by the app: the batching service when EMBEDDING_BATCHING is on, else the model."""
+    global _batcher
+    if not _batching_enabled():
+        return get_embedding_model()
+    if _batcher is None:
+        with _model_lock:
+            if _batcher is None:
+                from config.embedding_service import BatchingEmbeddings
+
+                _batcher = BatchingEmbeddings(
+                    get_embedding_model,
+                    max_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32")),
+                    max_wait_ms=float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "2")),
+                )
+    return _batcher
+
+
+class _LazyEmbeddings(Embeddings):
+    """
+    Stand-in passed to vector stores: the real model (ONNX session / API client) is only
+    built when the first text is embedded, so importing this module stays cheap.
+    """
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return get_embedding_service().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return get_embedding_service().embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await get_embedding_service().aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await get_embedding_service().aembed_query(text)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only public attributes are forwarded (copy/pickle probes must not load the model).
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(get_embedding_model(), name)
+
 
+EMBEDDING_MODEL: Embeddings = _LazyEmbeddings()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from db.models import MemoryRecent
+
+
+def _user_clause(user_id: Optional[int]):
+    return MemoryRecent.user_id.is_(None) if user_id is None else MemoryRecent.user_id == int(user_id)
+
+
+def upsert_recent(db: Session, store: str, rows: Iterable[tuple[str, Optional[int], float]]) -> int:
+    """Insert or refresh (doc_id, user_id, ts) rows; re-saving a context moves it to the front."""
+    rows = [{"store": store, "doc_id": d, "user_id": u, "ts": float(ts)} for d, u, ts in rows]
+    if not rows:
+        return 0
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(MemoryRecent)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["store", "doc_id"],
+            set_={"user_id": stmt.excluded.user_id, "ts": stmt.excluded.ts},
+        )
+        db.execute(stmt, rows)
+    else:
+        for row in rows:
+            db.merge(MemoryRecent(**row))
+    db.commit()
+    return len(rows)
+
+
+def newest_recent(db: Session, store: str, user_id: Optional[int], limit: int, offset: int = 0) -> list[str]:
+    stmt = (
+        select(MemoryRecent.doc_id)
+        .where(MemoryRecent.store == store, _user_clause(user_id))
+        .order_by(MemoryRecent.ts.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return list(db.scalars(stmt))
+
+
+def delete_recent(db: Session, store: str, doc_ids: Iterable[str]) -> int:
+    doc_ids = list(doc_ids)
+    removed = 0
+    for i in range(0, len(doc_ids), 500):
+        res = db.execute(
+            delete(MemoryRecent).where(MemoryRecent.store == store, MemoryRecent.doc_id.in_(doc_ids[i : i + 500]))
+        )
+        removed += res.rowcount or 0
+    db.commit()
+    return removed
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
 
 from sqlalchemy import select
@@ -33,6 +34,44 @@ DEFAULT_PLAYLISTS: list[tuple[str, str]] = [
 ]
 
 
+@dataclass(frozen=True)
+class PlaylistRow:
+    """
+    Plain copy of a Playlist row. ORM instances from the request's shared session expire
+    when another tool commits; read their values inside `request_session()` and keep these.
+    """
+
+    id: int
+    user_id: int
+    name: str
+    description: str
+    updated_at: datetime
+
+    @classmethod
+    def of(cls, p: Playlist) -> "PlaylistRow":
+        return cls(id=p.id, user_id=p.user_id, name=p.name, description=p.description, updated_at=p.updated_at)
+
+
+def _index_saved(p: Playlist) -> None:
+    # After commit, best effort: the vector index (vectorstores.playlist_index) only queues
+    # the change for its background writer, and any error stays out of the DB write.
+    try:
+        from vectorstores.playlist_index import on_playlist_saved
+
+        on_playlist_saved(PlaylistRow.of(p))
+    except Exception as e:
+        print(f"⚠️ No se pudo encolar la playlist {p.id} para el índice: {e}")
+
+
+def _index_deleted(user_id: int, playlist_id: int) -> None:
+    try:
+        from vectorstores.playlist_index import on_playlist_deleted
+
+        on_playlist_deleted(user_id, playlist_id)
+    except Exception as e:
+        print(f"⚠️ No se pudo encolar el borrado de la playlist {playlist_id} del índice: {e}")
+
+
 def list_playlists_for_user(db: Session, user_id: int) -> list[Playlist]:
     stmt = select(Playlist).where(Playlist.user_id == user_id).order_by(Playlist.name.asc())
     return list(db.execute(stmt).scalars().all())
@@ -56,8 +95,10 @@ def create_playlist_for_user(db: Session, user_id: int, name: str, description:
         db.add(existing)
         db.commit()
         db.refresh(existing)
+        _index_saved(existing)
         return existing
     db.refresh(p)
+    _index_saved(p)
     return p
 
 
@@ -72,6 +113,7 @@ def update_playlist_for_user(
     db.add(p)
     db.commit()
     db.refresh(p)
+    _index_saved(p)
     return p
 
 
@@ -81,6 +123,7 @@ def delete_playlist_for_user(db: Session, user_id: int, playlist_id: int) -> boo
         return False
     db.delete(p)
     db.commit()
+    _index_deleted(user_id, playlist_id)
     return True
 
 
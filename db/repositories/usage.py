@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Iterable
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from db.models import UsageDaily, UsageEvent, UsageTotal
+
+
+_COUNTERS = ("requests", "llm_calls", "input_tokens", "output_tokens", "total_tokens")
+
+
+def _upsert(db: Session, model: Any, keys: dict[str, Any], deltas: dict[str, int], extra: dict[str, Any] | None = None) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE counter += delta (atomic across API workers)."""
+    extra = extra or {}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(model).values(**keys, **deltas, **extra)
+        table = model.__table__
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={**{k: table.c[k] + stmt.excluded[k] for k in deltas}, **{k: stmt.excluded[k] for k in extra}},
+        )
+        db.execute(stmt)
+        return
+    # Other backends: read-modify-write inside the batch transaction.
+    row = db.get(model, tuple(keys.values()) if len(keys) > 1 else next(iter(keys.values())))
+    if row is None:
+        db.add(model(**keys, **deltas, **extra))
+    else:
+        for k, v in deltas.items():
+            setattr(row, k, getattr(row, k) + v)
+        for k, v in extra.items():
+            setattr(row, k, v)
+
+
+def apply_usage_batch(db: Session, records: Iterable[dict[str, Any]]) -> int:
+    """
+    Persist a batch of request usage records in one transaction: raw events plus the
+    per-user and per-user-per-day rollups (aggregated in memory first, one upsert per key).
+
+    Each record: {"user_id", "at": datetime, "entries": [{"agent", "model", "input_tokens", ...}]}.
+    """
+    events: list[dict[str, Any]] = []
+    daily: dict[tuple[int, str], dict[str, int]] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+    totals: dict[int, dict[str, int]] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+    for r in records:
+        user_id = int(r["user_id"])
+        at: datetime = r["at"]
+        day = at.strftime("%Y-%m-%d")
+        for agg in (daily[(user_id, day)], totals[user_id]):
+            agg["requests"] += 1
+        for e in r.get("entries") or []:
+            row = {k: int(e.get(k) or 0) for k in ("input_tokens", "output_tokens", "total_tokens")}
+            events.append({"user_id": user_id, "agent": str(e.get("agent") or "agent"), "model": e.get("model"), "created_at": at, **row})
+            for agg in (daily[(user_id, day)], totals[user_id]):
+                agg["llm_calls"] += 1
+                for k, v in row.items():
+                    agg[k] += v
+
+    if events:
+        db.execute(insert(UsageEvent), events)
+    now = datetime.utcnow()
+    for (user_id, day), deltas in daily.items():
+        _upsert(db, UsageDaily, {"user_id": user_id, "day": day}, deltas)
+    for user_id, deltas in totals.items():
+        _upsert(db, UsageTotal, {"user_id": user_id}, deltas, {"updated_at": now})
+    db.commit()
+    return len(events)
+
+
+def get_usage_for_user(db: Session, user_id: int, days: int = 30) -> dict[str, Any]:
+    """Rollup reads only: one primary-key lookup plus a PK range of at most `days` rows."""
+    total = db.get(UsageTotal, user_id)
+    stmt = select(UsageDaily).where(UsageDaily.user_id == user_id).order_by(UsageDaily.day.desc()).limit(max(0, days))
+    daily = db.execute(stmt).scalars().all()
+    return {
+        "total": {k: (getattr(total, k) if total else 0) for k in _COUNTERS},
+        "updated_at": total.updated_at.isoformat() + "Z" if total else None,
+        "daily": [{"day": d.day, **{k: getattr(d, k) for k in _COUNTERS}} for d in daily],
+    }
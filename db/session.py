@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 
@@ -19,7 +19,34 @@ if DATABASE_URL.startswith("sqlite:"):
     connect_args = {"check_same_thread": False}
 
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args, future=True)
+def _pool_args(url: str) -> dict:
+    # In-memory SQLite uses a single-connection pool without these options.
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        return {}
+    # Every admitted /chat turn may hold a connection while the model runs: size the pool
+    # for CHAT_MAX_CONCURRENCY (api.admission); the overflow serves auth/playlist routes.
+    chat_concurrency = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", str(max(5, chat_concurrency)))),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT_S", "30")),
+    }
+
+
+engine = create_engine(DATABASE_URL, connect_args=connect_args, future=True, **_pool_args(DATABASE_URL))
+
+
+if DATABASE_URL.startswith("sqlite:"):
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, _record) -> None:
+        # WAL lets several API workers read while one writes; busy_timeout waits for the
+        # write lock instead of failing with "database is locked".
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+        cursor.close()
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
@@ -0,0 +1,155 @@
+"""
+Una sesión de base de datos por request (unit of work), compartida por rutas y herramientas.
+
+`api.deps.get_db` opens one Session per request and wraps it in a UnitOfWork; FastAPI
+hands the same session to every dependency (get_current_user) and to the route, and
+/chat sets the UnitOfWork in a contextvar so the tools (playlists, recency index) and the
+turn's bookkeeping reuse it through `request_session()` instead of opening their own.
+Outside a request (CLI, scripts, background writers) `request_session()` is a plain
+short-lived SessionLocal().
+
+Tools can run in parallel threads and a Session is not thread-safe: `use()` serializes
+access. Commit points:
+
+- each repository write (create/update/delete a playlist, recency index upserts) commits
+  its own change, so a tool's write is durable when the tool returns
+- a tool that raises rolls the shared session back, so the next tool starts clean
+- at the end of the request, pending changes are committed (rolled back on error) and the
+  session is closed
+
+Connections checked out per request (one per transaction the session begins, plus any
+other session opened in the request context) are counted per UnitOfWork and per process
+(`db_stats()`, shown in GET /health/load).
+"""
+
+from __future__ import annotations
+
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from db.session import SessionLocal, engine
+
+_UOW_KEY = "unit_of_work"
+
+
+class UnitOfWork:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+        session.info[_UOW_KEY] = self
+        self.connections = 0
+        self.commits = 0
+        self._other_sessions: set[int] = set()
+        self._lock = threading.RLock()
+        self._closed = False
+
+    @classmethod
+    def of(cls, session: Session) -> "UnitOfWork":
+        """The UnitOfWork wrapping `session` (created if it has none)."""
+        return session.info.get(_UOW_KEY) or cls(session)
+
+    @contextmanager
+    def use(self) -> Iterator[Session]:
+        """Exclusive use of the shared session; rolled back if the block raises."""
+        with self._lock:
+            try:
+                yield self.session
+            except BaseException:
+                self.session.rollback()
+                raise
+
+    def close(self, error: bool = False) -> None:
+        """End of the request: commit pending changes (or roll back on error) and close."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            try:
+                if error:
+                    self.session.rollback()
+                elif self.session.new or self.session.dirty or self.session.deleted:
+                    self.session.commit()
+            finally:
+                self.session.close()
+                _record_request(self)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "connections_checked_out": self.connections,
+                "sessions": 1 + len(self._other_sessions),
+                "commits": self.commits,
+            }
+
+
+_unit_of_work: contextvars.ContextVar[Optional[UnitOfWork]] = contextvars.ContextVar("unit_of_work", default=None)
+
+
+def set_unit_of_work(uow: Optional[UnitOfWork]) -> contextvars.Token:
+    return _unit_of_work.set(uow)
+
+
+def reset_unit_of_work(token: contextvars.Token) -> None:
+    _unit_of_work.reset(token)
+
+
+def get_unit_of_work() -> Optional[UnitOfWork]:
+    return _unit_of_work.get()
+
+
+@contextmanager
+def request_session() -> Iterator[Session]:
+    """The request's shared session if there is one, else a short-lived session closed on exit."""
+    uow = get_unit_of_work()
+    if uow is not None:
+        with uow.use() as db:
+            yield db
+        return
+    with SessionLocal() as db:
+        yield db
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def _count_checkout(session: Session, transaction: Any, connection: Any) -> None:
+    # A session holds one pooled connection per transaction.
+    uow = session.info.get(_UOW_KEY) or get_unit_of_work()
+    if uow is None:
+        return
+    with uow._lock:
+        uow.connections += 1
+        if uow.session is not session:
+            uow._other_sessions.add(id(session))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _count_commit(session: Session) -> None:
+    uow = session.info.get(_UOW_KEY)
+    if uow is not None:
+        with uow._lock:
+            uow.commits += 1
+
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "connections": 0, "max_connections": 0, "commits": 0}
+
+
+def _record_request(uow: UnitOfWork) -> None:
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["connections"] += uow.connections
+        _stats["max_connections"] = max(_stats["max_connections"], uow.connections)
+        _stats["commits"] += uow.commits
+
+
+def db_stats() -> dict[str, Any]:
+    with _stats_lock:
+        requests = _stats["requests"]
+        return {
+            **_stats,
+            "connections_per_request": round(_stats["connections"] / requests, 3) if requests else None,
+            "pool": engine.pool.status(),
+        }
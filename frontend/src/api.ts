@@ -35,18 +35,28 @@ export type ChatUsage = {
   model?: string;
 };
 
+export type ToolCallStats = {
+  calls: number;
+  deduplicated: number;
+  by_tool: Record<string, number>;
+};
+
 export type ChatExpense = {
   total?: Omit<ChatUsage, "agent" | "model"> | null;
   breakdown: ChatUsage[];
+  tool_calls?: ToolCallStats;
 };
 
 export type ChatResponse = { reply: string; expense?: ChatExpense | null };
 
-export async function chat(message: string, token: string): Promise<ChatResponse> {
+// Optional client location for the weather tools (otherwise the server uses the caller's IP).
+export type ChatLocation = { latitude?: number; longitude?: number; ip?: string; label?: string };
+
+export async function chat(message: string, token: string, location?: ChatLocation): Promise<ChatResponse> {
   const res = await fetch(`${API_BASE}/chat`, {
     method: "POST",
     headers: { "Content-Type": "application/json", ...authHeaders(token) },
-    body: JSON.stringify({ message }),
+    body: JSON.stringify(location ? { message, location } : { message }),
   });
   if (!res.ok) throw new Error(await res.text());
   return res.json();
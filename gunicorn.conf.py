@@ -0,0 +1,26 @@
+"""
+Multi-worker deployment: `gunicorn -c gunicorn.conf.py api.app:app`
+
+Workers share state through SQLite (WAL) for users/playlists and conversation
+checkpoints (CHECKPOINTER=sqlite) and through a Chroma server for the vector stores
+(CHROMA_SERVER_HOST/PORT). scripts/prewarm.py runs once before forking so workers
+start from a downloaded embedding model and an already-built knowledge index.
+"""
+
+import os
+import subprocess
+import sys
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    if workers > 1 and not os.getenv("CHROMA_SERVER_HOST"):
+        server.log.warning("WEB_CONCURRENCY>1 sin CHROMA_SERVER_HOST: los workers comparten el directorio de Chroma")
+    if workers > 1 and os.getenv("CHECKPOINTER", "memory").strip().lower() != "sqlite":
+        server.log.warning("WEB_CONCURRENCY>1 sin CHECKPOINTER=sqlite: cada worker tiene su propio historial")
+    if os.getenv("PREWARM", "1").strip().lower() not in ("0", "false", "no"):
+        subprocess.run([sys.executable, os.path.join("scripts", "prewarm.py")], check=True)
@@ -1,4 +1,25 @@
-"""Punto de entrada principal del sistema de recomendación musical."""
+"""
+Punto de entrada principal del sistema de recomendación musical.
+
+    python main.py                                   # chat interactivo
+    python main.py --batch prompts.jsonl [--workers 4] [--out results.jsonl]
+    cat prompts.jsonl | python main.py --batch -
+
+Batch mode: one prompt per line, either plain text or a JSON object with the prompt in
+`message` / `input_message` / `prompt` (or `title` + `body`, as in requests.jsonl), an
+optional id (`id` / `request_id` / `case_id`, default: line number) and an optional
+`thread_id` (default: batch:<id>, one conversation per line). Lines run concurrently
+and each result is written as a JSONL line as soon as it completes (completion order);
+a throughput/latency summary goes to stderr at the end.
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Iterator, TextIO
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
@@ -9,7 +30,135 @@ from agents import create_music_agent
 from api.app import app  # noqa: F401
 
 
+def _batch_items(lines: Iterator[str]) -> Iterator[dict[str, Any]]:
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            obj = line
+        if not isinstance(obj, dict):
+            obj = {"message": str(obj)}
+        message = obj.get("message") or obj.get("input_message") or obj.get("prompt")
+        if not message and (obj.get("title") or obj.get("body")):
+            message = "\n\n".join(str(obj[k]) for k in ("title", "body") if obj.get(k))
+        item_id = str(obj.get("id") or obj.get("request_id") or obj.get("case_id") or n)
+        yield {
+            "id": item_id,
+            "thread_id": str(obj.get("thread_id") or f"batch:{item_id}"),
+            "message": str(message or ""),
+        }
+
+
+def _run_batch_item(agent: Any, item: dict[str, Any]) -> dict[str, Any]:
+    from agents.llm_scheduler import PRIORITY_BATCH, reset_llm_priority, set_llm_priority
+    from api.callback_context import reset_callbacks, set_callbacks
+    from api.llm_usage_callback import LLMUsageCallbackHandler
+    from api.routes.chat import _content_to_text
+
+    # Context vars are per worker thread: set them for this call only.
+    cb = LLMUsageCallbackHandler()
+    cb_token = set_callbacks([cb])
+    priority_token = set_llm_priority(PRIORITY_BATCH)
+    started = time.perf_counter()
+    out: dict[str, Any] = {"id": item["id"], "thread_id": item["thread_id"]}
+    try:
+        if not item["message"]:
+            raise ValueError("línea sin mensaje")
+        response = agent.invoke(
+            {"messages": [SystemMessage(content=agent._system_prompt), HumanMessage(content=item["message"])]},
+            {"configurable": {"thread_id": item["thread_id"]}, "callbacks": [cb]},
+        )
+        msgs = response.get("messages") or []
+        out["reply"] = _content_to_text(getattr(msgs[-1], "content", msgs[-1])) if msgs else ""
+        out["ok"] = True
+    except Exception as e:
+        out["ok"] = False
+        out["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        reset_llm_priority(priority_token)
+        reset_callbacks(cb_token)
+    out["latency_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+    out["tokens"] = cb.totals()
+    return out
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))]
+
+
+def run_batch(source: TextIO, out: TextIO, workers: int = 4) -> dict[str, Any]:
+    """Run every prompt of `source` through the agent with `workers` threads; returns the summary."""
+    agent = create_music_agent()
+    workers = max(1, workers)
+    results: list[dict[str, Any]] = []
+
+    def emit(fut: Future) -> None:
+        result = fut.result()
+        results.append(result)
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        pending: set[Future] = set()
+        for item in _batch_items(iter(source.readline, "")):
+            # Bounded read-ahead: stdin can be a long stream.
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    emit(fut)
+            pending.add(pool.submit(_run_batch_item, agent, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                emit(fut)
+    wall_s = time.perf_counter() - started
+
+    latencies = [r["latency_ms"] for r in results if r["ok"]]
+    return {
+        "requests": len(results),
+        "ok": len(latencies),
+        "errors": len(results) - len(latencies),
+        "workers": workers,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(results) / wall_s, 2) if wall_s > 0 else None,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+        "total_tokens": sum(int(r["tokens"].get("total_tokens", 0)) for r in results),
+    }
+
+
 def main():
+    p = argparse.ArgumentParser(description="Agente de recomendación musical (chat interactivo o batch).")
+    p.add_argument("--batch", default="", help="JSONL/texto con un prompt por línea ('-' = stdin)")
+    p.add_argument("--workers", type=int, default=4, help="Prompts procesados en paralelo en modo batch")
+    p.add_argument("--out", default="-", help="Salida JSONL del modo batch ('-' = stdout)")
+    args = p.parse_args()
+    if args.batch:
+        source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+        out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+        try:
+            # Init/tool logs go to stderr so the JSONL output stays parseable on stdout.
+            with contextlib.redirect_stdout(sys.stderr):
+                summary = run_batch(source, out, workers=args.workers)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if out is not sys.stdout:
+                out.close()
+        print(json.dumps(summary, indent=2), file=sys.stderr)
+        return
+
     try:
         print("🎵 Inicializando Agente de Recomendación Musical...")
         agent = create_music_agent()
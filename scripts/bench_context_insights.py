@@ -0,0 +1,101 @@
+"""
+Latency and token usage of analyze_context per CONTEXT_INSIGHTS_MODE (agent | oneshot | rules).
+
+Runs every mode over a grid of mocked environments (bench.mock_context: weather x time)
+and user queries, capturing token usage with LLMUsageCallbackHandler. Offline by default
+(LLM_PROVIDER=stub, STUB_LLM_LATENCY_MS simulates the provider); note the stub never calls
+tools, so against Gemini the `agent` mode adds at least one more model round trip.
+
+Example:
+    python scripts/bench_context_insights.py --stub-latency-ms 400 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+_WEATHERS = ["despejado", "parcialmente nublado", "lluvia moderada", "tormenta eléctrica", "nieve ligera", "niebla"]
+_TIMES = ["08:30", "15:00", "22:45"]
+_QUERIES = ["", "voy a estudiar para un examen", "salgo a correr", "estoy cocinando con amigos"]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _run_mode(mode: str, repeat: int) -> dict[str, Any]:
+    from agents.context_analyzer_agent import analyze_context
+    from api.llm_usage_callback import LLMUsageCallbackHandler
+    from bench.mock_context import APIMocks, reset_api_mocks, set_api_mocks
+
+    os.environ["CONTEXT_INSIGHTS_MODE"] = mode
+    latencies: list[float] = []
+    tokens: list[int] = []
+    llm_calls = 0
+    for _ in range(repeat):
+        for weather in _WEATHERS:
+            for hhmm in _TIMES:
+                for query in _QUERIES:
+                    token = set_api_mocks(APIMocks(location="Buenos Aires, Argentina", time=hhmm, weather=weather, temperature_c=18.0))
+                    cb = LLMUsageCallbackHandler()
+                    try:
+                        t0 = time.perf_counter()
+                        analyze_context(query, callbacks=[cb])
+                        latencies.append((time.perf_counter() - t0) * 1000.0)
+                    finally:
+                        reset_api_mocks(token)
+                    llm_calls += len(cb.entries)
+                    tokens.append(cb.totals()["total_tokens"])
+    return {
+        "mode": mode,
+        "runs": len(latencies),
+        "llm_calls_per_run": round(llm_calls / len(latencies), 2),
+        "latency_ms_p50": round(statistics.median(latencies), 2),
+        "latency_ms_p99": round(_percentile(latencies, 99), 2),
+        "tokens_per_run": round(statistics.mean(tokens), 1),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Compare analyze_context latency/tokens across CONTEXT_INSIGHTS_MODE values.")
+    p.add_argument("--modes", default="agent,oneshot,rules")
+    p.add_argument("--repeat", type=int, default=1, help="passes over the environment x query grid")
+    p.add_argument("--stub-latency-ms", type=float, default=300.0, help="simulated provider latency (LLM_PROVIDER=stub)")
+    p.add_argument("--provider", default="stub", help="LLM_PROVIDER (stub|google)")
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+
+    os.environ["LLM_PROVIDER"] = args.provider
+    os.environ["STUB_LLM_LATENCY_MS"] = str(args.stub_latency_ms)
+
+    rows = []
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        row = _run_mode(mode, args.repeat)
+        rows.append(row)
+        print(
+            f"{mode:>8}  runs={row['runs']:<4} llm_calls/run={row['llm_calls_per_run']:<5} "
+            f"p50={row['latency_ms_p50']}ms p99={row['latency_ms_p99']}ms tokens/run={row['tokens_per_run']}"
+        )
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Request deadline under a slow provider: /chat latency percentiles and skipped steps.
+
+Each scenario runs in a fresh process (temp DB and Chroma, LLM_PROVIDER=stub) and sends
+`--requests` complex-tier turns through the /chat pipeline (routes.chat._chat_turn, with
+mocked weather). The stub calls the tools in STUB_LLM_TOOL_PLAN on every user message
+(insights sub-agent, weather, knowledge search, playlists), so a turn costs about four
+model round trips. Every provider latency in `--latencies-ms` runs with the deadline
+disabled (CHAT_DEADLINE_S=0) and enabled (`--deadline-s`, `--reserve-s`).
+
+Example:
+    python scripts/bench_deadline.py --latencies-ms 200,1000,2000 --deadline-s 6 --requests 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+_TOOL_PLAN = "get_context_insights,get_location_and_weather,search_musical_knowledge,list_playlists"
+_MESSAGES = [
+    "estoy cansado, recomendame algo para estudiar",
+    "voy a salir a correr y necesito energía",
+    "estoy cocinando con amigos, qué ponemos de fondo",
+    "me siento triste y llueve, qué escucho",
+]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _scenario(requests: int) -> dict[str, Any]:
+    from fastapi.testclient import TestClient
+
+    from api import state
+    from api.app import app
+    from api.deadline import Deadline, deadline_stats
+    from api.routes.chat import ChatRequest, _chat_turn
+    from bench.mock_context import APIMocks, reset_api_mocks, set_api_mocks
+    from db.models import User
+    from db.session import SessionLocal
+
+    latencies: list[float] = []
+    skipped: Counter = Counter()
+    degraded = 0
+    with TestClient(app) as client:
+        state.ready.wait(120)
+        client.post("/auth/signup", json={"username": "bench_deadline", "password": "bench123"})
+        with SessionLocal() as db:
+            user = db.query(User).filter(User.username == "bench_deadline").one()
+            db.expunge(user)
+        mocks = APIMocks(location="Buenos Aires, Argentina", time="18:30", weather="lluvia moderada", temperature_c=16.0)
+        for i in range(requests):
+            token = set_api_mocks(mocks)
+            try:
+                started = time.perf_counter()
+                response = _chat_turn(ChatRequest(message=f"{_MESSAGES[i % len(_MESSAGES)]} ({i})"), user, None, Deadline.from_env())
+                latencies.append((time.perf_counter() - started) * 1000.0)
+            finally:
+                reset_api_mocks(token)
+            report = (response.expense or {}).get("deadline") or {}
+            skipped.update(report.get("skipped", []))
+            degraded += bool(report.get("skipped"))
+
+    return {
+        "requests": len(latencies),
+        "latency_ms_p50": round(statistics.median(latencies), 1),
+        "latency_ms_p95": round(_percentile(latencies, 95), 1),
+        "latency_ms_p99": round(_percentile(latencies, 99), 1),
+        "latency_ms_max": round(max(latencies), 1),
+        "degraded_requests": degraded,
+        "skipped": dict(skipped),
+        "step_cost_s": deadline_stats()["step_cost_s"],
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Compare /chat latency with and without the request deadline under a slow provider.")
+    p.add_argument("--latencies-ms", default="200,1000,2000", help="Simulated provider latencies (stub)")
+    p.add_argument("--jitter-ms", type=float, default=0.5, help="Extra random latency, as a fraction of the base latency")
+    p.add_argument("--deadline-s", type=float, default=6.0, help="CHAT_DEADLINE_S for the deadline scenarios")
+    p.add_argument("--reserve-s", type=float, default=2.0, help="DEADLINE_RESERVE_S for the deadline scenarios")
+    p.add_argument("--requests", type=int, default=12, help="Turns per scenario")
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    p.add_argument("--scenario", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.scenario:
+        print(json.dumps(_scenario(args.requests)))
+        return
+
+    rows: list[dict[str, Any]] = []
+    for latency in [float(x) for x in args.latencies_ms.split(",") if x.strip()]:
+        for deadline_s in (0.0, args.deadline_s):
+            with tempfile.TemporaryDirectory(prefix="bench_deadline_") as tmp:
+                env = dict(os.environ)
+                env.update(
+                    LLM_PROVIDER="stub",
+                    EMBEDDINGS_PROVIDER=env.get("EMBEDDINGS_PROVIDER", "fake"),
+                    STUB_LLM_LATENCY_MS=str(latency),
+                    STUB_LLM_LATENCY_JITTER_MS=str(latency * args.jitter_ms),
+                    STUB_LLM_TOOL_PLAN=_TOOL_PLAN,
+                    CONTEXT_INSIGHTS_MODE="agent",
+                    CHAT_DEADLINE_S=str(deadline_s),
+                    DEADLINE_RESERVE_S=str(args.reserve_s),
+                    DATABASE_URL=f"sqlite:///{Path(tmp) / 'app.db'}",
+                    CHROMA_MEMORY_DIR=str(Path(tmp) / "memory"),
+                    CHROMA_KNOWLEDGE_DIR=str(Path(tmp) / "knowledge"),
+                    JWT_SECRET=env.get("JWT_SECRET", "bench"),
+                )
+                cmd = [sys.executable, __file__, "--scenario", "--requests", str(args.requests)]
+                out = subprocess.run(cmd, env=env, cwd=_REPO_ROOT, check=True, capture_output=True, text=True)
+            row = {"provider_latency_ms": latency, "deadline_s": deadline_s or None, **json.loads(out.stdout.strip().splitlines()[-1])}
+            rows.append(row)
+            print(
+                f"latency={latency:>6.0f}ms  deadline={'off' if not deadline_s else f'{deadline_s}s':>5}  "
+                f"p50={row['latency_ms_p50']}ms p95={row['latency_ms_p95']}ms p99={row['latency_ms_p99']}ms  "
+                f"degraded={row['degraded_requests']}/{row['requests']}  skipped={row['skipped']}"
+            )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Embedding throughput with 1, 8 and 64 concurrent callers: direct model calls vs the
+cross-request micro-batching service (config.embedding_service).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from config.embedding_service import BatchingEmbeddings
+from config.embeddings import get_embedding_model
+
+_TEXTS = [
+    "Usuario: estoy estudiando y llueve\nAsistente: Te recomiendo Focus Rain",
+    "Usuario: voy al gimnasio\nAsistente: Probá Power Workout",
+    "Usuario: noche tranquila\nAsistente: Moonlight Jazz es ideal",
+    "música para manejar de noche",
+    "estoy triste, algo suave",
+    "fiesta con amigos",
+]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _run(embedder: Any, concurrency: int, per_caller: int) -> dict[str, Any]:
+    latencies: list[float] = []
+
+    def caller(worker: int) -> list[float]:
+        out = []
+        for i in range(per_caller):
+            text = f"{_TEXTS[(worker + i) % len(_TEXTS)]} #{worker}-{i}"
+            t0 = time.perf_counter()
+            embedder.embed_query(text)
+            out.append((time.perf_counter() - t0) * 1000.0)
+        return out
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for chunk in pool.map(caller, range(concurrency)):
+            latencies.extend(chunk)
+    elapsed = time.perf_counter() - started
+    return {
+        "texts": len(latencies),
+        "texts_per_s": round(len(latencies) / elapsed, 1),
+        "latency_ms_p50": round(statistics.median(latencies), 2),
+        "latency_ms_p99": round(_percentile(latencies, 99), 2),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark embedding micro-batching.")
+    p.add_argument("--concurrency", default="1,8,64")
+    p.add_argument("--per-caller", type=int, default=32, help="embed_query calls per concurrent caller")
+    p.add_argument("--max-batch-size", type=int, default=32)
+    p.add_argument("--max-wait-ms", type=float, default=2.0)
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+
+    model = get_embedding_model()
+    model.embed_query("warmup")
+
+    rows: list[dict[str, Any]] = []
+    for c in [int(x) for x in args.concurrency.split(",") if x.strip()]:
+        batcher = BatchingEmbeddings(lambda: model, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+        batcher.embed_query("warmup")
+        for mode, embedder in (("direct", model), ("batched", batcher)):
+            row = {"mode": mode, "concurrency": c, **_run(embedder, c, args.per_caller)}
+            if mode == "batched":
+                row.update(batcher.stats())
+            rows.append(row)
+            print(
+                f"{mode:>8} c={c:<3} {row['texts_per_s']:>8} texts/s  "
+                f"p50={row['latency_ms_p50']}ms p99={row['latency_ms_p99']}ms"
+                + (f"  avg_batch={row['avg_batch_size']}" if mode == "batched" else "")
+            )
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
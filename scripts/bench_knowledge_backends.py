@@ -0,0 +1,141 @@
+"""
+Per-query latency and resident memory of the knowledge store backends (chroma vs numpy).
+
+Each backend runs in its own subprocess so RSS numbers are not polluted by the other one.
+Reports both end-to-end latency (query embedding + search) and store-only latency
+(search by a precomputed query vector).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+_QUERIES = [
+    "música para estudiar con lluvia",
+    "entrenamiento intenso en el gimnasio",
+    "fiesta con amigos un viernes a la noche",
+    "relajarse después del trabajo",
+    "manejar de noche en la ruta",
+    "día soleado en la playa",
+    "meditación y respiración",
+    "tristeza y nostalgia",
+]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # Not Linux: peak RSS is the best portable approximation (KiB on Linux, bytes on macOS).
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _child(backend: str, iterations: int, k: int) -> dict[str, Any]:
+    os.environ["KNOWLEDGE_BACKEND"] = backend
+    from config.embeddings import EMBEDDING_MODEL  # loads the model before the baseline
+
+    EMBEDDING_MODEL.embed_query("warmup")
+    rss_before = _rss_mb()
+
+    from vectorstores import initialize_knowledge_vectorstore
+
+    t0 = time.perf_counter()
+    store = initialize_knowledge_vectorstore()
+    init_s = time.perf_counter() - t0
+    vectors = [EMBEDDING_MODEL.embed_query(q) for q in _QUERIES]
+
+    if backend == "numpy":
+        by_vector = lambda v: store.similarity_search_by_vector_with_score(v, k=k)  # noqa: E731
+    else:
+        by_vector = lambda v: store.similarity_search_by_vector_with_relevance_scores(v, k=k)  # noqa: E731
+
+    for q, v in zip(_QUERIES, vectors):  # warm caches / HNSW pages
+        store.similarity_search_with_score(q, k=k)
+        by_vector(v)
+
+    e2e: list[float] = []
+    store_only: list[float] = []
+    for i in range(iterations):
+        q, v = _QUERIES[i % len(_QUERIES)], vectors[i % len(vectors)]
+        t = time.perf_counter()
+        store.similarity_search_with_score(q, k=k)
+        e2e.append((time.perf_counter() - t) * 1000.0)
+        t = time.perf_counter()
+        by_vector(v)
+        store_only.append((time.perf_counter() - t) * 1000.0)
+
+    return {
+        "backend": backend,
+        "init_s": round(init_s, 3),
+        "rss_store_mb": round(_rss_mb() - rss_before, 2),
+        "e2e_ms_p50": round(statistics.median(e2e), 4),
+        "e2e_ms_p95": round(_percentile(e2e, 95), 4),
+        "store_ms_p50": round(statistics.median(store_only), 4),
+        "store_ms_p95": round(_percentile(store_only, 95), 4),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Microbenchmark knowledge store backends (chroma vs numpy).")
+    p.add_argument("--backends", default="chroma,numpy")
+    p.add_argument("--iterations", type=int, default=500)
+    p.add_argument("--k", type=int, default=3)
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    p.add_argument("--child", default="", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.iterations, args.k)))
+        return
+
+    rows: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="kb_backends_") as tmp:
+        env = dict(os.environ)
+        # Fresh stores so both backends index the same corpus.
+        env["CHROMA_KNOWLEDGE_DIR"] = str(Path(tmp) / "chroma")
+        env["NUMPY_KNOWLEDGE_DIR"] = str(Path(tmp) / "numpy")
+        for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+            # First run builds the index; the measured run loads it like a normal restart would.
+            cmd = [sys.executable, __file__, "--child", backend, "--iterations", str(args.iterations), "--k", str(args.k)]
+            subprocess.run(cmd, env=env, cwd=_REPO_ROOT, check=True, capture_output=True)
+            out = subprocess.run(cmd, env=env, cwd=_REPO_ROOT, check=True, capture_output=True, text=True)
+            row = json.loads(out.stdout.strip().splitlines()[-1])
+            rows.append(row)
+            print(
+                f"{backend:>7}  init={row['init_s']}s  rss=+{row['rss_store_mb']}MB  "
+                f"e2e p50={row['e2e_ms_p50']}ms p95={row['e2e_ms_p95']}ms  "
+                f"store p50={row['store_ms_p50']}ms p95={row['store_ms_p95']}ms"
+            )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Latency and recall@k of knowledge retrieval: dense (previous path) vs hybrid (dense + BM25),
+with and without the structured metadata prefilter.
+
+Labels come from the knowledge base itself: for every activity/genre value shared by
+at least `--min-relevant` items, the query "música para <valor>" should return those items.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from vectorstores import initialize_knowledge_vectorstore
+from vectorstores.hybrid import knowledge_filter, search_knowledge
+from vectorstores.stores import knowledge_token
+
+
+def _labeled_queries(min_relevant: int) -> list[dict[str, Any]]:
+    items = json.loads(Path("data/knowledge_base.json").read_text(encoding="utf-8"))
+    relevant: dict[tuple[str, str], set[str]] = {}
+    for item in items:
+        for field in ("actividad", "genero"):
+            raw = (item.get("metadata") or {}).get(field) or []
+            values = raw if isinstance(raw, list) else str(raw).split(",")
+            for v in values:
+                if knowledge_token(v):
+                    relevant.setdefault((field, v.strip()), set()).add(item["id"])
+    return [
+        {"field": field, "value": value, "query": f"música para {value}", "relevant": ids}
+        for (field, value), ids in sorted(relevant.items())
+        if len(ids) >= min_relevant
+    ]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Compare dense vs hybrid knowledge retrieval.")
+    p.add_argument("--k", type=int, default=3)
+    p.add_argument("--min-relevant", type=int, default=3)
+    p.add_argument("--repeat", type=int, default=3, help="Timed repetitions per query")
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+
+    store = initialize_knowledge_vectorstore()
+    queries = _labeled_queries(args.min_relevant)
+    if not queries:
+        raise SystemExit("No labeled queries (knowledge base empty?)")
+
+    variants = [
+        ("dense", "dense", False),
+        ("hybrid", "hybrid", False),
+        ("dense+filter", "dense", True),
+        ("hybrid+filter", "hybrid", True),
+    ]
+    # Warm up embedding model and BM25 index so the first variant is not penalized.
+    search_knowledge(store, "warmup", args.k, mode="hybrid")
+
+    rows: list[dict[str, Any]] = []
+    for name, mode, use_filter in variants:
+        latencies: list[float] = []
+        recalls: list[float] = []
+        for q in queries:
+            where = knowledge_filter(**{q["field"]: q["value"]}) if use_filter else None
+            results: list[Any] = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                results = search_knowledge(store, q["query"], args.k, where, mode=mode)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            got = {str(doc.metadata.get("id")) for doc, _ in results}
+            recalls.append(len(got & q["relevant"]) / min(args.k, len(q["relevant"])))
+        row = {
+            "variant": name,
+            "queries": len(queries),
+            "k": args.k,
+            "recall_at_k": round(statistics.mean(recalls), 4),
+            "latency_ms_p50": round(statistics.median(latencies), 3),
+            "latency_ms_p95": round(_percentile(latencies, 95), 3),
+        }
+        rows.append(row)
+        print(
+            f"{name:>14}  recall@{args.k}={row['recall_at_k']:.3f}  "
+            f"p50={row['latency_ms_p50']}ms  p95={row['latency_ms_p95']}ms"
+        )
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+LLM scheduler under a burst, against a stub model with a simulated provider quota
+(429 RESOURCE_EXHAUSTED beyond --quota-rpm calls/min, plus random --error-rate 429s).
+
+Interactive and batch (benchmark-runner priority) callers hit an agent at the same
+time, with and without the scheduler middleware. Reports successes, 429s that reached
+the caller, calls the scheduler shed (LLMRateLimited) and latency per priority class.
+
+Example:
+    python scripts/bench_llm_scheduler.py --quota-rpm 60 --interactive 40 --batch 40 --scheduler-rpm 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from langchain.agents import create_agent
+from langchain_core.messages import HumanMessage
+
+from agents.llm import StubChatModel
+from agents.llm_scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    LLMRateLimited,
+    LLMSchedulerMiddleware,
+    _model_env_suffix,
+    get_llm_scheduler,
+    is_quota_error,
+    set_llm_priority,
+)
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _run(mode: str, args: argparse.Namespace) -> dict[str, Any]:
+    model_name = f"stub:bench-{mode}"
+    if mode == "scheduler":
+        suffix = _model_env_suffix(model_name)
+        os.environ[f"LLM_RPM_{suffix}"] = str(args.scheduler_rpm)
+        os.environ[f"LLM_MAX_CONCURRENCY_{suffix}"] = str(args.max_concurrency)
+        os.environ[f"LLM_QUEUE_MAX_WAIT_S_{suffix}"] = str(args.max_wait_s)
+        os.environ[f"LLM_BACKOFF_BASE_S_{suffix}"] = str(args.backoff_base_s)
+    model = StubChatModel(
+        model=model_name, latency_ms=args.latency_ms, quota_rpm=args.quota_rpm, error_rate=args.error_rate
+    )
+    agent = create_agent(model=model, tools=[], middleware=[LLMSchedulerMiddleware()] if mode == "scheduler" else [])
+
+    outcomes: dict[str, dict[str, Any]] = {
+        cls: {"ok": 0, "provider_429": 0, "shed": 0, "latencies": []} for cls in ("interactive", "batch")
+    }
+    lock = threading.Lock()
+    jobs = [("interactive", PRIORITY_INTERACTIVE)] * args.interactive + [("batch", PRIORITY_BATCH)] * args.batch
+    # Batch work is queued first, like a benchmark run already in progress when users arrive.
+    jobs.sort(key=lambda j: -j[1])
+
+    def one(job: tuple[str, int]) -> None:
+        cls, priority = job
+        set_llm_priority(priority)
+        t0 = time.perf_counter()
+        try:
+            agent.invoke({"messages": [HumanMessage(content="Recomendame música para estudiar")]})
+            kind = "ok"
+        except LLMRateLimited:
+            kind = "shed"
+        except Exception as e:
+            if not is_quota_error(e):
+                raise
+            kind = "provider_429"
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        with lock:
+            outcomes[cls][kind] += 1
+            if kind == "ok":
+                outcomes[cls]["latencies"].append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.interactive + args.batch) as pool:
+        list(pool.map(one, jobs))
+    row: dict[str, Any] = {"mode": mode, "elapsed_s": round(time.perf_counter() - started, 2)}
+    for cls, o in outcomes.items():
+        lat = o.pop("latencies")
+        o["latency_ms_p50"] = round(statistics.median(lat), 1) if lat else None
+        o["latency_ms_p99"] = round(_percentile(lat, 99), 1) if lat else None
+        row[cls] = o
+    if mode == "scheduler":
+        row["scheduler"] = get_llm_scheduler(model_name).snapshot()
+    return row
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark the LLM scheduler against a stub model with quota errors.")
+    p.add_argument("--modes", default="off,scheduler")
+    p.add_argument("--interactive", type=int, default=30, help="interactive calls in the burst")
+    p.add_argument("--batch", type=int, default=30, help="batch (benchmark runner) calls in the burst")
+    p.add_argument("--quota-rpm", type=int, default=40, help="simulated provider quota (requests/min)")
+    p.add_argument("--error-rate", type=float, default=0.05, help="probability of a random 429")
+    p.add_argument("--latency-ms", type=float, default=50.0)
+    p.add_argument("--scheduler-rpm", type=float, default=40, help="LLM_RPM given to the scheduler (the quota)")
+    p.add_argument("--max-concurrency", type=int, default=8)
+    p.add_argument("--max-wait-s", type=float, default=90.0)
+    p.add_argument("--backoff-base-s", type=float, default=0.5)
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+
+    rows = []
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        row = _run(mode, args)
+        rows.append(row)
+        print(f"{mode:>9}  elapsed={row['elapsed_s']}s")
+        for cls in ("interactive", "batch"):
+            o = row[cls]
+            print(
+                f"           {cls:<11} ok={o['ok']:<4} provider_429={o['provider_429']:<4} shed={o['shed']:<4} "
+                f"p50={o['latency_ms_p50']}ms p99={o['latency_ms_p99']}ms"
+            )
+        if "scheduler" in row:
+            s = row["scheduler"]
+            print(f"           scheduler retries={s['retries']} quota_errors={s['quota_errors']} deadline={s['deadline_exceeded']}")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Memory dump/restore vs re-embedding.
+
+Seeds a memory store with `--docs` synthetic contexts (random unit vectors, the metadata
+layout save_context writes, spread over `--users` users), then measures:
+
+- export: seconds and dump size (vectors + documents + metadata)
+- import into an empty store: seconds and docs/s (bulk upsert, no embedding calls)
+- re-ingest baseline on `--reembed-sample` docs, extrapolated to `--docs`: what import
+  replaces, i.e. embedding through the configured model plus the same batched upsert and
+  recency-index writes import does (embed and write seconds reported separately); the
+  speedup compares import against that whole path
+
+Everything runs on temp dirs (memory store, recency index DB). With EMBEDDINGS_PROVIDER=fake
+embedding is nearly free, so the re-ingest baseline only means something with the real
+model (fastembed/google); export/import numbers do not depend on it:
+    EMBEDDINGS_PROVIDER=fake python scripts/bench_memory_dump.py --docs 100000 --reembed-sample 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+_MOODS = ["relajado", "energetico", "triste", "concentrado", "feliz"]
+_WEATHERS = ["despejado", "nublado", "lluvia", "tormenta", "niebla"]
+_PERIODS = ["manana", "tarde", "noche"]
+
+
+def _seed(n_docs: int, n_users: int, dim: int, batch: int) -> float:
+    from vectorstores.stores import SHARED_MEMORY_COLLECTION, _memory_store_for_collection
+
+    rng = np.random.default_rng(0)
+    collection = _memory_store_for_collection(SHARED_MEMORY_COLLECTION)._collection
+    now = time.time()
+    started = time.perf_counter()
+    for start in range(0, n_docs, batch):
+        count = min(batch, n_docs - start)
+        vecs = rng.standard_normal((count, dim)).astype(np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        ids, docs, metas = [], [], []
+        for i in range(start, start + count):
+            ts = now - (n_docs - i) * 60
+            ids.append(f"ctx_bench_{i:08d}")
+            docs.append(f"Usuario: contexto {i} ({_MOODS[i % 5]}, {_WEATHERS[i % 5]})\nAsistente: playlist {i % 7}")
+            metas.append(
+                {
+                    "user_id": i % n_users + 1,
+                    "ts": ts,
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)),
+                    "mood": _MOODS[i % 5],
+                    "weather": _WEATHERS[i % 5],
+                    "time_period": _PERIODS[i % 3],
+                    "playlist_recommended": f"Playlist {i % 7}",
+                    "id": f"ctx_bench_{i:08d}",
+                }
+            )
+        collection.upsert(ids=ids, embeddings=vecs, documents=docs, metadatas=metas)
+    return time.perf_counter() - started
+
+
+def _use_memory_dir(path: str) -> None:
+    from vectorstores.stores import reset_vectorstores
+
+    os.environ["CHROMA_MEMORY_DIR"] = path
+    reset_vectorstores(reset_memory=True)
+
+
+def _reingest(sample: int, batch: int) -> dict[str, float]:
+    from vectorstores.recency import record_recent_many
+    from vectorstores.stores import SHARED_MEMORY_COLLECTION, _memory_store_for_collection
+
+    store = _memory_store_for_collection(SHARED_MEMORY_COLLECTION)
+    now = time.time()
+    ids = [f"ctx_reembed_{i:08d}" for i in range(sample)]
+    texts = [f"Usuario: contexto re-embebido {i}\nAsistente: playlist {i % 7}" for i in range(sample)]
+    metas = [{"user_id": 1, "ts": now, "mood": _MOODS[i % 5], "id": ids[i]} for i in range(sample)]
+
+    embed_s = write_s = 0.0
+    for start in range(0, sample, batch):
+        chunk = slice(start, start + batch)
+        t0 = time.perf_counter()
+        vectors = store.embeddings.embed_documents(texts[chunk])
+        t1 = time.perf_counter()
+        store._collection.upsert(ids=ids[chunk], embeddings=vectors, documents=texts[chunk], metadatas=metas[chunk])
+        write_s += time.perf_counter() - t1
+        embed_s += t1 - t0
+    t0 = time.perf_counter()
+    record_recent_many([(doc_id, 1, now) for doc_id in ids])
+    write_s += time.perf_counter() - t0
+    return {"embed_seconds": embed_s, "write_seconds": write_s}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark binary memory export/import against re-embedding.")
+    p.add_argument("--docs", type=int, default=100_000, help="Contexts in the seeded store")
+    p.add_argument("--users", type=int, default=100, help="Users the contexts are spread over")
+    p.add_argument("--dim", type=int, default=int(os.getenv("FAKE_EMBEDDINGS_DIM", "384")), help="Vector dimension")
+    p.add_argument("--batch", type=int, default=5000, help="Documents per Chroma write/read")
+    p.add_argument("--reembed-sample", type=int, default=2000, help="Docs embedded for the re-ingest baseline (0 = skip)")
+    p.add_argument("--out", default="", help="Write the JSON report here too")
+    args = p.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_memory_dump_"))
+    # Isolated recency index (import writes one row per context).
+    os.environ["DATABASE_URL"] = f"sqlite:///{work / 'app.db'}"
+    try:
+        from vectorstores.memory_dump import export_memory, import_memory
+        from vectorstores.stores import SHARED_MEMORY_COLLECTION, _memory_store_for_collection
+
+        _use_memory_dir(str(work / "source"))
+        seed_s = _seed(args.docs, args.users, args.dim, args.batch)
+
+        dump = str(work / "memory.npz")
+        exported = export_memory(dump, batch=args.batch)
+
+        _use_memory_dir(str(work / "target"))
+        imported = import_memory(dump, batch=args.batch, force=True)
+        restored = _memory_store_for_collection(SHARED_MEMORY_COLLECTION)._collection
+        probe = restored.get(ids=["ctx_bench_00000000"], include=["embeddings"])
+
+        report = {
+            "docs": args.docs,
+            "users": args.users,
+            "dim": args.dim,
+            "seed_seconds": round(seed_s, 3),
+            "export": exported,
+            "import": imported,
+            "restored_count": restored.count(),
+            "restored_vector_dim": len(probe["embeddings"][0]) if len(probe["ids"]) else 0,
+        }
+        if args.reembed_sample > 0:
+            _use_memory_dir(str(work / "reembed"))
+            timings = _reingest(args.reembed_sample, args.batch)
+            total_s = timings["embed_seconds"] + timings["write_seconds"]
+            rate = args.reembed_sample / total_s
+            report["reingest"] = {
+                "sample_docs": args.reembed_sample,
+                "embed_seconds": round(timings["embed_seconds"], 3),
+                "write_seconds": round(timings["write_seconds"], 3),
+                "docs_per_s": round(rate, 1),
+                "estimated_seconds_for_all": round(args.docs / rate, 1),
+            }
+            # Same work minus the embedding calls: import vs embed + upsert + recency index.
+            report["import_speedup_vs_reingest"] = round(imported["docs_per_s"] / rate, 1) if imported["docs_per_s"] else None
+
+        print(json.dumps(report, indent=2))
+        if args.out:
+            Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.out).write_text(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Filtered memory query latency per partitioning strategy (shared | user | bucket).
+
+Seeds synthetic contexts with random embeddings (no embedding model involved) and
+times the same `query(where={"user_id": ...})` that get_similar_contexts runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import chromadb
+import numpy as np
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from vectorstores.stores import memory_collection_name
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _seed(client: Any, *, users: int, docs_per_user: int, dim: int, strategy: str, buckets: int, rng: np.random.Generator) -> float:
+    batch_size = getattr(client, "get_max_batch_size", lambda: 5000)()
+    pending: dict[str, dict[str, list[Any]]] = {}
+    started = time.perf_counter()
+
+    def flush(name: str) -> None:
+        g = pending.pop(name)
+        coll = client.get_or_create_collection(name)
+        for i in range(0, len(g["ids"]), batch_size):
+            coll.add(
+                ids=g["ids"][i : i + batch_size],
+                embeddings=g["embeddings"][i : i + batch_size],
+                documents=g["documents"][i : i + batch_size],
+                metadatas=g["metadatas"][i : i + batch_size],
+            )
+
+    for uid in range(1, users + 1):
+        name = memory_collection_name(uid, strategy=strategy, buckets=buckets)
+        g = pending.setdefault(name, {"ids": [], "embeddings": [], "documents": [], "metadatas": []})
+        vecs = rng.standard_normal((docs_per_user, dim), dtype=np.float32)
+        for j in range(docs_per_user):
+            g["ids"].append(f"u{uid}_{j}")
+            g["embeddings"].append(vecs[j].tolist())
+            g["documents"].append(f"Usuario {uid}: contexto sintético {j}")
+            g["metadatas"].append({"user_id": uid, "ts": float(j)})
+        if len(g["ids"]) >= batch_size:
+            flush(name)
+    for name in list(pending):
+        flush(name)
+    return time.perf_counter() - started
+
+
+def _run(args: argparse.Namespace, users: int, strategy: str) -> dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    tmp = Path(tempfile.mkdtemp(prefix=f"mem_{strategy}_{users}_"))
+    try:
+        client = chromadb.PersistentClient(path=str(tmp))
+        seed_s = _seed(
+            client,
+            users=users,
+            docs_per_user=args.docs_per_user,
+            dim=args.dim,
+            strategy=strategy,
+            buckets=args.buckets,
+            rng=rng,
+        )
+
+        picker = random.Random(args.seed)
+        latencies: list[float] = []
+        for _ in range(args.queries):
+            uid = picker.randint(1, users)
+            coll = client.get_collection(memory_collection_name(uid, strategy=strategy, buckets=args.buckets))
+            q = rng.standard_normal(args.dim, dtype=np.float32).tolist()
+            t0 = time.perf_counter()
+            coll.query(query_embeddings=[q], n_results=args.top_k, where={"user_id": uid})
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        return {
+            "strategy": strategy,
+            "users": users,
+            "docs": users * args.docs_per_user,
+            "seed_s": round(seed_s, 3),
+            "query_ms_p50": round(statistics.median(latencies), 3),
+            "query_ms_p95": round(_percentile(latencies, 95), 3),
+            "query_ms_p99": round(_percentile(latencies, 99), 3),
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark memory query latency per partitioning strategy.")
+    p.add_argument("--users", default="10,1000,10000", help="Comma-separated user counts")
+    p.add_argument("--strategies", default="shared,bucket,user", help="Comma-separated strategies")
+    p.add_argument("--buckets", type=int, default=64)
+    p.add_argument("--docs-per-user", type=int, default=20)
+    p.add_argument("--dim", type=int, default=384, help="Embedding size (bge-small = 384)")
+    p.add_argument("--queries", type=int, default=300)
+    p.add_argument("--top-k", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+
+    rows: list[dict[str, Any]] = []
+    for users in [int(u) for u in args.users.split(",") if u.strip()]:
+        for strategy in [s.strip() for s in args.strategies.split(",") if s.strip()]:
+            row = _run(args, users, strategy)
+            rows.append(row)
+            print(
+                f"{strategy:>6} users={users:<6} docs={row['docs']:<7} seed={row['seed_s']}s "
+                f"p50={row['query_ms_p50']}ms p95={row['query_ms_p95']}ms p99={row['query_ms_p99']}ms"
+            )
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Memory vector store at scale: docs per user x users per collection.
+
+Each scenario seeds one memory collection with `users_per_collection` users holding
+`docs_per_user` synthetic contexts each (random unit embeddings and the metadata layout
+save_context writes, no embedding model involved), then measures:
+
+- insert throughput while seeding (docs/s, batched adds)
+- single-context upsert latency on the full collection (what save_context pays)
+- user-filtered top-k query latency (what get_similar_contexts runs), p50/p95/p99
+- on-disk size and resident memory (of this process, or of the Chroma server)
+
+Every scenario runs in a fresh subprocess so RSS is not shared between scenarios.
+Scenarios whose total docs exceed --max-total-docs are skipped. Results are written as
+JSON ({"meta", "results"}) with --out, to compare backends and configurations.
+
+Backends:
+- chroma: chromadb.PersistentClient on a temp dir (the default API setup)
+- chroma-server: a local `chroma run` on a temp dir, through HttpClient (CHROMA_SERVER_HOST)
+
+Examples:
+    python scripts/bench_memory_scale.py --docs-per-user 1000 --users-per-collection 1,10
+    python scripts/bench_memory_scale.py --docs-per-user 1000,10000,100000 --users-per-collection 1,10,100,1000 \\
+        --max-total-docs 2000000 --backends chroma,chroma-server --out .bench/memory_scale.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+_COLLECTION = "bench_memory_scale"
+_MOODS = ["relajado", "energético", "melancólico", "concentrado", "feliz"]
+_WEATHERS = ["despejado", "nublado", "lluvia", "tormenta", "niebla"]
+_PERIODS = ["mañana", "tarde", "noche"]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _dir_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _proc_memory(pid: Optional[int] = None) -> dict[str, int]:
+    """VmRSS / VmHWM (peak) in bytes from /proc (Linux); empty elsewhere."""
+    out: dict[str, int] = {}
+    try:
+        for line in Path(f"/proc/{pid or 'self'}/status").read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                out["rss_bytes" if key == "VmRSS" else "peak_rss_bytes"] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return out
+
+
+def _unit_vectors(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    v = rng.standard_normal((n, dim), dtype=np.float32)
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    return v
+
+
+def _metadata(uid: int, j: int, ts: float) -> dict[str, Any]:
+    # Same keys save_context stores.
+    return {
+        "user_id": uid,
+        "ts": ts,
+        "timestamp": datetime.fromtimestamp(ts).isoformat(),
+        "mood": _MOODS[j % len(_MOODS)],
+        "weather": _WEATHERS[j % len(_WEATHERS)],
+        "time_period": _PERIODS[j % len(_PERIODS)],
+    }
+
+
+# --- one scenario (runs in its own subprocess) ----------------------------------
+
+
+def _scenario(cfg: dict[str, Any]) -> dict[str, Any]:
+    import chromadb
+
+    rng = np.random.default_rng(cfg["seed"])
+    tmp = Path(tempfile.mkdtemp(prefix="mem_scale_"))
+    server: Optional[subprocess.Popen] = None
+    try:
+        if cfg["backend"] == "chroma-server":
+            server, port = _start_chroma_server(str(tmp))
+            client = chromadb.HttpClient(host="127.0.0.1", port=port)
+        else:
+            client = chromadb.PersistentClient(path=str(tmp))
+        coll = client.get_or_create_collection(_COLLECTION, metadata=cfg["collection_metadata"] or None)
+        batch_size = min(cfg["batch_size"], getattr(client, "get_max_batch_size", lambda: 5000)())
+
+        dim, upc, dpu = cfg["dim"], cfg["users_per_collection"], cfg["docs_per_user"]
+        total = upc * dpu
+        base_ts = time.time() - total
+        seed_s = 0.0
+        # Users interleaved per batch, like contexts arriving over time from many users.
+        for start in range(0, total, batch_size):
+            idx = np.arange(start, min(total, start + batch_size))
+            uids = idx % upc + 1
+            js = idx // upc
+            vecs = _unit_vectors(rng, len(idx), dim)
+            ids = [f"u{u}_{j}" for u, j in zip(uids, js)]
+            docs = [f"Usuario: contexto sintético {j} del usuario {u}\nAsistente: playlist {j % 5}" for u, j in zip(uids, js)]
+            metas = [_metadata(int(u), int(j), base_ts + float(i)) for u, j, i in zip(uids, js, idx)]
+            t0 = time.perf_counter()
+            coll.add(ids=ids, embeddings=vecs, documents=docs, metadatas=metas)
+            seed_s += time.perf_counter() - t0
+
+        upsert_ms: list[float] = []
+        for k in range(cfg["upserts"]):
+            uid = int(rng.integers(1, upc + 1))
+            vec = _unit_vectors(rng, 1, dim)
+            t0 = time.perf_counter()
+            coll.upsert(
+                ids=[f"u{uid}_new{k}"],
+                embeddings=vec,
+                documents=[f"Usuario: contexto nuevo {k}"],
+                metadatas=[_metadata(uid, k, time.time())],
+            )
+            upsert_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        query_ms: list[float] = []
+        for _ in range(cfg["queries"]):
+            uid = int(rng.integers(1, upc + 1))
+            q = _unit_vectors(rng, 1, dim)
+            t0 = time.perf_counter()
+            coll.query(query_embeddings=q, n_results=cfg["top_k"], where={"user_id": uid})
+            query_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        row: dict[str, Any] = {
+            "backend": cfg["backend"],
+            "collection_metadata": cfg["collection_metadata"],
+            "docs_per_user": dpu,
+            "users_per_collection": upc,
+            "total_docs": total,
+            "dim": dim,
+            "insert_docs_per_s": round(total / seed_s, 1) if seed_s else None,
+            "seed_s": round(seed_s, 3),
+            "upsert_ms_p50": round(statistics.median(upsert_ms), 3) if upsert_ms else None,
+            "upsert_ms_p99": round(_percentile(upsert_ms, 99), 3) if upsert_ms else None,
+            "query_ms_p50": round(statistics.median(query_ms), 3),
+            "query_ms_p95": round(_percentile(query_ms, 95), 3),
+            "query_ms_p99": round(_percentile(query_ms, 99), 3),
+        }
+        # The server flushes on its own: give it a moment before sizing the directory.
+        if server is not None:
+            time.sleep(1.0)
+        row["disk_bytes"] = _dir_bytes(tmp)
+        row["memory_process"] = "chroma-server" if server is not None else "client"
+        row.update(_proc_memory(server.pid if server is not None else None))
+        return row
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_chroma_server(path: str) -> tuple[subprocess.Popen, int]:
+    import urllib.request
+
+    port = _free_port()
+    cli = shutil.which("chroma") or str(Path(sys.executable).with_name("chroma"))
+    proc = subprocess.Popen(
+        [cli, "run", "--path", path, "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/v2/heartbeat", timeout=1.0) as r:
+                if r.status == 200:
+                    return proc, port
+        except OSError:
+            pass
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Chroma server did not start")
+
+
+# --- driver ---------------------------------------------------------------------
+
+
+def _ints(raw: str) -> list[int]:
+    return [int(x) for x in raw.split(",") if x.strip()]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Memory vector store scaling benchmark (insert, upsert, filtered query, disk, RSS).")
+    p.add_argument("--docs-per-user", default="1000,10000", help="Comma-separated contexts per user")
+    p.add_argument("--users-per-collection", default="1,10,100", help="Comma-separated users sharing the collection")
+    p.add_argument("--max-total-docs", type=int, default=1_000_000, help="Skip scenarios above this many docs")
+    p.add_argument("--backends", default="chroma", help="chroma,chroma-server")
+    p.add_argument("--collection-metadata", default="", help='JSON collection metadata, e.g. \'{"hnsw:M": 32}\'')
+    p.add_argument("--dim", type=int, default=384, help="Embedding size (bge-small = 384)")
+    p.add_argument("--batch-size", type=int, default=5000)
+    p.add_argument("--queries", type=int, default=300)
+    p.add_argument("--upserts", type=int, default=100)
+    p.add_argument("--top-k", type=int, default=3)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--timeout", type=float, default=7200.0, help="Per-scenario timeout (s)")
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    p.add_argument("--scenario", default="", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.scenario:
+        print(json.dumps(_scenario(json.loads(args.scenario))))
+        return
+
+    metadata = json.loads(args.collection_metadata) if args.collection_metadata else {}
+    results: list[dict[str, Any]] = []
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        for dpu in _ints(args.docs_per_user):
+            for upc in _ints(args.users_per_collection):
+                if dpu * upc > args.max_total_docs:
+                    print(f"{backend:>13} docs/user={dpu:<7} users/coll={upc:<5} skipped (> --max-total-docs)")
+                    continue
+                cfg = {
+                    "backend": backend,
+                    "collection_metadata": metadata,
+                    "docs_per_user": dpu,
+                    "users_per_collection": upc,
+                    "dim": args.dim,
+                    "batch_size": args.batch_size,
+                    "queries": args.queries,
+                    "upserts": args.upserts,
+                    "top_k": args.top_k,
+                    "seed": args.seed,
+                }
+                proc = subprocess.run(
+                    [sys.executable, __file__, "--scenario", json.dumps(cfg)],
+                    cwd=_REPO_ROOT,
+                    capture_output=True,
+                    text=True,
+                    timeout=args.timeout,
+                )
+                if proc.returncode != 0:
+                    err = (proc.stderr.strip().splitlines() or ["?"])[-1]
+                    print(f"{backend:>13} docs/user={dpu:<7} users/coll={upc:<5} FAILED: {err}")
+                    results.append({**cfg, "error": err})
+                    continue
+                row = json.loads(proc.stdout.strip().splitlines()[-1])
+                results.append(row)
+                print(
+                    f"{backend:>13} docs/user={dpu:<7} users/coll={upc:<5} total={row['total_docs']:<8} "
+                    f"insert={row['insert_docs_per_s']}/s upsert_p50={row['upsert_ms_p50']}ms "
+                    f"query_p50={row['query_ms_p50']}ms p99={row['query_ms_p99']}ms "
+                    f"disk={row['disk_bytes'] / 1e6:.1f}MB rss={row.get('rss_bytes', 0) / 1e6:.0f}MB"
+                )
+
+    if args.out:
+        import chromadb
+
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "benchmark": "memory_scale",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "chromadb": chromadb.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "scenario")},
+        }
+        out.write_text(json.dumps({"meta": meta, "results": results}, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
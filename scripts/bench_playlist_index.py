@@ -0,0 +1,182 @@
+"""
+Playlist index: prompt tokens and latency of list_playlists, full catalog vs top-K.
+
+For every catalog size in `--sizes` a fresh user gets that many synthetic playlists
+(activity x mood x genre descriptions) created through db.repositories.playlists, so
+the index is built by the same background hooks the API uses. Then, per mood/activity
+query:
+
+- tokens: approximate tokens of the tool output (what every later model call of the turn
+  carries as input), full catalog vs PLAYLIST_TOP_K
+- latency: format_playlists p50/p95, full vs top-K (DB read + one query embedding + ANN)
+- hit rate: share of the top-K whose activity matches the query's; only meaningful with
+  a real embedding model (EMBEDDINGS_PROVIDER=fake vectors are random)
+- write path: per-playlist create latency (DB commit + queueing the index update), time
+  for the background writer to index the catalog, the first search of a user (one
+  reconcile scan per process) and a search right after a create, update and delete
+  (waits for those three index updates, no re-scan)
+
+Everything runs on temp dirs (SQLite DB, Chroma memory dir):
+    python scripts/bench_playlist_index.py --sizes 10,100,1000 --top-k 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+_ACTIVITIES = ["estudio", "gimnasio", "correr", "cocinar", "manejar", "dormir", "fiesta", "trabajo"]
+_MOODS = ["relajado", "energético", "melancólico", "concentrado", "feliz"]
+_GENRES = ["lo-fi", "rock", "jazz", "electrónica", "indie", "clásica", "reggaeton", "ambient"]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _approx_tokens(text: str) -> int:
+    from agents.llm import _approx_tokens as approx
+
+    return approx(text)
+
+
+def _playlist(i: int) -> tuple[str, str, str]:
+    activity = _ACTIVITIES[i % len(_ACTIVITIES)]
+    mood = _MOODS[(i // len(_ACTIVITIES)) % len(_MOODS)]
+    genre = _GENRES[(i // 3) % len(_GENRES)]
+    description = f"{genre.capitalize()} para {activity}, con un clima {mood}. Selección curada número {i}."
+    return f"{activity.capitalize()} {genre} {i}", description, activity
+
+
+def _run_size(size: int, top_k: int, queries: int) -> dict[str, Any]:
+    from api.user_context import reset_current_user_id, set_current_user_id
+    from db.models import User
+    from db.repositories.playlists import create_playlist_for_user, delete_playlist_for_user, update_playlist_for_user
+    from db.session import SessionLocal
+    from tools.playlists import format_playlists
+    from vectorstores.playlist_index import wait_for_index
+
+    with SessionLocal() as db:
+        user = User(username=f"bench_playlists_{size}", password_hash="-")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+        create_ms: list[float] = []
+        activity_of: dict[str, str] = {}
+        for i in range(size):
+            name, description, activity = _playlist(i)
+            activity_of[name] = activity
+            t0 = time.perf_counter()
+            p = create_playlist_for_user(db, user_id=user_id, name=name, description=description)
+            create_ms.append((time.perf_counter() - t0) * 1000.0)
+        t0 = time.perf_counter()
+        wait_for_index(user_id, timeout=600)
+        index_ms = (time.perf_counter() - t0) * 1000.0
+
+    token = set_current_user_id(user_id)
+    try:
+        # The first search of the process checks the user's index against the DB once.
+        t0 = time.perf_counter()
+        format_playlists(user_id, "estudio concentrado", top_k)
+        first_search_ms = (time.perf_counter() - t0) * 1000.0
+
+        # Writes update the index in the background; the next search waits for them.
+        with SessionLocal() as db:
+            extra = create_playlist_for_user(db, user_id=user_id, name="Temporal", description="Para borrar")
+            delete_playlist_for_user(db, user_id=user_id, playlist_id=extra.id)
+            update_playlist_for_user(db, user_id=user_id, playlist_id=p.id, description=f"{description} (editada)")
+        t0 = time.perf_counter()
+        format_playlists(user_id, "estudio concentrado", top_k)
+        search_after_change_ms = (time.perf_counter() - t0) * 1000.0
+
+        full_ms: list[float] = []
+        topk_ms: list[float] = []
+        full_tokens: list[int] = []
+        topk_tokens: list[int] = []
+        hits: list[float] = []
+        for q in range(queries):
+            activity = _ACTIVITIES[q % len(_ACTIVITIES)]
+            query = f"{activity} {_MOODS[q % len(_MOODS)]}"
+            t0 = time.perf_counter()
+            full = format_playlists(user_id, query, 0)
+            full_ms.append((time.perf_counter() - t0) * 1000.0)
+            t0 = time.perf_counter()
+            top = format_playlists(user_id, query, top_k)
+            topk_ms.append((time.perf_counter() - t0) * 1000.0)
+            full_tokens.append(_approx_tokens(full))
+            topk_tokens.append(_approx_tokens(top))
+            names = [line[2:].split(":", 1)[0] for line in top.splitlines() if line.startswith("- ")]
+            if size > top_k and names:
+                hits.append(sum(activity_of.get(n) == activity for n in names) / len(names))
+    finally:
+        reset_current_user_id(token)
+
+    return {
+        "playlists": size,
+        "top_k": top_k,
+        "tokens_full": round(statistics.mean(full_tokens)),
+        "tokens_top_k": round(statistics.mean(topk_tokens)),
+        "token_reduction": round(1 - statistics.mean(topk_tokens) / statistics.mean(full_tokens), 3),
+        "latency_ms_full_p50": round(statistics.median(full_ms), 2),
+        "latency_ms_full_p95": round(_percentile(full_ms, 95), 2),
+        "latency_ms_top_k_p50": round(statistics.median(topk_ms), 2),
+        "latency_ms_top_k_p95": round(_percentile(topk_ms, 95), 2),
+        "activity_hit_rate": round(statistics.mean(hits), 3) if hits else None,
+        "create_ms_p50": round(statistics.median(create_ms), 2),
+        "index_catalog_ms": round(index_ms, 2),
+        "first_search_ms": round(first_search_ms, 2),
+        "search_after_change_ms": round(search_after_change_ms, 2),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark list_playlists tokens/latency, full catalog vs top-K index.")
+    p.add_argument("--sizes", default="10,100,1000", help="Catalog sizes (playlists per user)")
+    p.add_argument("--top-k", type=int, default=int(os.getenv("PLAYLIST_TOP_K", "8")))
+    p.add_argument("--queries", type=int, default=40, help="Mood/activity queries per size")
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix="bench_playlist_index_"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{work / 'app.db'}"
+    os.environ["CHROMA_MEMORY_DIR"] = str(work / "memory")
+    os.environ["PLAYLIST_TOP_K"] = str(args.top_k)
+    try:
+        from db.session import init_db
+
+        init_db()
+        rows = []
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            row = _run_size(size, args.top_k, args.queries)
+            rows.append(row)
+            print(
+                f"{size:>5} playlists  tokens full={row['tokens_full']} top{args.top_k}={row['tokens_top_k']} "
+                f"(-{row['token_reduction']:.0%})  latency p50 full={row['latency_ms_full_p50']}ms "
+                f"top{args.top_k}={row['latency_ms_top_k_p50']}ms  create p50={row['create_ms_p50']}ms  index={row['index_catalog_ms']}ms  "
+                f"first search={row['first_search_ms']}ms after change={row['search_after_change_ms']}ms  hit rate={row['activity_hit_rate']}"
+            )
+        if args.out:
+            Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.out).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
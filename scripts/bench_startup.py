@@ -0,0 +1,127 @@
+"""
+Startup benchmark: import-time breakdown of `api.app`, time-to-listen and time-to-ready.
+
+- import breakdown: `python -X importtime -c "import api.app"`, aggregated per top-level package
+- time-to-listen: process spawn -> first 200 from /health/live
+- time-to-ready:  process spawn -> first 200 from /health/ready (embeddings + vectorstores + agent)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _import_breakdown(top: int) -> dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.app"],
+        cwd=_REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    per_pkg: dict[str, int] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line.split("|")
+        if len(parts) != 3:
+            continue
+        self_us = int(parts[0].split(":")[1].strip())
+        name = parts[2].strip()
+        pkg = name.split(".")[0]
+        per_pkg[pkg] = per_pkg.get(pkg, 0) + self_us
+        total_us += self_us
+    ranked = sorted(per_pkg.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000.0, 1),
+        "top_packages_ms": {pkg: round(us / 1000.0, 1) for pkg, us in ranked},
+        "ok": proc.returncode == 0,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1.0) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+def _serve_timings(timeout_s: float) -> dict[str, Any]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=_REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=dict(os.environ),
+    )
+    out: dict[str, Any] = {"time_to_listen_s": None, "time_to_ready_s": None}
+    try:
+        while time.perf_counter() - started < timeout_s and proc.poll() is None:
+            if out["time_to_listen_s"] is None and _status(f"{base}/health/live") == 200:
+                out["time_to_listen_s"] = round(time.perf_counter() - started, 3)
+            if out["time_to_listen_s"] is not None and _status(f"{base}/health/ready") == 200:
+                out["time_to_ready_s"] = round(time.perf_counter() - started, 3)
+                with urllib.request.urlopen(f"{base}/health/ready", timeout=1.0) as r:
+                    out["warmup"] = json.loads(r.read().decode("utf-8")).get("warmup")
+                break
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return out
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Measure API import time, time-to-listen and time-to-ready.")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--top", type=int, default=12, help="Packages to show in the import breakdown")
+    p.add_argument("--timeout", type=float, default=180.0)
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+
+    result: dict[str, Any] = {"imports": _import_breakdown(args.top), "runs": []}
+    print(f"import api.app: {result['imports']['total_ms']}ms")
+    for pkg, ms in result["imports"]["top_packages_ms"].items():
+        print(f"  {pkg:<28} {ms}ms")
+
+    for i in range(args.runs):
+        run = _serve_timings(args.timeout)
+        result["runs"].append(run)
+        print(f"run {i + 1}: listen={run['time_to_listen_s']}s ready={run['time_to_ready_s']}s warmup={run.get('warmup')}")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
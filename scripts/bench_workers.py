@@ -0,0 +1,222 @@
+"""
+Chat throughput scaling from 1 to N API workers with the stub LLM (no Gemini calls).
+
+For each worker count: fresh temp state (SQLite DB with WAL, sqlite checkpointer, a
+local Chroma server standing in for a shared vector store), prewarm once, start
+`uvicorn --workers N`, sign up users and hammer POST /chat from concurrent clients.
+
+Example:
+    python scripts/bench_workers.py --workers 1,2,4 --concurrency 32 --duration 20 --stub-cpu-ms 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _request(url: str, body: Optional[dict] = None, token: str = "", timeout: float = 60.0) -> tuple[int, Any]:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET")
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return r.status, json.loads(r.read().decode("utf-8") or "null")
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, OSError):
+        return 0, None
+
+
+def _wait_ready(base: str, workers: int, timeout_s: float) -> bool:
+    # Each worker warms up on its own: require a run of consecutive 200s so (almost) all are ready.
+    deadline = time.perf_counter() + timeout_s
+    streak = 0
+    while time.perf_counter() < deadline:
+        status, _ = _request(f"{base}/health/ready", timeout=2.0)
+        streak = streak + 1 if status == 200 else 0
+        if streak >= 4 * workers:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _start_chroma_server(path: str) -> tuple[subprocess.Popen, int]:
+    port = _free_port()
+    cli = shutil.which("chroma") or str(Path(sys.executable).with_name("chroma"))
+    proc = subprocess.Popen(
+        [cli, "run", "--path", path, "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        status, _ = _request(f"http://127.0.0.1:{port}/api/v2/heartbeat", timeout=1.0)
+        if status == 200:
+            return proc, port
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Chroma server did not start")
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def _drive(base: str, tokens: list[str], concurrency: int, duration_s: float) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors: dict[int, int] = {}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration_s
+    prompts = [
+        "Recomendame música para estudiar con lluvia",
+        "Estoy entrenando en el gimnasio, ¿qué escucho?",
+        "Algo tranquilo para cocinar a la noche",
+    ]
+
+    def client(i: int) -> None:
+        n = 0
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            status, _ = _request(
+                f"{base}/chat", {"message": prompts[(i + n) % len(prompts)]}, token=tokens[i % len(tokens)]
+            )
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            n += 1
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[status] = errors.get(status, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_ok": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "latency_ms_p50": round(statistics.median(latencies), 1) if latencies else None,
+        "latency_ms_p99": round(_percentile(latencies, 99), 1) if latencies else None,
+    }
+
+
+def _run(workers: int, args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="bench_workers_") as tmp:
+        chroma, chroma_port = _start_chroma_server(str(Path(tmp) / "chroma"))
+        env = dict(os.environ)
+        env.update(
+            {
+                "LLM_PROVIDER": "stub",
+                "STUB_LLM_LATENCY_MS": str(args.stub_latency_ms),
+                "STUB_LLM_CPU_MS": str(args.stub_cpu_ms),
+                "CHECKPOINTER": "sqlite",
+                "CHECKPOINT_DB": str(Path(tmp) / "checkpoints.db"),
+                "DATABASE_URL": f"sqlite:///{Path(tmp) / 'app.db'}",
+                "CHROMA_SERVER_HOST": "127.0.0.1",
+                "CHROMA_SERVER_PORT": str(chroma_port),
+                "CHROMA_MEMORY_DIR": str(Path(tmp) / "memory"),
+                "MEMORY_COMPACTION_INTERVAL_S": "0",
+            }
+        )
+        env.setdefault("JWT_SECRET", "bench-secret")
+        if args.embeddings:
+            env["EMBEDDINGS_PROVIDER"] = args.embeddings
+
+        subprocess.run([sys.executable, "scripts/prewarm.py"], cwd=_REPO_ROOT, env=env, check=True, capture_output=True)
+
+        port = _free_port()
+        base = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=_REPO_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not _wait_ready(base, workers, args.timeout):
+                raise RuntimeError(f"API with {workers} workers did not become ready")
+            tokens = []
+            for u in range(args.users):
+                status, body = _request(f"{base}/auth/signup", {"username": f"bench_{u}", "password": "bench-pass"})
+                if status != 200:
+                    raise RuntimeError(f"signup failed ({status})")
+                tokens.append(body["access_token"])
+            _drive(base, tokens, args.concurrency, min(3.0, args.duration))  # warm every worker
+            return {"workers": workers, **_drive(base, tokens, args.concurrency, args.duration)}
+        finally:
+            _stop(server)
+            _stop(chroma)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark /chat throughput vs number of API workers (stub LLM).")
+    p.add_argument("--workers", default="1,2,4")
+    p.add_argument("--concurrency", type=int, default=32, help="concurrent HTTP clients")
+    p.add_argument("--duration", type=float, default=20.0, help="measured seconds per worker count")
+    p.add_argument("--users", type=int, default=16)
+    p.add_argument("--stub-latency-ms", type=float, default=200.0, help="simulated LLM network wait per call")
+    p.add_argument("--stub-cpu-ms", type=float, default=10.0, help="simulated CPU work per LLM call")
+    p.add_argument("--embeddings", default="", help="override EMBEDDINGS_PROVIDER (e.g. fake for offline runs)")
+    p.add_argument("--timeout", type=float, default=180.0)
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+
+    rows: list[dict[str, Any]] = []
+    for n in [int(x) for x in args.workers.split(",") if x.strip()]:
+        row = _run(n, args)
+        if rows:
+            row["speedup"] = round(row["rps"] / rows[0]["rps"], 2) if rows[0]["rps"] else None
+        else:
+            row["speedup"] = 1.0
+        rows.append(row)
+        print(
+            f"workers={n:<3} {row['rps']:>8} req/s  p50={row['latency_ms_p50']}ms p99={row['latency_ms_p99']}ms  "
+            f"speedup={row['speedup']}x errors={row['errors']}"
+        )
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Ensure the repository root is on sys.path when running as a script (python scripts/compact_memory.py).
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from vectorstores.retention import RetentionPolicy, compact_memory
+
+
+def main() -> None:
+    env = RetentionPolicy.from_env()
+    p = argparse.ArgumentParser(description="Apply retention/dedup to the memory vectorstore and report what was reclaimed.")
+    p.add_argument("--max-docs", type=int, default=env.max_docs_per_user, help="Max contexts kept per user (0 = unlimited)")
+    p.add_argument("--max-age-days", type=float, default=env.max_age_days, help="Drop contexts older than this (0 = never)")
+    p.add_argument("--dedup-threshold", type=float, default=env.dedup_threshold, help="Cosine similarity to merge near-duplicates (0 = off)")
+    p.add_argument("--dry-run", action="store_true", help="Only report, do not delete anything")
+    args = p.parse_args()
+
+    policy = RetentionPolicy(
+        max_docs_per_user=args.max_docs,
+        max_age_days=args.max_age_days,
+        dedup_threshold=args.dedup_threshold,
+    )
+    report = compact_memory(policy=policy, dry_run=args.dry_run)
+    print(json.dumps(report.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
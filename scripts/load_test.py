@@ -0,0 +1,350 @@
+"""
+Synthetic HTTP load against the API: N users signed up through /auth/signup replay a
+weighted mix of chat turns, playlist CRUD and fast-path commands at a target rate
+(open loop: arrivals don't wait for earlier responses, like real clients).
+
+Targets:
+- asgi (default): `api.app:app` driven in process through httpx.ASGITransport
+- uvicorn: a local `uvicorn api.app:app` subprocess
+- --base-url: an already running server
+
+Offline by default (LLM_PROVIDER=stub, EMBEDDINGS_PROVIDER=fake, temp DB and Chroma
+dirs). Reports throughput, error rates and latency percentiles per operation.
+
+Example:
+    python scripts/load_test.py --users 20 --rate 30 --duration 20 \\
+        --mix chat=5,chat_simple=1,fast=2,playlists_list=2,playlist_create=1,playlist_update=1,playlist_delete=1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import httpx
+
+_CHAT_PROMPTS = [
+    "Recomendame música para estudiar con lluvia",
+    "Estoy entrenando en el gimnasio, ¿qué escucho?",
+    "Algo tranquilo para cocinar a la noche",
+    "Voy a manejar a la costa, poneme algo con energía",
+]
+_SIMPLE_PROMPTS = ["otra", "gracias", "¿cuál fue la última playlist que me recomendaste?"]
+_FAST_PROMPTS = ["help", "playlists", "hola"]
+
+DEFAULT_MIX = "chat=5,chat_simple=1,fast=2,playlists_list=2,playlist_create=1,playlist_update=1,playlist_delete=1"
+
+
+def _percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _parse_mix(raw: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in raw.split(","):
+        if part.strip():
+            name, _, weight = part.partition("=")
+            if name.strip() not in _OPS:
+                raise SystemExit(f"Unknown operation in --mix: {name!r} (valid: {', '.join(_OPS)})")
+            mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+class _User:
+    def __init__(self, name: str, token: str) -> None:
+        self.name = name
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.playlist_ids: list[int] = []
+        self.seq = 0
+
+
+# --- operations: each returns the HTTP response ---------------------------------
+
+
+async def _op_chat(c: httpx.AsyncClient, u: _User) -> httpx.Response:
+    return await c.post("/chat", json={"message": random.choice(_CHAT_PROMPTS)}, headers=u.headers)
+
+
+async def _op_chat_simple(c: httpx.AsyncClient, u: _User) -> httpx.Response:
+    return await c.post("/chat", json={"message": random.choice(_SIMPLE_PROMPTS)}, headers=u.headers)
+
+
+async def _op_fast(c: httpx.AsyncClient, u: _User) -> httpx.Response:
+    return await c.post("/chat", json={"message": random.choice(_FAST_PROMPTS)}, headers=u.headers)
+
+
+async def _op_playlists_list(c: httpx.AsyncClient, u: _User) -> httpx.Response:
+    return await c.get("/playlists", headers=u.headers)
+
+
+async def _op_playlist_create(c: httpx.AsyncClient, u: _User) -> httpx.Response:
+    u.seq += 1
+    r = await c.post(
+        "/playlists",
+        json={"name": f"Load {u.name} {u.seq}", "description": "Playlist sintética de carga: lo-fi y ambient."},
+        headers=u.headers,
+    )
+    if r.status_code == 200:
+        u.playlist_ids.append(int(r.json()["id"]))
+    return r
+
+
+async def _op_playlist_update(c: httpx.AsyncClient, u: _User) -> httpx.Response:
+    if not u.playlist_ids:
+        return await _op_playlist_create(c, u)
+    pid = random.choice(u.playlist_ids)
+    return await c.put(f"/playlists/{pid}", json={"description": f"Actualizada {time.time():.0f}"}, headers=u.headers)
+
+
+async def _op_playlist_delete(c: httpx.AsyncClient, u: _User) -> httpx.Response:
+    if not u.playlist_ids:
+        return await _op_playlist_create(c, u)
+    pid = u.playlist_ids.pop(random.randrange(len(u.playlist_ids)))
+    return await c.delete(f"/playlists/{pid}", headers=u.headers)
+
+
+_OPS = {
+    "chat": _op_chat,
+    "chat_simple": _op_chat_simple,
+    "fast": _op_fast,
+    "playlists_list": _op_playlists_list,
+    "playlist_create": _op_playlist_create,
+    "playlist_update": _op_playlist_update,
+    "playlist_delete": _op_playlist_delete,
+}
+
+
+# --- driver ---------------------------------------------------------------------
+
+
+async def _signup_users(c: httpx.AsyncClient, n: int) -> list[_User]:
+    users = []
+    run = f"{int(time.time()) % 100000}"
+    for i in range(n):
+        name = f"load_{run}_{i}"
+        r = await c.post("/auth/signup", json={"username": name, "password": "load-pass"})
+        if r.status_code != 200:
+            raise RuntimeError(f"signup failed ({r.status_code}): {r.text[:200]}")
+        users.append(_User(name, r.json()["access_token"]))
+    return users
+
+
+async def _drive(c: httpx.AsyncClient, users: list[_User], args: argparse.Namespace) -> dict[str, Any]:
+    mix = _parse_mix(args.mix)
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    inflight: set[asyncio.Task] = set()
+    not_sent = 0
+
+    async def one(op: str, user: _User) -> None:
+        t0 = time.perf_counter()
+        try:
+            r = await _OPS[op](c, user)
+            status = str(r.status_code)
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError:
+            status = "conn_error"
+        statuses[op][status] += 1
+        if status == "200":
+            latencies[op].append((time.perf_counter() - t0) * 1000.0)
+
+    interval = 1.0 / args.rate
+    started = time.perf_counter()
+    next_at = started
+    stop_at = started + args.duration
+    while next_at < stop_at:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # --poisson: exponential inter-arrival times (Poisson arrivals at --rate).
+        next_at += random.expovariate(1.0 / interval) if args.poisson else interval
+        if len(inflight) >= args.max_inflight:
+            not_sent += 1
+            continue
+        task = asyncio.create_task(one(random.choices(names, weights)[0], random.choice(users)))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.wait(set(inflight), timeout=args.timeout)
+    elapsed = time.perf_counter() - started
+
+    per_op: dict[str, Any] = {}
+    for op in names:
+        st = dict(statuses.get(op, {}))
+        total = sum(st.values())
+        lat = latencies.get(op, [])
+        per_op[op] = {
+            "requests": total,
+            "ok": len(lat),
+            "error_rate": round(1 - len(lat) / total, 4) if total else None,
+            "statuses": st,
+            "rps": round(len(lat) / elapsed, 2),
+            "latency_ms_p50": round(statistics.median(lat), 1) if lat else None,
+            "latency_ms_p95": round(_percentile(lat, 95), 1) if lat else None,
+            "latency_ms_p99": round(_percentile(lat, 99), 1) if lat else None,
+        }
+    sent = sum(o["requests"] for o in per_op.values())
+    ok = sum(o["ok"] for o in per_op.values())
+    return {
+        "target_rps": args.rate,
+        "elapsed_s": round(elapsed, 2),
+        "sent": sent,
+        "not_sent_max_inflight": not_sent,
+        "throughput_rps": round(ok / elapsed, 2),
+        "error_rate": round(1 - ok / sent, 4) if sent else None,
+        "per_op": per_op,
+    }
+
+
+def _offline_env(tmp: str, args: argparse.Namespace) -> dict[str, str]:
+    env = {
+        "LLM_PROVIDER": args.provider,
+        "STUB_LLM_LATENCY_MS": str(args.stub_latency_ms),
+        "STUB_LLM_CPU_MS": str(args.stub_cpu_ms),
+        "EMBEDDINGS_PROVIDER": args.embeddings,
+        "DATABASE_URL": f"sqlite:///{Path(tmp) / 'app.db'}",
+        "CHROMA_MEMORY_DIR": str(Path(tmp) / "memory"),
+        "CHROMA_KNOWLEDGE_DIR": str(Path(tmp) / "knowledge"),
+        "MEMORY_COMPACTION_INTERVAL_S": "0",
+    }
+    env.setdefault("JWT_SECRET", os.getenv("JWT_SECRET", "load-test-secret"))
+    return env
+
+
+async def _run_asgi(args: argparse.Namespace) -> dict[str, Any]:
+    from api import state
+    from api.app import app
+
+    # ASGITransport does not run lifespan events: run startup (DB + background warmup) and shutdown here.
+    async with app.router.lifespan_context(app):
+        if not await asyncio.to_thread(state.ready.wait, args.timeout):
+            raise RuntimeError(f"API did not become ready: {state.startup_error}")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as c:
+            users = await _signup_users(c, args.users)
+            return await _drive(c, users, args)
+
+
+async def _run_http(base_url: str, args: argparse.Namespace) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as c:
+        users = await _signup_users(c, args.users)
+        return await _drive(c, users, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_uvicorn(env: dict[str, str], timeout_s: float) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=_REPO_ROOT,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"{base}/health/ready", timeout=2.0).status_code == 200:
+                return proc, base
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("uvicorn did not become ready")
+
+
+def _print_report(report: dict[str, Any]) -> None:
+    print(
+        f"target={report['target_rps']} rps  sent={report['sent']}  throughput={report['throughput_rps']} rps  "
+        f"error_rate={report['error_rate']}  not_sent={report['not_sent_max_inflight']}  elapsed={report['elapsed_s']}s"
+    )
+    print(f"{'operation':<16} {'reqs':>6} {'ok':>6} {'err%':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}  statuses")
+    for op, o in report["per_op"].items():
+        err = f"{100 * o['error_rate']:.1f}" if o["error_rate"] is not None else "-"
+        print(
+            f"{op:<16} {o['requests']:>6} {o['ok']:>6} {err:>6} {o['rps']:>7} "
+            f"{str(o['latency_ms_p50']):>8} {str(o['latency_ms_p95']):>8} {str(o['latency_ms_p99']):>8}  {o['statuses']}"
+        )
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Synthetic mixed load against the API (stub LLM, offline by default).")
+    p.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    p.add_argument("--base-url", default="", help="drive an already running server instead (no temp state)")
+    p.add_argument("--users", type=int, default=20)
+    p.add_argument("--rate", type=float, default=20.0, help="target requests/second")
+    p.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    p.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight list")
+    p.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of a fixed interval")
+    p.add_argument("--max-inflight", type=int, default=256, help="arrivals beyond this many outstanding requests are not sent")
+    p.add_argument("--provider", default="stub", help="LLM_PROVIDER (stub|google)")
+    p.add_argument("--embeddings", default="fake", help="EMBEDDINGS_PROVIDER")
+    p.add_argument("--stub-latency-ms", type=float, default=200.0)
+    p.add_argument("--stub-cpu-ms", type=float, default=10.0)
+    p.add_argument("--timeout", type=float, default=120.0)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default="", help="Optional JSON output file")
+    args = p.parse_args()
+    random.seed(args.seed)
+    _parse_mix(args.mix)
+
+    if args.base_url:
+        report = asyncio.run(_run_http(args.base_url.rstrip("/"), args))
+    else:
+        with tempfile.TemporaryDirectory(prefix="load_test_") as tmp:
+            env = _offline_env(tmp, args)
+            if args.target == "asgi":
+                # Before importing the app: config (DB URL, providers) is read at import time.
+                os.environ.update(env)
+                os.chdir(_REPO_ROOT)
+                report = asyncio.run(_run_asgi(args))
+            else:
+                server, base = _start_uvicorn(env, args.timeout)
+                try:
+                    report = asyncio.run(_run_http(base, args))
+                finally:
+                    server.terminate()
+                    try:
+                        server.wait(timeout=15)
+                    except subprocess.TimeoutExpired:
+                        server.kill()
+
+    report["target"] = args.base_url or args.target
+    _print_report(report)
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
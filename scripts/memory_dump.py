@@ -0,0 +1,54 @@
+"""
+Export/import the memory vectorstore (one user or all) without re-embedding.
+
+    python scripts/memory_dump.py export memory.npz [--user 7]
+    python scripts/memory_dump.py import memory.npz [--user 7] [--as-user 12] [--force]
+
+Importing into a running single-directory deployment is not safe (Chroma persisted
+directories are not multi-process safe): stop the API or use CHROMA_SERVER_HOST.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from vectorstores.memory_dump import export_memory, import_memory
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Binary export/import of the memory vectorstore (no re-embedding).")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="Write contexts (ids, vectors, documents, metadata) to a .npz dump")
+    exp.add_argument("path")
+    exp.add_argument("--user", type=int, default=None, help="Only this user's contexts (default: all users)")
+    exp.add_argument("--batch", type=int, default=5000, help="Documents per Chroma read")
+
+    imp = sub.add_parser("import", help="Bulk-upsert a dump into the memory vectorstore")
+    imp.add_argument("path")
+    imp.add_argument("--user", type=int, default=None, help="Only this user's contexts from the dump")
+    imp.add_argument("--as-user", type=int, default=None, help="Assign the imported contexts to this user id")
+    imp.add_argument("--batch", type=int, default=5000, help="Documents per Chroma upsert")
+    imp.add_argument("--force", action="store_true", help="Import even if the dump used another embedding model")
+
+    args = p.parse_args()
+    try:
+        if args.command == "export":
+            report = export_memory(args.path, args.user, batch=args.batch)
+        else:
+            report = import_memory(args.path, user_id=args.user, as_user=args.as_user, batch=args.batch, force=args.force)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Move memory contexts between collections when MEMORY_PARTITIONING changes.
+
+Stored embeddings are copied as-is (no re-embedding). Run it with the API stopped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from vectorstores.stores import _get_memory_client, list_memory_collections, memory_collection_name
+
+
+def _migrate_collection(
+    client: Any,
+    name: str,
+    *,
+    strategy: Optional[str],
+    buckets: Optional[int],
+    batch: int,
+    keep_source: bool,
+    dry_run: bool,
+) -> dict[str, int]:
+    src = client.get_collection(name)
+    moved: list[str] = []
+    per_target: dict[str, int] = {}
+    offset = 0
+    while True:
+        page = src.get(include=["embeddings", "documents", "metadatas"], limit=batch, offset=offset)
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        offset += len(ids)
+
+        grouped: dict[str, dict[str, list[Any]]] = {}
+        for i, doc_id in enumerate(ids):
+            meta = (page.get("metadatas") or [None] * len(ids))[i] or {}
+            target = memory_collection_name(meta.get("user_id"), strategy=strategy, buckets=buckets)
+            if target == name:
+                continue
+            g = grouped.setdefault(target, {"ids": [], "embeddings": [], "documents": [], "metadatas": []})
+            g["ids"].append(doc_id)
+            g["embeddings"].append(page["embeddings"][i])
+            g["documents"].append(page["documents"][i])
+            g["metadatas"].append(meta)
+
+        for target, g in grouped.items():
+            per_target[target] = per_target.get(target, 0) + len(g["ids"])
+            if not dry_run:
+                client.get_or_create_collection(target).upsert(**g)
+            moved.extend(g["ids"])
+
+    # Delete only after the whole source was copied (deleting while paging would shift offsets).
+    if moved and not keep_source and not dry_run:
+        for i in range(0, len(moved), batch):
+            src.delete(ids=moved[i : i + batch])
+    return per_target
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Repartition the memory vectorstore without re-embedding.")
+    p.add_argument("--strategy", default="", help="Target strategy: shared|user|bucket (default: MEMORY_PARTITIONING)")
+    p.add_argument("--buckets", type=int, default=0, help="Bucket count for strategy=bucket (default: MEMORY_PARTITION_BUCKETS)")
+    p.add_argument("--batch", type=int, default=1000, help="Documents per read/write batch")
+    p.add_argument("--keep-source", action="store_true", help="Copy instead of move")
+    p.add_argument("--dry-run", action="store_true", help="Only report what would move")
+    args = p.parse_args()
+
+    strategy = args.strategy or None
+    buckets = args.buckets or None
+    # Validates the strategy before touching any data.
+    memory_collection_name(0, strategy=strategy, buckets=buckets)
+
+    client = _get_memory_client()
+    report: dict[str, Any] = {"collections": {}, "moved": 0}
+    for name in list_memory_collections():
+        per_target = _migrate_collection(
+            client,
+            name,
+            strategy=strategy,
+            buckets=buckets,
+            batch=args.batch,
+            keep_source=args.keep_source,
+            dry_run=args.dry_run,
+        )
+        if per_target:
+            report["collections"][name] = per_target
+            report["moved"] += sum(per_target.values())
+
+    report["dry_run"] = bool(args.dry_run)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
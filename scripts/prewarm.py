@@ -0,0 +1,47 @@
+"""
+One-time preparation before starting several API workers (run by gunicorn.conf.py
+before forking, or by hand):
+
+- creates the DB tables (and switches SQLite to WAL)
+- downloads/loads the embedding model so its files are on disk and in the page cache
+- builds the knowledge index once, so workers only load it instead of racing to index
+- creates the memory collection and the conversation checkpointer tables
+
+Runs in its own process on purpose: ONNX runtime sessions and Chroma clients do not
+survive fork(), so each worker still opens its own, but from warm local files.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+# Ensure the repository root is on sys.path when running as a script.
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+
+def main() -> None:
+    from db.session import init_db
+    from config.embeddings import EMBEDDING_MODEL
+    from vectorstores import initialize_knowledge_vectorstore, initialize_memory_vectorstore
+    from agents.music_agent import _create_checkpointer
+
+    timings: dict[str, float] = {}
+    for name, fn in (
+        ("db", init_db),
+        ("embeddings", lambda: EMBEDDING_MODEL.embed_query("warmup")),
+        ("knowledge_vectorstore", initialize_knowledge_vectorstore),
+        ("memory_vectorstore", initialize_memory_vectorstore),
+        ("checkpointer", _create_checkpointer),
+    ):
+        t0 = time.perf_counter()
+        fn()
+        timings[name] = round(time.perf_counter() - t0, 3)
+    print(f"✅ Prewarm listo ({timings})")
+
+
+if __name__ == "__main__":
+    main()
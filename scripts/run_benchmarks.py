@@ -5,8 +5,9 @@ import csv
 import json
 import os
 import re
-import shutil
 import sys
+import time
+from contextlib import ExitStack
 from dataclasses import asdict
 from pathlib import Path
 from typing import Any, Optional
@@ -20,6 +21,8 @@ if str(_REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(_REPO_ROOT))
 
 from agents import create_music_agent
+from agents.llm_scheduler import PRIORITY_BATCH, set_llm_priority
+from agents.router import TIER_SIMPLE, TierStats, route_turn, tier_expense
 from api.callback_context import reset_agent_label, reset_callbacks, set_agent_label, set_callbacks
 from api.llm_usage_callback import LLMUsageCallbackHandler
 from api.routes.chat import _content_to_text, _group_usage_breakdown  # type: ignore
@@ -29,7 +32,7 @@ from db.models import User
 from db.repositories.playlists import seed_default_playlists_for_user
 from db.session import SessionLocal, init_db
 from vectorstores import initialize_knowledge_vectorstore, initialize_memory_vectorstore
-from vectorstores.stores import reset_vectorstores
+from vectorstores.stores import ephemeral_memory, reset_vectorstores
 
 
 def _load_jsonc(path: Path) -> Any:
@@ -58,25 +61,9 @@ def _get_or_create_user_id(username: str) -> int:
 
 
 def _memory_dir_for_case(case: dict[str, Any]) -> str:
-    base = Path(".bench") / "chroma_memory"
-    base.mkdir(parents=True, exist_ok=True)
-    if case.get("persistent_memory"):
-        # persist across sessions but scoped per user_id
-        return str(base / f"persist_{case['user_id']}")
-    # isolated per-case
-    return str(base / f"case_{case['case_id']}")
-
-
-def _prepare_memory_dir(case: dict[str, Any]) -> str:
-    """
-    Ensure the memory directory is in the desired state for this case.
-
-    - persistent_memory=True  -> keep directory (cross-case, cross-run)
-    - persistent_memory=False -> wipe directory so the case starts with truly no persistent memory
-    """
-    d = Path(_memory_dir_for_case(case))
-    if not case.get("persistent_memory") and d.exists():
-        shutil.rmtree(d, ignore_errors=True)
+    # Only persistent cases use a directory (persist across sessions but scoped per user_id);
+    # isolated cases run on an in-memory store (see ephemeral_memory).
+    d = Path(".bench") / "chroma_memory" / f"persist_{case['user_id']}"
     d.mkdir(parents=True, exist_ok=True)
     return str(d)
 
@@ -110,9 +97,23 @@ def _print_table(rows: list[dict[str, Any]]) -> None:
             f"  input:  {r['input_message']}\n"
             f"  output: {r['output_message']}\n"
             f"  tokens: input={total.get('input_tokens','-')} output={total.get('output_tokens','-')} total={total.get('total_tokens','-')}\n"
+            f"  tier:   {(exp.get('tier') or {}).get('tier', '-')} latency={(exp.get('tier') or {}).get('latency_ms', '-')}ms\n"
         )
 
 
+def _print_tier_summary(tiers: TierStats) -> None:
+    summary = tiers.summary()
+    if not summary:
+        return
+    print("=== Per-tier summary ===")
+    for tier, t in summary.items():
+        print(f"  {tier:<8} turns={t['turns']} avg_latency={t['avg_latency_ms']}ms avg_tokens={t['avg_tokens']}")
+    simple, complex_ = summary.get("simple"), summary.get("complex")
+    if simple and complex_:
+        saved = simple["turns"] * (complex_["avg_tokens"] - simple["avg_tokens"])
+        print(f"  estimated tokens saved by the simple tier: {round(saved)} (vs. avg complex turn)")
+
+
 def _summarize_msg(m: Any, *, max_len: int = 240) -> dict[str, Any]:
     try:
         content = getattr(m, "content", None)
@@ -141,6 +142,7 @@ def main() -> None:
     p.add_argument("--only", default="", help="Comma-separated case ids to run (e.g. C01,C02,C10)")
     p.add_argument("--case-regex", default="", help="Regex to match case_id (e.g. '^C0[1-9]$')")
     p.add_argument("--no-table", action="store_true", help="Do not print a human-readable table to stdout")
+    p.add_argument("--no-tiering", action="store_true", help="Send every case to the main model (no simple tier)")
     args = p.parse_args()
 
     cases_path = Path(args.cases)
@@ -156,12 +158,20 @@ def main() -> None:
         only_set = {c.strip() for c in str(args.only).split(",") if c.strip()}
     case_re = re.compile(args.case_regex) if args.case_regex else None
 
+    # Benchmark calls are batch: they draw from the quota shared with the API processes
+    # (LLM_SHARED_QUOTA_DIR) only after interactive chat calls, leaving them a reserve.
+    set_llm_priority(PRIORITY_BATCH)
+
     # DB tables + vectorstores init
     init_db()
     initialize_knowledge_vectorstore()
 
-    # Agent init once (session isolation is controlled via thread_id per case)
-    agent = create_music_agent()
+    # Agent init once (session isolation is controlled via thread_id per case). It warms the
+    # memory store: do that in memory so runs with only isolated cases never open one on disk.
+    with ephemeral_memory("agent_init"):
+        main_agent = create_music_agent()
+        simple_agent = None if args.no_tiering else create_music_agent(tier="simple")
+    tiers = TierStats()
 
     results: list[dict[str, Any]] = []
 
@@ -177,9 +187,16 @@ def main() -> None:
         db_user_id = _get_or_create_user_id(str(case.get("user_id") or "u"))
         user_token = set_current_user_id(db_user_id)
 
-        # Per-case vectorstore dir (persistent vs isolated)
-        os.environ["CHROMA_MEMORY_DIR"] = _prepare_memory_dir(case)
-        reset_vectorstores(reset_memory=True, reset_knowledge=False)
+        # Per-case memory store: persistent cases keep an on-disk store per user; isolated
+        # cases get a fresh in-memory one (no directory wipe, no persistent client startup).
+        case_scope = ExitStack()
+        if case.get("persistent_memory"):
+            memory_dir = _memory_dir_for_case(case)
+            if os.environ.get("CHROMA_MEMORY_DIR") != memory_dir:
+                os.environ["CHROMA_MEMORY_DIR"] = memory_dir
+                reset_vectorstores(reset_memory=True, reset_knowledge=False)
+        else:
+            case_scope.enter_context(ephemeral_memory(f"case_{case_id}"))
         initialize_memory_vectorstore()
 
         # Mocks for external APIs/tools
@@ -189,26 +206,40 @@ def main() -> None:
         cb_token = set_callbacks([cb])
         label_token = set_agent_label("main_agent")
 
+        input_message = str(case.get("input_message") or "")
+        route = route_turn(input_message)
+        agent = main_agent
+        if route.tier == TIER_SIMPLE and simple_agent is not None:
+            agent = simple_agent
+        else:
+            route.tier = main_agent._tier
+
         try:
             messages = [
                 SystemMessage(content=agent._system_prompt),
                 # NOTE: We intentionally DO NOT auto-inject "memoria relevante" here.
                 # The agent can call get_similar_contexts() tool when needed.
-                HumanMessage(content=str(case.get("input_message") or "")),
+                HumanMessage(content=input_message),
             ]
 
+            started = time.perf_counter()
             response = agent.invoke(
                 {"messages": messages},
                 {"configurable": {"thread_id": _thread_id_for_case(case, db_user_id)}, "callbacks": [cb]},
             )
 
+            latency_ms = (time.perf_counter() - started) * 1000.0
             msgs = response.get("messages") or []
             last = msgs[-1] if msgs else None
             reply = _content_to_text(getattr(last, "content", last)) if last is not None else ""
 
             breakdown = _group_usage_breakdown(cb.entries)
             total = cb.totals()
-            expense = {"total": total, "breakdown": breakdown}
+            expense = {
+                "total": total,
+                "breakdown": breakdown,
+                "tier": {"model": agent._model_name, **tier_expense(route, latency_ms, total.get("total_tokens", 0), tiers)},
+            }
 
             debug: dict[str, Any] | None = None
             if not str(reply).strip():
@@ -237,6 +268,7 @@ def main() -> None:
             reset_callbacks(cb_token)
             reset_api_mocks(mocks_token)
             reset_current_user_id(user_token)
+            case_scope.close()
 
     out_path.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -262,6 +294,7 @@ def main() -> None:
 
     if not args.no_table:
         _print_table(results)
+        _print_tier_summary(tiers)
 
 
 if __name__ == "__main__":
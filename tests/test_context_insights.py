@@ -0,0 +1,39 @@
+import os
+import unittest
+from unittest import mock
+
+from agents import context_insights, llm, llm_scheduler
+
+_ENV = {
+    "location_weather": "Ubicación: Buenos Aires. Clima: lluvia moderada",
+    "time_context": "Hora actual: 21:00",
+}
+
+
+class OneshotInsightsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        patches = [
+            mock.patch.dict(os.environ, {"LLM_PROVIDER": "stub", "GEMINI_CONTEXT_MODEL": "oneshot-test"}),
+            mock.patch.object(context_insights, "_models", {}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_reuses_one_model_per_model_and_temperature(self):
+        with mock.patch.object(llm, "create_chat_model", wraps=llm.create_chat_model) as create:
+            context_insights._oneshot_insights(_ENV, "", None)
+            context_insights._oneshot_insights(_ENV, "para estudiar", None)
+        self.assertEqual(create.call_count, 1)
+
+    def test_llm_scheduler_switch_is_honoured(self):
+        with mock.patch.dict(os.environ, {"LLM_SCHEDULER": "0"}):
+            with mock.patch.object(llm_scheduler, "get_llm_scheduler", side_effect=AssertionError("scheduler used")):
+                self.assertTrue(context_insights._oneshot_insights(_ENV, "", None))
+        with mock.patch.object(llm_scheduler, "get_llm_scheduler", wraps=llm_scheduler.get_llm_scheduler) as get:
+            context_insights._oneshot_insights(_ENV, "", None)
+        self.assertEqual(get.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import threading
+import unittest
+
+import numpy as np
+
+from config.embedding_service import BatchingEmbeddings
+
+
+class _TextEmbedding:
+    """Stands in for fastembed.TextEmbedding: records the size of every query_embed call."""
+
+    def __init__(self) -> None:
+        self.calls: list[int] = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def query_embed(self, texts, **kwargs):
+        texts = list(texts)
+        self.calls.append(len(texts))
+        self.started.set()
+        self.release.wait(5)
+        return [np.full(3, float(len(t)), dtype=np.float32) for t in texts]
+
+
+class _FastEmbedLike:
+    # FastEmbedEmbeddings exposes the underlying model as `model`.
+    def __init__(self) -> None:
+        self.model = _TextEmbedding()
+        self.batch_size = 256
+        self.parallel = None
+
+    def embed_query(self, text):
+        raise AssertionError("batched queries must not fall back to one embed_query per text")
+
+
+class BatchingEmbeddingsTest(unittest.TestCase):
+    def test_one_underlying_call_per_flushed_batch(self):
+        model = _FastEmbedLike()
+        batcher = BatchingEmbeddings(lambda: model, max_batch_size=32, max_wait_ms=50)
+
+        # The first query occupies the worker; the next ones queue up behind it.
+        first = batcher.submit("a", is_query=True)
+        self.assertTrue(model.model.started.wait(5))
+        rest = [batcher.submit("x" * i, is_query=True) for i in range(1, 9)]
+        model.model.release.set()
+
+        self.assertEqual(first.result(5), [1.0, 1.0, 1.0])
+        self.assertEqual([f.result(5)[0] for f in rest], [float(i) for i in range(1, 9)])
+        self.assertEqual(model.model.calls, [1, 8])
+        self.assertEqual(batcher.stats()["batches"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+import unittest
+
+from agents.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMRateLimited, LLMScheduler, SharedQuota
+from api.deadline import Deadline, reset_deadline, set_deadline
+
+
+class LLMSchedulerDeadlineTest(unittest.TestCase):
+    def test_queue_wait_is_capped_by_the_request_deadline(self):
+        scheduler = LLMScheduler("test-model", rpm=2, burst_fraction=0.5, max_wait_s=30.0)
+        scheduler.call(lambda: "ok", 1, lambda _: None)  # drains the burst; the next slot is ~60s away
+
+        token = set_deadline(Deadline(1.0, reserve_s=0.0))
+        try:
+            started = time.monotonic()
+            with self.assertRaises(LLMRateLimited):
+                scheduler.call(lambda: "ok", 1, lambda _: None)
+        finally:
+            reset_deadline(token)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(scheduler.snapshot()["deadline_exceeded"], 1)
+
+    def test_retry_backoff_does_not_sleep_past_the_request_deadline(self):
+        scheduler = LLMScheduler("test-model", max_wait_s=30.0, max_retries=5)
+        scheduler.backoff = lambda attempt: 2.0  # no jitter: the first retry would land after the deadline
+        calls = []
+
+        def fn():
+            calls.append(1)
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+        token = set_deadline(Deadline(1.0, reserve_s=0.0))
+        try:
+            started = time.monotonic()
+            with self.assertRaises(RuntimeError):
+                scheduler.call(fn, 1, lambda _: None)
+        finally:
+            reset_deadline(token)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(len(calls), 1)
+
+
+class SharedQuotaTest(unittest.TestCase):
+    """Two schedulers on one state file stand for two processes (API worker + batch runner)."""
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "llm_quota_TEST.json")
+
+    def _scheduler(self, rpm: float = 60, batch_reserve: float = 0.5) -> LLMScheduler:
+        shared = SharedQuota(self.path, rpm, 0, 0.25, batch_reserve)
+        return LLMScheduler("test-model", rpm=rpm, shared=shared)
+
+    def _take(self, scheduler: LLMScheduler, priority: int, wait_s: float = 0.05) -> bool:
+        try:
+            scheduler.acquire(1, priority=priority, deadline=time.monotonic() + wait_s)
+        except LLMRateLimited:
+            return False
+        scheduler.release(1, 1)
+        return True
+
+    def test_processes_draw_from_one_quota(self):
+        api, batch = self._scheduler(), self._scheduler()  # one burst of 15 requests
+        self.assertEqual(sum(self._take(api, PRIORITY_INTERACTIVE) for _ in range(15)), 15)
+        self.assertFalse(self._take(batch, PRIORITY_INTERACTIVE, wait_s=0.3))
+
+    def test_batch_leaves_a_reserve_for_interactive_calls(self):
+        api, batch = self._scheduler(), self._scheduler()
+        granted = 0
+        while self._take(batch, PRIORITY_BATCH):
+            granted += 1
+        self.assertIn(granted, (7, 8))  # 15 minus half the burst kept for interactive calls
+        self.assertEqual(sum(self._take(api, PRIORITY_INTERACTIVE) for _ in range(7)), 7)
+
+    def test_batch_waits_while_an_interactive_call_is_waiting(self):
+        api, batch = self._scheduler(600, 0.0), self._scheduler(600, 0.0)  # burst 150, 10/s
+        for _ in range(150):
+            self.assertEqual(api._shared.try_acquire(1, PRIORITY_INTERACTIVE), 0.0)
+        # The interactive caller has to wait ~0.1s and records its demand in the state file.
+        self.assertGreater(api._shared.try_acquire(1, PRIORITY_INTERACTIVE), 0.0)
+        time.sleep(0.2)
+        # Quota has refilled, but the batch process still yields to the waiting chat.
+        self.assertGreater(batch._shared.try_acquire(1, PRIORITY_BATCH), 0.0)
+        self.assertEqual(api._shared.try_acquire(1, PRIORITY_INTERACTIVE), 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from tools import memory
+from tools.memory import context_fields, memory_filter
+
+
+class _Store:
+    """Memory store stub: contexts only match a search without metadata filters."""
+
+    def __init__(self) -> None:
+        self.filters = []
+
+    def similarity_search_with_score(self, query, k, filter=None):
+        self.filters.append(filter)
+        if filter is not None and "$and" in filter:
+            return []
+        doc = SimpleNamespace(page_content="Usuario: llueve y estoy tranqui", metadata={"timestamp": "2025-01-01T10:00:00"})
+        return [(doc, 0.1)]
+
+
+class ContextFiltersTest(unittest.TestCase):
+    def test_free_text_filters_map_to_stored_labels(self):
+        fields = context_fields(mood="relajada", weather="con lluvia", time_period="a la noche")
+        self.assertEqual((fields["mood"], fields["weather"], fields["time_period"]), ("relajado", "lluvia", "noche"))
+        self.assertEqual(context_fields(time_period="21:30")["time_period"], "noche")
+
+    def test_filter_clauses_use_normalized_values(self):
+        where = memory_filter(7, mood="muy estresada")
+        self.assertEqual(where, {"$and": [{"user_id": 7}, {"mood": "estresado"}]})
+
+    def test_empty_filtered_search_retries_without_prefilter(self):
+        store = _Store()
+        with mock.patch.object(memory, "get_memory_vectorstore", lambda user_id: store):
+            out = memory.get_similar_contexts("algo tranquilo", mood="relajada", weather="con lluvia")
+        self.assertIn("se muestran resultados sin esos filtros", out)
+        self.assertIn("llueve y estoy tranqui", out)
+        self.assertEqual(len(store.filters), 2)
+        self.assertIsNone(store.filters[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
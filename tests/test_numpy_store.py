@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from vectorstores.numpy_store import NumpyVectorStore
+
+_IDS = ["a", "b", "c"]
+_DOCS = ["lo-fi para estudiar", "rock para correr", "jazz para cocinar"]
+_METAS = [{"genero": "lo-fi"}, {"genero": "rock"}, {"genero": "jazz"}]
+
+
+class _ConstantEmbedding:
+    def embed_documents(self, texts):
+        return [[1.0] * 8 for _ in texts]
+
+    def embed_query(self, text):
+        return [1.0] * 8
+
+
+class NumpyVectorStoreCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp(prefix="numpy_store_")
+        self.addCleanup(shutil.rmtree, self.dir, True)
+
+    def _load_or_build(self, embeddings, model_id="fake:8"):
+        with mock.patch("config.embeddings.embedding_model_id", lambda: model_id):
+            return NumpyVectorStore.load_or_build(self.dir, _IDS, _DOCS, _METAS, embeddings)
+
+    def test_reuses_the_matrix_for_the_same_corpus_and_model(self):
+        _, rebuilt = self._load_or_build(DeterministicFakeEmbedding(size=8))
+        self.assertTrue(rebuilt)
+        _, rebuilt = self._load_or_build(DeterministicFakeEmbedding(size=8))
+        self.assertFalse(rebuilt)
+
+    def test_rebuilds_when_the_embedding_model_changes(self):
+        self._load_or_build(DeterministicFakeEmbedding(size=8), "fake:8")
+        _, rebuilt = self._load_or_build(DeterministicFakeEmbedding(size=8), "fastembed:BAAI/bge-small-en-v1.5")
+        self.assertTrue(rebuilt)
+
+    def test_rebuilds_when_the_dimension_does_not_match(self):
+        self._load_or_build(DeterministicFakeEmbedding(size=8))
+        store, rebuilt = self._load_or_build(DeterministicFakeEmbedding(size=16))
+        self.assertTrue(rebuilt)
+        self.assertEqual(len(store.similarity_search("jazz", k=1)), 1)
+
+    def test_rebuild_does_not_touch_a_mapped_matrix(self):
+        old, _ = self._load_or_build(DeterministicFakeEmbedding(size=8), "fake:8")
+        before = old.get(include=["embeddings"])["embeddings"].copy()
+        self._load_or_build(_ConstantEmbedding(), "other:8")
+        self.assertTrue((old.get(include=["embeddings"])["embeddings"] == before).all())
+        self.assertEqual(len([f for f in os.listdir(self.dir) if f.endswith(".f32")]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
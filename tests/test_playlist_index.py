@@ -0,0 +1,120 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from db.models import Base, User
+from db.repositories.playlists import (
+    PlaylistRow,
+    create_playlist_for_user,
+    delete_playlist_for_user,
+    list_playlists_for_user,
+    update_playlist_for_user,
+)
+from vectorstores import playlist_index
+
+
+class _Collection:
+    def __init__(self, docs: dict[str, str]) -> None:
+        self.docs = docs
+        self.gets = 0
+
+    def get(self, where, include):
+        self.gets += 1
+        ids = list(self.docs)
+        return {"ids": ids, "documents": [self.docs[i] for i in ids]}
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.docs.pop(doc_id, None)
+
+
+class _Store:
+    """Memory store stub: records embedded ids; search returns every indexed playlist."""
+
+    def __init__(self) -> None:
+        self.docs: dict[str, str] = {}
+        self.meta: dict[str, dict] = {}
+        self._collection = _Collection(self.docs)
+        self.embedded: list[str] = []
+
+    def add_texts(self, texts, metadatas, ids):
+        self.embedded.extend(ids)
+        self.docs.update(zip(ids, texts))
+        self.meta.update(zip(ids, metadatas))
+
+    def delete(self, ids):
+        self._collection.delete(ids)
+
+    def similarity_search(self, query, k, filter):
+        return [SimpleNamespace(metadata=self.meta[i]) for i in list(self.docs)[:k]]
+
+
+class PlaylistIndexMaintenanceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = _Store()
+        patches = [
+            mock.patch.object(playlist_index, "_store", lambda: self.store),
+            mock.patch.object(playlist_index, "_synced", set()),
+            mock.patch("vectorstores.stores.memory_store_key", lambda: "test"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        self.db = Session(engine)
+        self.addCleanup(self.db.close)
+        user = User(username="ana", password_hash="-")
+        self.db.add(user)
+        self.db.commit()
+        self.user_id = user.id
+
+    def _rows(self) -> list[PlaylistRow]:
+        return [PlaylistRow.of(p) for p in list_playlists_for_user(self.db, user_id=self.user_id)]
+
+    def _create(self, i: int):
+        return create_playlist_for_user(self.db, user_id=self.user_id, name=f"P{i}", description=f"desc {i}")
+
+    def test_writes_are_reflected_without_rescanning_the_index(self):
+        playlists = [self._create(i) for i in range(10)]
+        self.assertTrue(playlist_index.wait_for_index(self.user_id))
+        self.assertEqual(len(self.store.docs), 10)
+
+        # First search of the process: one reconcile with nothing left to embed.
+        self.store.embedded.clear()
+        playlist_index.top_playlists(self.user_id, self._rows(), "estudio", 3)
+        self.assertEqual((self.store._collection.gets, self.store.embedded), (1, []))
+
+        new = self._create(10)
+        update_playlist_for_user(self.db, user_id=self.user_id, playlist_id=playlists[0].id, description="editada")
+        delete_playlist_for_user(self.db, user_id=self.user_id, playlist_id=playlists[1].id)
+        playlist_index.top_playlists(self.user_id, self._rows(), "estudio", 3)
+
+        self.assertEqual(self.store._collection.gets, 1)
+        self.assertEqual(sorted(self.store.embedded), sorted([f"playlist_{new.id}", f"playlist_{playlists[0].id}"]))
+        self.assertEqual(self.store.docs[f"playlist_{playlists[0].id}"], "P0: editada")
+        self.assertNotIn(f"playlist_{playlists[1].id}", self.store.docs)
+
+    def test_failed_embed_does_not_fail_the_write_and_is_reconciled_later(self):
+        for i in range(9):
+            self._create(i)
+        playlist_index.wait_for_index(self.user_id)
+        playlist_index.top_playlists(self.user_id, self._rows(), "estudio", 3)
+
+        with mock.patch.object(self.store, "add_texts", side_effect=RuntimeError("embeddings down")):
+            p = self._create(9)
+            self.assertTrue(playlist_index.wait_for_index(self.user_id))
+        self.assertIn("P9", [r.name for r in self._rows()])
+
+        playlist_index.top_playlists(self.user_id, self._rows(), "estudio", 3)
+        self.assertEqual(self.store._collection.gets, 2)
+        self.assertIn(f"playlist_{p.id}", self.store.docs)
+
+
+if __name__ == "__main__":
+    unittest.main()
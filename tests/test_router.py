@@ -0,0 +1,41 @@
+import os
+import unittest
+from unittest import mock
+
+from agents.router import TIER_COMPLEX, TIER_SIMPLE, score_turn
+
+
+class ScoreTurnTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"MODEL_TIER_THRESHOLD": "2"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_new_requests_without_keywords_stay_complex(self):
+        for message in (
+            "algo para correr",
+            "sugerime algo para dormir",
+            "pasame rock nacional",
+            "quiero bailar",
+            "algo chill",
+            "jazz",
+        ):
+            with self.subTest(message=message):
+                self.assertEqual(score_turn(message).tier, TIER_COMPLEX)
+
+    def test_followups_are_simple(self):
+        for message in ("otra", "Gracias!", "dale", "otra opción"):
+            with self.subTest(message=message):
+                self.assertEqual(score_turn(message).tier, TIER_SIMPLE)
+
+    def test_short_memory_lookups_are_simple(self):
+        for message in ("¿cuál fue la última playlist?", "qué me recomendaste ayer"):
+            with self.subTest(message=message):
+                self.assertEqual(score_turn(message).tier, TIER_SIMPLE)
+
+    def test_memory_lookup_with_a_mutation_is_complex(self):
+        self.assertEqual(score_turn("borrá la última playlist que me recomendaste").tier, TIER_COMPLEX)
+
+
+if __name__ == "__main__":
+    unittest.main()
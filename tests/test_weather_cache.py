@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+from tools import weather_cache
+
+
+class _Response:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise weather_cache.requests.HTTPError(f"{self.status_code}")
+
+    def json(self):
+        return self.data
+
+
+class GeolocationCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        for name in ("geo_cache", "weather_cache"):
+            patch = mock.patch.object(weather_cache, name, weather_cache.SharedCache(16))
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_failed_lookup_is_not_cached(self):
+        failed = _Response({"success": False, "message": "Reserved range"})
+        ok = _Response({"success": True, "city": "Rosario", "country": "Argentina", "latitude": -32.9, "longitude": -60.6})
+        with mock.patch.object(weather_cache.requests, "get", side_effect=[failed, ok]) as get:
+            with self.assertRaises(ValueError):
+                weather_cache.geolocate("10.0.0.1")
+            self.assertEqual(weather_cache.geolocate("10.0.0.1")["city"], "Rosario")
+            self.assertEqual(weather_cache.geolocate("10.0.0.1")["city"], "Rosario")
+        self.assertEqual(get.call_count, 2)
+
+    def test_missing_coordinates_raise(self):
+        with mock.patch.object(weather_cache.requests, "get", return_value=_Response({"success": True, "city": "X"})):
+            with self.assertRaises(ValueError):
+                weather_cache.geolocate("10.0.0.2")
+
+
+    def test_failed_weather_fetch_is_not_cached_for_the_cell(self):
+        limited = _Response({"error": True, "reason": "Too many requests"}, status_code=429)
+        no_current = _Response({"error": True, "reason": "Hourly API request limit exceeded"})
+        ok = _Response({"current_weather": {"weathercode": 61, "temperature": 14.5}})
+        with mock.patch.object(weather_cache.requests, "get", side_effect=[limited, no_current, ok]) as get:
+            self.assertIsNone(weather_cache.current_weather(-34.62, -58.42))
+            self.assertIsNone(weather_cache.current_weather(-34.62, -58.42))
+            self.assertEqual(weather_cache.current_weather(-34.62, -58.42)[1], 14.5)
+            self.assertEqual(weather_cache.current_weather(-34.65, -58.45)[1], 14.5)
+        self.assertEqual(get.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
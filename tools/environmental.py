@@ -1,14 +1,23 @@
 """Herramientas de percepción ambiental (clima, ubicación, tiempo)."""
 
-import requests
 from datetime import datetime
 
+from api.tool_memo import memoized_tool
 
+
+@memoized_tool()
 def get_location_and_weather() -> str:
     """
     Obtiene la ubicación real del usuario (ciudad y país) y el clima actual usando las coordenadas exactas.
-    Utiliza la API ipwho.is para ubicación y open-meteo.com para clima.
+    Utiliza la ubicación enviada por el cliente (o la API ipwho.is) y open-meteo.com para clima,
+    con una caché compartida por zona y franja horaria (ver tools.weather_cache).
     """
+    from api.deadline import step_allowed, timed_step
+
+    # Optional step: with little time left in the request, answer without weather.
+    if not step_allowed("weather"):
+        return "Ubicación: No disponible | Clima: omitido (poco tiempo para consultarlo)"
+
     # Benchmark mode: deterministic per-case mocks (no external calls)
     try:
         from bench.mock_context import get_api_mocks  # type: ignore
@@ -26,45 +35,35 @@ def get_location_and_weather() -> str:
         pass
 
     try:
-        response = requests.get("https://ipwho.is/", timeout=10)
-        data = response.json()
-        city = data.get('city', 'Unknown')
-        country = data.get('country', 'Unknown')
-        lat = data.get('latitude')
-        lon = data.get('longitude')
-        
-        if lat and lon:
-            url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
-            weather_response = requests.get(url, timeout=10)
-            weather_data = weather_response.json()
-            
-            if 'current_weather' in weather_data:
-                weather = weather_data['current_weather']
-                temp = weather.get('temperature', 0)
-                code = weather.get('weathercode', 0)
-                
-                weather_descriptions = {
-                    0: "despejado", 1: "mayormente despejado", 2: "parcialmente nublado",
-                    3: "nublado", 45: "niebla", 48: "niebla helada", 51: "llovizna ligera",
-                    53: "llovizna moderada", 55: "llovizna densa", 61: "lluvia ligera",
-                    63: "lluvia moderada", 65: "lluvia intensa", 71: "nieve ligera",
-                    73: "nieve moderada", 75: "nieve intensa", 77: "granizo",
-                    80: "chubascos ligeros", 81: "chubascos moderados", 82: "chubascos intensos",
-                    85: "chubascos de nieve ligeros", 86: "chubascos de nieve intensos",
-                    95: "tormenta eléctrica", 96: "tormenta con granizo ligero", 99: "tormenta con granizo intenso"
-                }
-                
-                weather_desc = weather_descriptions.get(code, "condiciones variables")
-                return f"Ubicación: {city}, {country} | Clima: {weather_desc}, {temp}°C"
-            else:
-                return f"Ubicación: {city}, {country} | Clima: No disponible"
-        else:
-            return f"Ubicación: {city}, {country} | Error obteniendo coordenadas"
-            
+        with timed_step("weather"):
+            return _location_and_weather()
     except Exception as e:
         return f"Error obteniendo ubicación y clima: {str(e)}"
 
 
+def _location_and_weather() -> str:
+    from api.client_location import get_client_location
+    from tools.weather_cache import current_weather, geolocate
+
+    # Client-supplied location (see POST /chat `location`); otherwise the server's IP.
+    loc = get_client_location()
+    if loc is not None and loc.has_coordinates:
+        lat, lon = loc.latitude, loc.longitude
+        place = loc.label or f"{lat:.2f}, {lon:.2f}"
+    else:
+        geo = geolocate(loc.ip if loc is not None else None)
+        lat, lon = geo["latitude"], geo["longitude"]
+        place = f"{geo['city']}, {geo['country']}"
+
+    if lat is None or lon is None:
+        return f"Ubicación: {place} | Error obteniendo coordenadas"
+    weather = current_weather(float(lat), float(lon))
+    if weather is None:
+        return f"Ubicación: {place} | Clima: No disponible"
+    weather_desc, temp = weather
+    return f"Ubicación: {place} | Clima: {weather_desc}, {temp}°C"
+
+
 def get_time_context() -> str:
     """
     Obtiene el día de la semana, la hora actual y el momento del día (mañana/tarde/noche).
@@ -1,50 +1,109 @@
 """Herramientas de memoria y conocimiento musical."""
 
+import re
 from datetime import datetime
+from typing import Any, Optional
 from langchain_core.documents import Document
 
-from vectorstores import initialize_memory_vectorstore, initialize_knowledge_vectorstore
+from api.tool_memo import invalidates_tools, memoized_tool
+from vectorstores import get_memory_vectorstore, initialize_knowledge_vectorstore, memory_doc_id
+from vectorstores.hybrid import knowledge_filter, search_knowledge
+from vectorstores.recency import recent_contexts, record_recent, scan_recent_contexts
 
 
-def save_context(context: str) -> str:
+# Typed context fields, always present in a saved context's metadata ("" = unknown).
+CONTEXT_FIELDS = ("mood", "weather", "time_period", "playlist_recommended")
+_LEGACY_MARKERS = {"mood": "Mood:", "weather": "Clima:", "time_period": "Hora:"}
+
+
+def _field_value(field: str, value: str) -> str:
+    """
+    Normalized value for filtering: mood -> label (relajada -> relajado), weather -> group
+    (lluvia, nublado...), time -> mañana/tarde/noche.
+    """
+    from agents.context_insights import mood_of, time_period, weather_group
+    from vectorstores.stores import knowledge_token
+
+    value = (value or "").strip()
+    if not value or field == "playlist_recommended":
+        return value
+    if field == "mood":
+        value = mood_of(value) or value
+    elif field == "weather":
+        value = weather_group(value) or value
+    elif field == "time_period":
+        m = re.search(r"(\d{1,2}):\d{2}", value)
+        if m:
+            value = time_period(int(m.group(1)))
+        else:
+            words = knowledge_token(value).split("_")
+            value = next((p for p in ("mañana", "tarde", "noche") if knowledge_token(p) in words), value)
+    return knowledge_token(value)
+
+
+def context_fields(context: str = "", **fields: str) -> dict[str, str]:
+    """
+    The CONTEXT_FIELDS metadata for a context: explicit values first, then the legacy
+    "Mood: ..., Clima: ..., Hora: ..., Playlist: ..." markers inside the text.
+    """
+    out: dict[str, str] = {}
+    for field in CONTEXT_FIELDS:
+        value = fields.get(field) or ""
+        if not value and field == "playlist_recommended" and "Playlist:" in context:
+            value = context.split("Playlist:")[-1].strip()
+        elif not value and _LEGACY_MARKERS.get(field, "\0") in context:
+            value = context.split(_LEGACY_MARKERS[field])[-1].split(",")[0].strip()
+        out[field] = _field_value(field, value)
+    return out
+
+
+@invalidates_tools("get_similar_contexts")
+def save_context(context: str, mood: str = "", weather: str = "", time_period: str = "", playlist_recommended: str = "") -> str:
     """
     Guarda información del contexto actual (clima, hora, día, mood, playlist recomendada) 
     en el vector store con embeddings para búsqueda semántica.
+
+    Args:
+        context (str): Resumen del contexto y la recomendación
+        mood (str): Opcional. Estado de ánimo del usuario (ej: "relajado", "triste")
+        weather (str): Opcional. Clima actual (ej: "lluvia ligera")
+        time_period (str): Opcional. Momento del día ("mañana", "tarde", "noche") o la hora "HH:MM"
+        playlist_recommended (str): Opcional. Nombre de la playlist recomendada
     """
     try:
-        timestamp = datetime.now().isoformat()
+        now = datetime.now()
+        timestamp = now.isoformat()
         
         # Guardar en vector store con embeddings
         try:
-            vectorstore = initialize_memory_vectorstore()
-            
-            # Extraer metadata del contexto
             metadata = {
                 'timestamp': timestamp,
-                'id': f"context_{timestamp}"
+                # Numeric timestamp so retention/recency can filter with $lt/$gte.
+                'ts': now.timestamp(),
+                **context_fields(
+                    context, mood=mood, weather=weather, time_period=time_period, playlist_recommended=playlist_recommended
+                ),
             }
 
             # If running under the API, associate saved context to the authenticated user.
+            user_id = None
             try:
                 from api.user_context import get_current_user_id  # type: ignore
                 user_id = get_current_user_id()
                 if user_id is not None:
                     metadata["user_id"] = int(user_id)
             except Exception:
-                pass
-            
-            if 'Playlist:' in context:
-                metadata['playlist_recommended'] = context.split('Playlist:')[-1].strip()
-            if 'Mood:' in context:
-                metadata['mood'] = context.split('Mood:')[-1].split(',')[0].strip()
-            if 'Clima:' in context:
-                metadata['weather'] = context.split('Clima:')[-1].split(',')[0].strip()
-            if 'Hora:' in context:
-                metadata['time_period'] = context.split('Hora:')[-1].split(',')[0].strip()
-            
+                user_id = None
+
+            # Content-hash id: saving the same context twice upserts instead of duplicating.
+            doc_id = memory_doc_id(context, user_id)
+            metadata['id'] = doc_id
+
+            vectorstore = get_memory_vectorstore(user_id)
             doc = Document(page_content=context, metadata=metadata)
-            vectorstore.add_documents([doc])
+            vectorstore.add_documents([doc], ids=[doc_id])
             # Chroma persiste automáticamente, no necesita .persist()
+            record_recent(doc_id, user_id, metadata['ts'])
         except Exception as e:
             return f"Error guardando en vector store: {str(e)}"
         
@@ -53,88 +112,170 @@ def save_context(context: str) -> str:
         return f"Error guardando contexto: {str(e)}"
 
 
-def search_musical_knowledge(query: str, top_k: int = 3) -> str:
+def search_musical_knowledge(query: str, top_k: int = 3, actividad: str = "", genero: str = "", mood: str = "") -> str:
     """
-    Busca en la base de conocimiento musical usando RAG (búsqueda semántica).
+    Busca en la base de conocimiento musical usando RAG (búsqueda semántica + léxica).
     Retorna información relevante sobre música, géneros, actividades y condiciones ambientales.
     
     Args:
         query (str): Consulta sobre música, actividad, mood, etc.
         top_k (int): Número máximo de resultados a retornar (por defecto 3)
+        actividad (str): Opcional. Filtra por actividad (ej: "estudio", "fiesta"); varias separadas por coma
+        genero (str): Opcional. Filtra por género (ej: "lo-fi", "jazz"); varios separados por coma
+        mood (str): Opcional. Filtra por estado de ánimo (ej: "relajado", "energético")
     """
     try:
         vectorstore = initialize_knowledge_vectorstore()
         
         if vectorstore is None:
             return "Base de conocimiento no disponible"
-        
-        results = vectorstore.similarity_search_with_score(query, k=top_k)
-        
-        if not results:
-            return "No se encontró información relevante en la base de conocimiento"
-        
-        result = "Conocimiento musical relevante:\n"
-        for i, (doc, score) in enumerate(results, 1):
-            knowledge_text = doc.page_content
-            metadata = doc.metadata
-            result += f"{i}. {knowledge_text}\n"
-            if metadata.get('genero'):
-                result += f"   Género: {metadata.get('genero')}\n"
-            if metadata.get('actividad'):
-                # actividad ahora es un string, no una lista
-                result += f"   Actividad: {metadata.get('actividad')}\n"
-            result += "\n"
-        
-        return result
+
+        return search_musical_knowledge_cached(query, top_k, actividad, genero, mood)
     except Exception as e:
         return f"Error buscando en base de conocimiento: {str(e)}"
 
 
-def get_similar_contexts(query: str, top_k: int = 5) -> str:
+def search_musical_knowledge_cached(
+    query: str, top_k: int = 3, actividad: str = "", genero: str = "", mood: str = "", *, record: bool = True
+) -> str:
+    """Formatted knowledge results through the versioned LRU cache (see vectorstores.knowledge_cache)."""
+    from vectorstores.knowledge_cache import cache_key, knowledge_cache
+    from vectorstores.stores import knowledge_index_generation
+
+    from api.deadline import step_allowed, timed_step
+
+    vectorstore = initialize_knowledge_vectorstore()
+    # Read after initializing: (re)indexing bumps the generation.
+    version = knowledge_index_generation()
+    key = cache_key(query, top_k, actividad, genero, mood)
+    # Cached results are free; a fresh search is optional work under the request deadline.
+    if not knowledge_cache.contains(key, version) and not step_allowed("knowledge"):
+        return "Búsqueda en la base de conocimiento omitida por falta de tiempo: recomendá con la información que ya tenés."
+
+    def compute() -> str:
+        with timed_step("knowledge"):
+            return _format_knowledge_results(vectorstore, query, top_k, actividad, genero, mood)
+
+    return knowledge_cache.get_or_compute(key, version, compute, record=record)
+
+
+def _format_knowledge_results(vectorstore, query: str, top_k: int, actividad: str, genero: str, mood: str) -> str:
+    where = knowledge_filter(actividad=actividad, genero=genero, mood=mood)
+    results = search_knowledge(vectorstore, query, top_k, where)
+    if not results and where is not None:
+        # Valor fuera del vocabulario de la base: buscar sin prefiltro.
+        results = search_knowledge(vectorstore, query, top_k)
+    
+    if not results:
+        return "No se encontró información relevante en la base de conocimiento"
+    
+    result = "Conocimiento musical relevante:\n"
+    for i, (doc, score) in enumerate(results, 1):
+        knowledge_text = doc.page_content
+        metadata = doc.metadata
+        result += f"{i}. {knowledge_text}\n"
+        if metadata.get('genero'):
+            result += f"   Género: {metadata.get('genero')}\n"
+        if metadata.get('actividad'):
+            # actividad ahora es un string, no una lista
+            result += f"   Actividad: {metadata.get('actividad')}\n"
+        result += "\n"
+    
+    return result
+
+
+def _similar_contexts_key(query: str = "", top_k: int = 5, mood: str = "", weather: str = "", time_period: str = "") -> tuple:
+    filters = context_fields(mood=mood, weather=weather, time_period=time_period)
+    return (query or "").strip(), int(top_k), filters["mood"], filters["weather"], filters["time_period"]
+
+
+def memory_filter(user_id: Optional[int] = None, **fields: str) -> Optional[dict[str, Any]]:
+    """Chroma `where` for a user's contexts, prefiltered by the given CONTEXT_FIELDS values."""
+    normalized = context_fields(**fields)
+    clauses: list[dict[str, Any]] = [{"user_id": int(user_id)}] if user_id is not None else []
+    clauses += [{k: v} for k, v in normalized.items() if v and k in fields]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _no_contexts(filters: dict[str, str]) -> str:
+    if filters:
+        return f"No hay contextos previos con esos filtros ({', '.join(f'{k}={v}' for k, v in filters.items())})"
+    return "No hay contextos previos almacenados"
+
+
+def _unfiltered_note(filters: dict[str, str]) -> str:
+    return f"{_no_contexts(filters)}; se muestran resultados sin esos filtros.\n"
+
+
+@memoized_tool(key=_similar_contexts_key)
+def get_similar_contexts(query: str, top_k: int = 5, mood: str = "", weather: str = "", time_period: str = "") -> str:
     """
     Busca contextos similares usando búsqueda semántica con embeddings.
-    Si query está vacío, devuelve los últimos contextos del vector store.
+    Si query está vacío, devuelve los últimos contextos guardados (por fecha, sin búsqueda semántica).
+    Los filtros opcionales restringen la búsqueda a contextos guardados con ese mood, clima o momento del día;
+    si ningún contexto los cumple, se busca sin filtros (y se avisa en el resultado).
     
     Args:
         query (str): Consulta para buscar contextos similares (puede ser mood, actividad, etc.)
         top_k (int): Número máximo de contextos a retornar (por defecto 5)
+        mood (str): Opcional. Solo contextos con este estado de ánimo (ej: "relajado")
+        weather (str): Opcional. Solo contextos con este clima (ej: "lluvia")
+        time_period (str): Opcional. Solo contextos de este momento del día ("mañana", "tarde", "noche")
     """
     try:
-        vectorstore = initialize_memory_vectorstore()
-
         # If running under the API, restrict results to the authenticated user.
         try:
             from api.user_context import get_current_user_id  # type: ignore
             user_id = get_current_user_id()
         except Exception:
             user_id = None
+
+        # Only the user's partition is searched (MEMORY_PARTITIONING=user|bucket).
+        vectorstore = get_memory_vectorstore(user_id)
         
-        # Si no hay query, usar búsqueda genérica para obtener últimos contextos
+        filters = {k: v for k, v in (("mood", mood), ("weather", weather), ("time_period", time_period)) if v}
+        where = memory_filter(user_id, **filters)
+
+        # Sin query: los últimos contextos por timestamp (índice de recencia, sin embeddings)
         if not query or query.strip() == "":
-            query = "contexto previo"
-        
-        # Búsqueda semántica
+            recent = scan_recent_contexts(vectorstore, user_id, top_k, where=where) if filters else []
+            note = ""
+            if not recent:
+                recent = recent_contexts(vectorstore, user_id, top_k)
+                note = _unfiltered_note(filters) if recent else ""
+            if not recent:
+                return _no_contexts({})
+            result = note + "Contextos previos:\n"
+            for i, (_, context, metadata) in enumerate(recent, 1):
+                timestamp = metadata.get('timestamp', 'Unknown')
+                result += f"{i}. [{timestamp[:19]}] {context}\n"
+            return result
+
+        # Búsqueda semántica, prefiltrada por usuario y por los campos pedidos
         kwargs = {}
-        if user_id is not None:
-            kwargs["filter"] = {"user_id": int(user_id)}
+        if where is not None:
+            kwargs["filter"] = where
         results = vectorstore.similarity_search_with_score(query, k=top_k, **kwargs)
+        note = ""
+        if not results and filters:
+            # Ningún contexto con esos valores: buscar sin prefiltro (solo por usuario).
+            unfiltered = memory_filter(user_id)
+            results = vectorstore.similarity_search_with_score(
+                query, k=top_k, **({"filter": unfiltered} if unfiltered is not None else {})
+            )
+            note = _unfiltered_note(filters) if results else ""
         
         if not results:
-            return "No hay contextos previos almacenados"
+            return _no_contexts({})
         
         # Formatear resultados
-        if query == "contexto previo":
-            result = "Contextos previos:\n"
-            for i, (doc, score) in enumerate(results, 1):
-                timestamp = doc.metadata.get('timestamp', 'Unknown')
-                context = doc.page_content
-                result += f"{i}. [{timestamp[:19]}] {context}\n"
-        else:
-            result = f"Contextos similares a '{query}':\n"
-            for i, (doc, score) in enumerate(results, 1):
-                timestamp = doc.metadata.get('timestamp', 'Unknown')
-                context = doc.page_content
-                result += f"{i}. [{timestamp[:19]}] {context} (similitud: {score:.3f})\n"
+        result = note + f"Contextos similares a '{query}':\n"
+        for i, (doc, score) in enumerate(results, 1):
+            timestamp = doc.metadata.get('timestamp', 'Unknown')
+            context = doc.page_content
+            result += f"{i}. [{timestamp[:19]}] {context} (similitud: {score:.3f})\n"
         
         return result
     except Exception as e:
@@ -2,11 +2,48 @@
 
 import json
 
+from api.tool_memo import invalidates_tools, memoized_tool
 
-def list_playlists() -> str:
+
+def format_playlists(user_id: int, query: str = "", top_k: int = 0) -> str:
+    """
+    The user's playlists as prompt text. With `top_k` > 0 and a bigger catalog, only the
+    `top_k` most relevant to `query` (see vectorstores.playlist_index).
+    """
+    from db.unit_of_work import request_session
+    from db.repositories.playlists import PlaylistRow, list_playlists_for_user
+
+    # Copy the values under the session lock: the instances expire on other tools' commits.
+    with request_session() as db:
+        playlists = [PlaylistRow.of(p) for p in list_playlists_for_user(db, user_id=user_id)]
+
+    total = len(playlists)
+    if top_k > 0 and total > top_k:
+        from vectorstores.playlist_index import top_playlists
+
+        try:
+            playlists = top_playlists(user_id, playlists, query, top_k)
+        except Exception as e:
+            # The index is an optimization: fall back to the whole catalog.
+            print(f"⚠️ Índice de playlists no disponible: {e}")
+
+    if len(playlists) < total:
+        criterion = "más relevantes para ese contexto" if query.strip() else "editadas más recientemente"
+        result = f"Playlists disponibles ({len(playlists)} {criterion} de {total}):\n"
+    else:
+        result = "Playlists disponibles:\n"
+    for p in playlists:
+        result += f"- {p.name}: {p.description}\n"
+    return result
+
+
+@memoized_tool()
+def list_playlists(query: str = "") -> str:
     """
     Devuelve la lista de playlists disponibles junto con sus descripciones.
     Se utiliza como fuente de conocimiento base para la selección final de música.
+    Pasá en `query` el mood/actividad del usuario (ej: "estudio concentración, cansado"):
+    si el catálogo es grande, devuelve solo las playlists más relevantes para ese contexto.
     """
     try:
         # If running under the API, scope playlists per-user in DB.
@@ -17,16 +54,9 @@ def list_playlists() -> str:
             user_id = None
 
         if user_id is not None:
-            from db.session import SessionLocal
-            from db.repositories.playlists import list_playlists_for_user
+            from vectorstores.playlist_index import playlist_top_k
 
-            with SessionLocal() as db:
-                playlists = list_playlists_for_user(db, user_id=user_id)
-
-            result = "Playlists disponibles:\n"
-            for p in playlists:
-                result += f"- {p.name}: {p.description}\n"
-            return result
+            return format_playlists(user_id, query, playlist_top_k())
 
         with open('data/playlists.json', 'r', encoding='utf-8') as f:
             playlists = json.load(f)
@@ -40,6 +70,7 @@ def list_playlists() -> str:
         return f"Error cargando playlists: {str(e)}"
 
 
+@invalidates_tools("list_playlists")
 def add_playlist(name: str, description: str) -> str:
     """
     Permite agregar nuevas playlists al catálogo interno del agente.
@@ -53,12 +84,13 @@ def add_playlist(name: str, description: str) -> str:
             user_id = None
 
         if user_id is not None:
-            from db.session import SessionLocal
+            from db.unit_of_work import request_session
             from db.repositories.playlists import create_playlist_for_user
 
-            with SessionLocal() as db:
+            with request_session() as db:
                 p = create_playlist_for_user(db, user_id=user_id, name=name, description=description)
-            return f"Playlist '{p.name}' agregada exitosamente: {p.description}"
+                result = f"Playlist '{p.name}' agregada exitosamente: {p.description}"
+            return result
 
         with open('data/playlists.json', 'r', encoding='utf-8') as f:
             playlists = json.load(f)
@@ -73,6 +105,7 @@ def add_playlist(name: str, description: str) -> str:
         return f"Error agregando playlist: {str(e)}"
 
 
+@invalidates_tools("list_playlists")
 def edit_playlist(name: str, new_description: str) -> str:
     """
     Modifica la descripción o características de una playlist existente.
@@ -86,10 +119,10 @@ def edit_playlist(name: str, new_description: str) -> str:
             user_id = None
 
         if user_id is not None:
-            from db.session import SessionLocal
+            from db.unit_of_work import request_session
             from db.repositories.playlists import list_playlists_for_user, update_playlist_for_user
 
-            with SessionLocal() as db:
+            with request_session() as db:
                 playlists = list_playlists_for_user(db, user_id=user_id)
                 found = next((p for p in playlists if p.name == name), None)
                 if found is None:
@@ -117,6 +150,7 @@ def edit_playlist(name: str, new_description: str) -> str:
         return f"Error editando playlist: {str(e)}"
 
 
+@invalidates_tools("list_playlists")
 def delete_playlist(name: str) -> str:
     """
     Elimina una playlist del catálogo interno del agente.
@@ -130,10 +164,10 @@ def delete_playlist(name: str) -> str:
             user_id = None
 
         if user_id is not None:
-            from db.session import SessionLocal
+            from db.unit_of_work import request_session
             from db.repositories.playlists import list_playlists_for_user, delete_playlist_for_user
 
-            with SessionLocal() as db:
+            with request_session() as db:
                 playlists = list_playlists_for_user(db, user_id=user_id)
                 found = next((p for p in playlists if p.name == name), None)
                 if found is None:
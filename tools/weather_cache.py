@@ -0,0 +1,189 @@
+"""
+Caché compartida (por proceso) de clima y geolocalización.
+
+Weather is keyed on a lat/lon grid cell (WEATHER_CACHE_CELL_DEG=0.1, ~11 km) and a time
+bucket (WEATHER_CACHE_BUCKET_S=900; open-meteo's current_weather changes every 15 min),
+and fetched for the cell center, so every user in the same city and bucket shares one
+upstream call. IP geolocation (ipwho.is) is cached per IP for GEO_CACHE_TTL_S=86400; a
+failed lookup (`success: false` or no coordinates) raises, so it is retried next time.
+Likewise a weather response with an error status or without `current_weather` is not
+cached (current_weather() returns None for it).
+
+Concurrent misses on the same key wait for the first fetch (single flight). Exceptions are
+not cached. WEATHER_CACHE_SIZE=2048 bounds each cache (LRU); 0 disables caching.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+
+import requests
+
+from api.deadline import http_timeout
+
+WEATHER_DESCRIPTIONS = {
+    0: "despejado", 1: "mayormente despejado", 2: "parcialmente nublado",
+    3: "nublado", 45: "niebla", 48: "niebla helada", 51: "llovizna ligera",
+    53: "llovizna moderada", 55: "llovizna densa", 61: "lluvia ligera",
+    63: "lluvia moderada", 65: "lluvia intensa", 71: "nieve ligera",
+    73: "nieve moderada", 75: "nieve intensa", 77: "granizo",
+    80: "chubascos ligeros", 81: "chubascos moderados", 82: "chubascos intensos",
+    85: "chubascos de nieve ligeros", 86: "chubascos de nieve intensos",
+    95: "tormenta eléctrica", 96: "tormenta con granizo ligero", 99: "tormenta con granizo intenso"
+}
+
+
+class SharedCache:
+    """LRU with per-entry expiry and single-flight misses, shared by every request of the process."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = int(max_size)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: dict[Hashable, Future] = {}
+        self.stats_counters = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "evicted": 0}
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], expires_at: float) -> Any:
+        if self.max_size <= 0:
+            return fetch()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.stats_counters["hits"] += 1
+                return entry[1]
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.stats_counters["coalesced"] += 1
+                owner = False
+            else:
+                self.stats_counters["misses"] += 1
+                fut = Future()
+                self._inflight[key] = fut
+                owner = True
+        if not owner:
+            return fut.result()
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self.stats_counters["errors"] += 1
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            # Expired entries first, then least recently used.
+            for k in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+                del self._entries[k]
+                self.stats_counters["evicted"] += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats_counters["evicted"] += 1
+        fut.set_result(value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            served = self.stats_counters["hits"] + self.stats_counters["coalesced"]
+            lookups = served + self.stats_counters["misses"]
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                **self.stats_counters,
+                # Coalesced lookups also skipped the upstream call.
+                "hit_ratio": round(served / lookups, 3) if lookups else None,
+            }
+
+
+def _cache_size() -> int:
+    return max(0, int(os.getenv("WEATHER_CACHE_SIZE", "2048")))
+
+
+weather_cache = SharedCache(_cache_size())
+geo_cache = SharedCache(_cache_size())
+
+
+def _cell_deg() -> float:
+    return max(0.001, float(os.getenv("WEATHER_CACHE_CELL_DEG", "0.1")))
+
+
+def _bucket_s() -> float:
+    return max(1.0, float(os.getenv("WEATHER_CACHE_BUCKET_S", "900")))
+
+
+def grid_cell(latitude: float, longitude: float, cell_deg: Optional[float] = None) -> tuple[int, int]:
+    cell_deg = cell_deg or _cell_deg()
+    return math.floor(latitude / cell_deg), math.floor(longitude / cell_deg)
+
+
+def _fetch_weather(latitude: float, longitude: float) -> tuple[str, float]:
+    url = (
+        f"https://api.open-meteo.com/v1/forecast?latitude={latitude:.4f}&longitude={longitude:.4f}"
+        "&current_weather=true"
+    )
+    response = requests.get(url, timeout=http_timeout(10))
+    response.raise_for_status()
+    data = response.json()
+    if "current_weather" not in data:
+        # Error/rate-limit body: raise so the whole cell is not left without weather.
+        raise ValueError(f"open-meteo sin current_weather: {data.get('reason', data)}")
+    weather = data["current_weather"]
+    code = weather.get("weathercode", 0)
+    return WEATHER_DESCRIPTIONS.get(code, "condiciones variables"), weather.get("temperature", 0)
+
+
+def current_weather(latitude: float, longitude: float) -> Optional[tuple[str, float]]:
+    """(description, °C) for the grid cell containing the point, or None if unavailable."""
+    cell_deg = _cell_deg()
+    cell = grid_cell(latitude, longitude, cell_deg)
+    bucket_s = _bucket_s()
+    bucket = int(time.time() // bucket_s)
+    center = ((cell[0] + 0.5) * cell_deg, (cell[1] + 0.5) * cell_deg)
+    try:
+        return weather_cache.get_or_fetch(
+            ("weather", cell, bucket),
+            lambda: _fetch_weather(*center),
+            expires_at=(bucket + 1) * bucket_s,
+        )
+    except Exception as e:
+        # Failures are not cached: the next turn in this cell tries upstream again.
+        print(f"⚠️ Clima no disponible: {e}")
+        return None
+
+
+def _fetch_geolocation(ip: Optional[str]) -> dict[str, Any]:
+    response = requests.get(f"https://ipwho.is/{ip or ''}", timeout=http_timeout(10))
+    response.raise_for_status()
+    data = response.json()
+    if data.get("success") is False or data.get("latitude") is None or data.get("longitude") is None:
+        raise ValueError(f"Geolocalización fallida para la IP {ip or '(servidor)'}: {data.get('message', 'sin coordenadas')}")
+    return {
+        "city": data.get("city", "Unknown"),
+        "country": data.get("country", "Unknown"),
+        "latitude": data.get("latitude"),
+        "longitude": data.get("longitude"),
+    }
+
+
+def geolocate(ip: Optional[str] = None) -> dict[str, Any]:
+    """City, country and coordinates of `ip` (None: this server's public IP)."""
+    ttl = float(os.getenv("GEO_CACHE_TTL_S", "86400"))
+    return geo_cache.get_or_fetch(("geo", ip or ""), lambda: _fetch_geolocation(ip), expires_at=time.time() + ttl)
+
+
+def cache_stats() -> dict[str, Any]:
+    return {"weather": weather_cache.stats(), "geolocation": geo_cache.stats()}
@@ -2,11 +2,15 @@
 
 from .stores import (
     initialize_memory_vectorstore,
-    initialize_knowledge_vectorstore
+    initialize_knowledge_vectorstore,
+    get_memory_vectorstore
 )
+from .retention import memory_doc_id, compact_memory
 
 __all__ = [
     'initialize_memory_vectorstore',
-    'initialize_knowledge_vectorstore'
+    'initialize_knowledge_vectorstore',
+    'get_memory_vectorstore',
+    'memory_doc_id',
+    'compact_memory'
 ]
-
@@ -0,0 +1,178 @@
+"""Búsqueda híbrida (densa + BM25) con prefiltro por metadata sobre la base de conocimiento."""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Iterable, Optional, Union
+
+from langchain_core.documents import Document
+
+from vectorstores.stores import KNOWLEDGE_FILTER_FIELDS, knowledge_field_key, knowledge_index_generation, knowledge_token
+
+
+_LEXICAL_META_FIELDS = frozenset(KNOWLEDGE_FILTER_FIELDS) | {"tags"}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a al algo con de del el en es la las lo los mas me mi muy o para por que se sin su sus un una y".split()
+)
+
+
+def _search_mode() -> str:
+    # hybrid: dense + BM25 fused with RRF | dense: previous pure vector search
+    return os.getenv("KNOWLEDGE_SEARCH_MODE", "hybrid").strip().lower()
+
+
+def tokenize(text: str) -> list[str]:
+    folded = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    return [t for t in _TOKEN_RE.findall(folded) if len(t) > 1 and t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a small, static corpus (kept fully in memory)."""
+
+    def __init__(self, documents: list[Document], *, k1: float = 1.5, b: float = 0.75) -> None:
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self._tfs: list[Counter[str]] = []
+        df: Counter[str] = Counter()
+        for doc in documents:
+            # Metadata (géneros, actividades, tags) is part of the lexical surface too.
+            meta_text = " ".join(
+                str(v) for k, v in doc.metadata.items() if k in _LEXICAL_META_FIELDS and isinstance(v, str)
+            )
+            tf = Counter(tokenize(f"{doc.page_content} {meta_text}"))
+            self._tfs.append(tf)
+            df.update(tf.keys())
+        self._lengths = [sum(tf.values()) for tf in self._tfs]
+        self._avg_len = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        n = len(documents)
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def search(self, query: str, k: int, where: Optional[dict[str, Any]] = None) -> list[tuple[Document, float]]:
+        terms = [t for t in tokenize(query) if t in self._idf]
+        if not terms:
+            return []
+        scored: list[tuple[float, int]] = []
+        for i, tf in enumerate(self._tfs):
+            if where is not None and not matches_filter(self.documents[i].metadata, where):
+                continue
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._avg_len or 1.0))
+            score = 0.0
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    score += self._idf[t] * f * (self.k1 + 1) / (f + norm)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(reverse=True)
+        return [(self.documents[i], score) for score, i in scored[:k]]
+
+
+def knowledge_filter(**fields: Union[str, Iterable[str], None]) -> Optional[dict[str, Any]]:
+    """
+    Chroma `where` over the boolean knowledge fields, e.g.
+    knowledge_filter(actividad="estudio", genero="lo-fi, jazz")
+    -> {"$and": [{"actividad__estudio": True}, {"$or": [{"genero__lo_fi": True}, {"genero__jazz": True}]}]}
+
+    Values of one field are OR-ed, fields are AND-ed. Empty values are ignored.
+    """
+    clauses: list[dict[str, Any]] = []
+    for field, raw in fields.items():
+        if field not in KNOWLEDGE_FILTER_FIELDS:
+            raise ValueError(f"Campo de conocimiento no filtrable: {field}")
+        if not raw:
+            continue
+        values = raw.split(",") if isinstance(raw, str) else list(raw)
+        keys = sorted({knowledge_field_key(field, v) for v in values if knowledge_token(v)})
+        if not keys:
+            continue
+        per_field = [{key: True} for key in keys]
+        clauses.append(per_field[0] if len(per_field) == 1 else {"$or": per_field})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def matches_filter(metadata: dict[str, Any], where: dict[str, Any]) -> bool:
+    """Evaluate a `knowledge_filter` expression in Python (used by the lexical side)."""
+    if "$and" in where:
+        return all(matches_filter(metadata, c) for c in where["$and"])
+    if "$or" in where:
+        return any(matches_filter(metadata, c) for c in where["$or"])
+    return all(metadata.get(k) == v for k, v in where.items())
+
+
+_bm25_lock = threading.Lock()
+_bm25: Optional[tuple[int, int, BM25Index]] = None  # (store id, index generation, index)
+
+
+def get_bm25_index(store: Any) -> BM25Index:
+    """BM25 index over the knowledge store contents, rebuilt when the store is re-indexed."""
+    global _bm25
+    key = (id(store), knowledge_index_generation())
+    cached = _bm25
+    if cached is not None and cached[:2] == key:
+        return cached[2]
+    with _bm25_lock:
+        if _bm25 is None or _bm25[:2] != key:
+            got = store.get(include=["documents", "metadatas"])
+            docs = [
+                Document(page_content=text or "", metadata=meta or {})
+                for text, meta in zip(got.get("documents") or [], got.get("metadatas") or [])
+            ]
+            _bm25 = (key[0], key[1], BM25Index(docs))
+        return _bm25[2]
+
+
+def _doc_key(doc: Document) -> str:
+    return str(doc.metadata.get("id") or doc.page_content)
+
+
+def hybrid_search(
+    store: Any,
+    query: str,
+    k: int,
+    where: Optional[dict[str, Any]] = None,
+    *,
+    candidates: Optional[int] = None,
+    rrf_k: int = 60,
+) -> list[tuple[Document, float]]:
+    """
+    Dense + BM25 results fused with Reciprocal Rank Fusion (score = sum 1/(rrf_k + rank)).
+    Both sides honor the same metadata prefilter.
+    """
+    n = candidates or max(k * 4, 10)
+    kwargs: dict[str, Any] = {"filter": where} if where is not None else {}
+    dense = store.similarity_search_with_score(query, k=n, **kwargs)
+    lexical = get_bm25_index(store).search(query, n, where)
+
+    fused: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for ranked in (dense, lexical):
+        for rank, (doc, _) in enumerate(ranked, 1):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    best = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:k]
+    return [(docs[key], score) for key, score in best]
+
+
+def search_knowledge(
+    store: Any,
+    query: str,
+    k: int,
+    where: Optional[dict[str, Any]] = None,
+    *,
+    mode: Optional[str] = None,
+) -> list[tuple[Document, float]]:
+    """Knowledge retrieval honoring KNOWLEDGE_SEARCH_MODE (hybrid | dense)."""
+    if (mode or _search_mode()) == "dense":
+        kwargs: dict[str, Any] = {"filter": where} if where is not None else {}
+        return store.similarity_search_with_score(query, k=k, **kwargs)
+    return hybrid_search(store, query, k, where)
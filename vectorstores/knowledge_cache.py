@@ -0,0 +1,223 @@
+"""
+Caché LRU de resultados formateados de search_musical_knowledge.
+
+The knowledge base is static between re-indexes, so the formatted result of a query
+(embedding + vector/BM25 search + formatting) is cached per process, keyed by the
+normalized query, top_k and filters. Entries are tagged with the knowledge index
+generation (vectorstores.stores.knowledge_index_generation, bumped on every re-index),
+so a re-index makes every older entry a miss and it is evicted on lookup.
+
+Query frequencies are kept in a small JSON history file shared by the API workers;
+`warm_knowledge_cache()` replays the most frequent ones at startup.
+
+Config: KNOWLEDGE_CACHE_SIZE=256 (0 = disabled), KNOWLEDGE_CACHE_WARM=32 (queries
+replayed at startup), KNOWLEDGE_QUERY_HISTORY=./knowledge_query_history.json,
+KNOWLEDGE_QUERY_HISTORY_MAX=1000 (distinct queries kept in the file),
+KNOWLEDGE_QUERY_HISTORY_SAVE_S=300 (history flush interval; also saved on shutdown).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: history writes are not serialized across processes.
+    fcntl = None
+
+CacheKey = tuple[str, int, str, str, str]
+
+
+def _cache_size() -> int:
+    return max(0, int(os.getenv("KNOWLEDGE_CACHE_SIZE", "256")))
+
+
+def _history_path() -> str:
+    return os.getenv("KNOWLEDGE_QUERY_HISTORY", "./knowledge_query_history.json")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join((query or "").casefold().split())
+
+
+def cache_key(query: str, top_k: int = 3, actividad: str = "", genero: str = "", mood: str = "") -> CacheKey:
+    return (
+        normalize_query(query),
+        int(top_k),
+        normalize_query(actividad),
+        normalize_query(genero),
+        normalize_query(mood),
+    )
+
+
+class KnowledgeResultCache:
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = int(max_size)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, tuple[int, str]]" = OrderedDict()
+        # Queries seen since the last history save (frequencies for warmup).
+        self._pending_history: Counter[CacheKey] = Counter()
+        self.stats_counters = {"hits": 0, "misses": 0, "stale": 0, "evicted": 0, "warmed": 0}
+
+    def get(self, key: CacheKey, version: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats_counters["misses"] += 1
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                self.stats_counters["stale"] += 1
+                self.stats_counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats_counters["hits"] += 1
+            return entry[1]
+
+    def contains(self, key: CacheKey, version: int) -> bool:
+        """Fresh entry present (no stats, no LRU update)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] == version
+
+    def put(self, key: CacheKey, version: int, value: str) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats_counters["evicted"] += 1
+
+    def get_or_compute(self, key: CacheKey, version: int, compute: Callable[[], str], *, record: bool = True) -> str:
+        """Cached value for `key`, or compute() (exceptions propagate and are not cached)."""
+        if record:
+            with self._lock:
+                self._pending_history[key] += 1
+        if self.max_size > 0:
+            cached = self.get(key, version)
+            if cached is not None:
+                return cached
+        value = compute()
+        self.put(key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.stats_counters["hits"] + self.stats_counters["misses"]
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                **self.stats_counters,
+                "hit_ratio": round(self.stats_counters["hits"] / lookups, 3) if lookups else None,
+            }
+
+    # --- query history (warmup source) ----------------------------------
+
+    def save_history(self, path: Optional[str] = None) -> int:
+        """Merge the queries seen since the last save into the shared history file."""
+        with self._lock:
+            pending, self._pending_history = self._pending_history, Counter()
+        if not pending:
+            return 0
+        path = path or _history_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            counts = _read_history(path)
+            counts.update(pending)
+            keep = max(1, int(os.getenv("KNOWLEDGE_QUERY_HISTORY_MAX", "1000")))
+            rows = [{"key": list(k), "count": n} for k, n in counts.most_common(keep)]
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        return len(pending)
+
+
+def _read_history(path: str) -> Counter[CacheKey]:
+    counts: Counter[CacheKey] = Counter()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for row in json.load(f):
+                key = tuple(row["key"])
+                if len(key) == 5:
+                    counts[(str(key[0]), int(key[1]), str(key[2]), str(key[3]), str(key[4]))] += int(row["count"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return counts
+
+
+def frequent_queries(limit: int, path: Optional[str] = None) -> list[CacheKey]:
+    return [k for k, _ in _read_history(path or _history_path()).most_common(max(0, limit))]
+
+
+knowledge_cache = KnowledgeResultCache(_cache_size())
+
+
+def warm_knowledge_cache(limit: Optional[int] = None) -> int:
+    """Run the most frequent historical queries so their results start cached."""
+    from tools.memory import search_musical_knowledge_cached
+
+    if knowledge_cache.max_size <= 0:
+        return 0
+    limit = int(os.getenv("KNOWLEDGE_CACHE_WARM", "32")) if limit is None else limit
+    warmed = 0
+    for query, top_k, actividad, genero, mood in frequent_queries(min(limit, knowledge_cache.max_size)):
+        try:
+            search_musical_knowledge_cached(query, top_k, actividad, genero, mood, record=False)
+            warmed += 1
+        except Exception as e:
+            print(f"⚠️ No se pudo precalentar la consulta {query!r}: {e}")
+    with knowledge_cache._lock:
+        knowledge_cache.stats_counters["warmed"] += warmed
+    return warmed
+
+
+_saver: Optional[threading.Thread] = None
+_saver_stop = threading.Event()
+
+
+def _save_history_safely() -> None:
+    try:
+        knowledge_cache.save_history()
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el historial de consultas de conocimiento: {e}")
+
+
+def _history_loop(interval_s: float) -> None:
+    while not _saver_stop.wait(interval_s):
+        _save_history_safely()
+
+
+def start_history_saver(interval_s: Optional[float] = None) -> bool:
+    """Periodically persist query frequencies (KNOWLEDGE_QUERY_HISTORY_SAVE_S=300, 0 = only on stop)."""
+    global _saver
+    if interval_s is None:
+        interval_s = float(os.getenv("KNOWLEDGE_QUERY_HISTORY_SAVE_S", "300"))
+    if interval_s <= 0 or (_saver is not None and _saver.is_alive()):
+        return False
+    _saver_stop.clear()
+    _saver = threading.Thread(target=_history_loop, args=(interval_s,), name="knowledge-history", daemon=True)
+    _saver.start()
+    return True
+
+
+def stop_history_saver(timeout: float = 5.0) -> None:
+    global _saver
+    _saver_stop.set()
+    if _saver is not None:
+        _saver.join(timeout=timeout)
+    _saver = None
+    _save_history_safely()
@@ -0,0 +1,217 @@
+"""
+Export/import binario de la memoria sin re-embeber.
+
+A dump is one uncompressed .npz (loaded with allow_pickle=False):
+
+- `embeddings`: float32 matrix (n, dim), copied from Chroma as stored
+- `ids`, `documents`, `metadatas`: UTF-8 blobs + int64 offsets (metadata rows are JSON),
+  so variable-length text costs its size and not n * max_len
+- `header`: JSON with format version, embedding model id, dim, count and users
+
+Import is a bulk upsert of those arrays into the collection each context belongs to under
+the current MEMORY_PARTITIONING; the embedding model is never called. A dump made with a
+different embedding model is refused (its vectors would not be comparable) unless forced.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+DUMP_FORMAT = "musicbot-memory"
+DUMP_VERSION = 1
+
+
+def _pack_strings(values: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+    raw = blob.tobytes()
+    bounds = offsets.tolist()
+    return [raw[bounds[i] : bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+def _user_where(user_id: Optional[int]) -> Optional[dict[str, Any]]:
+    return {"user_id": int(user_id)} if user_id is not None else None
+
+
+def export_memory(path: str, user_id: Optional[int] = None, *, batch: int = 5000) -> dict[str, Any]:
+    """
+    Write every context (or only `user_id`'s) of every memory collection to `path`.
+    Returns a small report (docs, users, bytes, seconds).
+    """
+    from config.embeddings import embedding_model_id
+    from vectorstores.stores import _memory_store_for_collection, list_memory_collections
+
+    started = time.perf_counter()
+    ids: list[str] = []
+    documents: list[str] = []
+    metadatas: list[str] = []
+    chunks: list[np.ndarray] = []
+    users: set[Any] = set()
+
+    for name in list_memory_collections():
+        collection = _memory_store_for_collection(name)._collection
+        offset = 0
+        while True:
+            page = collection.get(
+                where=_user_where(user_id),
+                include=["embeddings", "documents", "metadatas"],
+                limit=batch,
+                offset=offset,
+            )
+            page_ids = page.get("ids") or []
+            if not page_ids:
+                break
+            offset += len(page_ids)
+            ids += page_ids
+            documents += [d or "" for d in page["documents"]]
+            for meta in page["metadatas"]:
+                meta = meta or {}
+                users.add(meta.get("user_id"))
+                metadatas.append(json.dumps(meta, ensure_ascii=False))
+            chunks.append(np.asarray(page["embeddings"], dtype=np.float32))
+
+    embeddings = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+    header = {
+        "format": DUMP_FORMAT,
+        "version": DUMP_VERSION,
+        "embedding_model": embedding_model_id(),
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        "count": len(ids),
+        "users": sorted(u for u in users if u is not None),
+        "user_filter": user_id,
+        "created_at": datetime.now().isoformat(),
+    }
+    id_blob, id_offsets = _pack_strings(ids)
+    doc_blob, doc_offsets = _pack_strings(documents)
+    meta_blob, meta_offsets = _pack_strings(metadatas)
+
+    # Write to a temp file and rename: an interrupted export never leaves a truncated dump.
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f,
+                header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+                embeddings=embeddings,
+                ids=id_blob,
+                id_offsets=id_offsets,
+                documents=doc_blob,
+                doc_offsets=doc_offsets,
+                metadatas=meta_blob,
+                meta_offsets=meta_offsets,
+            )
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    return {
+        "path": path,
+        "docs": len(ids),
+        "users": len(header["users"]),
+        "dim": header["dim"],
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def read_dump(path: str) -> tuple[dict[str, Any], np.ndarray, list[str], list[str], list[dict[str, Any]]]:
+    """(header, embeddings, ids, documents, metadatas) of a dump file."""
+    with open(path, "rb") as f:
+        data = np.load(io.BytesIO(f.read()), allow_pickle=False)
+    header = json.loads(data["header"].tobytes().decode("utf-8"))
+    if header.get("format") != DUMP_FORMAT or int(header.get("version", 0)) > DUMP_VERSION:
+        raise ValueError(f"{path}: no es un dump de memoria compatible ({header.get('format')} v{header.get('version')})")
+    ids = _unpack_strings(data["ids"], data["id_offsets"])
+    documents = _unpack_strings(data["documents"], data["doc_offsets"])
+    metadatas = [json.loads(m) for m in _unpack_strings(data["metadatas"], data["meta_offsets"])]
+    return header, data["embeddings"], ids, documents, metadatas
+
+
+def import_memory(
+    path: str,
+    *,
+    user_id: Optional[int] = None,
+    as_user: Optional[int] = None,
+    batch: int = 5000,
+    force: bool = False,
+) -> dict[str, Any]:
+    """
+    Bulk-upsert a dump into the memory store (no embedding calls).
+
+    `user_id` imports only that user's contexts; `as_user` re-assigns them to another
+    user id (ids are recomputed, see memory_doc_id). Re-importing the same dump is idempotent.
+    """
+    from config.embeddings import embedding_model_id
+    from vectorstores.recency import record_recent_many
+    from vectorstores.retention import _doc_timestamp, memory_doc_id
+    from vectorstores.stores import _get_memory_client, _memory_store_for_collection, memory_collection_name
+
+    started = time.perf_counter()
+    header, embeddings, ids, documents, metadatas = read_dump(path)
+    if header.get("embedding_model") != embedding_model_id() and not force:
+        raise ValueError(
+            f"El dump usa embeddings {header.get('embedding_model')!r} y la app {embedding_model_id()!r}; "
+            "los vectores no serían comparables (--force para importarlo igual)"
+        )
+    loaded = time.perf_counter() - started
+
+    groups: dict[str, list[int]] = {}
+    for i, meta in enumerate(metadatas):
+        owner = meta.get("user_id")
+        if user_id is not None and owner != int(user_id):
+            continue
+        if as_user is not None:
+            owner = int(as_user)
+            meta["user_id"] = owner
+            ids[i] = memory_doc_id(documents[i], owner)
+            meta["id"] = ids[i]
+        groups.setdefault(memory_collection_name(owner), []).append(i)
+
+    try:
+        batch = max(1, min(batch, _get_memory_client().get_max_batch_size()))
+    except Exception:
+        batch = max(1, batch)
+
+    imported = 0
+    recent: list[tuple[str, Optional[int], float]] = []
+    for name, rows in groups.items():
+        collection = _memory_store_for_collection(name)._collection
+        for start in range(0, len(rows), batch):
+            idx = rows[start : start + batch]
+            collection.upsert(
+                ids=[ids[i] for i in idx],
+                embeddings=embeddings[idx],
+                documents=[documents[i] for i in idx],
+                metadatas=[metadatas[i] for i in idx],
+            )
+            imported += len(idx)
+        recent += [(ids[i], metadatas[i].get("user_id"), _doc_timestamp(metadatas[i])) for i in rows]
+    record_recent_many(recent)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "path": path,
+        "docs": imported,
+        "collections": {name: len(rows) for name, rows in groups.items()},
+        "load_seconds": round(loaded, 3),
+        "seconds": round(elapsed, 3),
+        "docs_per_s": round(imported / elapsed, 1) if elapsed > 0 else None,
+    }
@@ -0,0 +1,245 @@
+"""Vector store en proceso (NumPy) para corpus chicos y estáticos como la base de conocimiento."""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+_VECTORS_PREFIX = "vectors-"
+_META_FILE = "meta.json"
+
+
+def _replace_atomically(path: str, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class NumpyVectorStore:
+    """
+    Exact top-k over a memory-mapped float32 matrix of unit vectors.
+
+    Metadata lives in per-key column arrays so `where` filters are evaluated as vectorized
+    masks. Exposes the subset of the langchain Chroma API the app uses
+    (`similarity_search_with_score`, `get`). Scores are squared L2 distances between unit
+    vectors (2 - 2*cos), i.e. the same scale Chroma returns by default: lower is better.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Sequence[dict[str, Any]],
+        embedding_function: Any,
+    ) -> None:
+        self._vectors = vectors
+        self._ids = list(ids)
+        self._documents = list(documents)
+        self._metadatas = [dict(m or {}) for m in metadatas]
+        self._embedding_function = embedding_function
+        keys = sorted({k for m in self._metadatas for k in m})
+        self._columns: dict[str, np.ndarray] = {}
+        for key in keys:
+            col = np.empty(len(self._metadatas), dtype=object)
+            col[:] = [m.get(key) for m in self._metadatas]
+            self._columns[key] = col
+
+    # --- construction -------------------------------------------------
+
+    @staticmethod
+    def _fingerprint(ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[dict[str, Any]]) -> str:
+        # The embedding model is part of the key: vectors from another provider/model are
+        # not comparable even when the dimension happens to match.
+        from config.embeddings import embedding_model_id
+
+        payload = json.dumps(
+            [embedding_model_id(), list(ids), list(documents), list(metadatas)], ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def build(
+        cls,
+        directory: str,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Sequence[dict[str, Any]],
+        embedding_function: Any,
+    ) -> "NumpyVectorStore":
+        """
+        Embed `documents` and persist the matrix + metadata table under `directory`.
+
+        Other workers may still have the previous matrix mapped: it is never rewritten in
+        place. The new one goes to its own file (named after the fingerprint) and meta.json
+        is swapped atomically (temp file + os.replace) to point at it; old matrices are
+        unlinked, which keeps existing mappings valid.
+        """
+        os.makedirs(directory, exist_ok=True)
+        if documents:
+            raw = np.asarray(embedding_function.embed_documents(list(documents)), dtype=np.float32)
+        else:
+            raw = np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(raw, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = raw / norms
+
+        fingerprint = cls._fingerprint(ids, documents, metadatas)
+        vectors_file = f"{_VECTORS_PREFIX}{fingerprint[:16]}.f32"
+        if matrix.size:
+            _replace_atomically(os.path.join(directory, vectors_file), matrix.tobytes())
+
+        meta = {
+            "dim": int(matrix.shape[1]) if matrix.size else 0,
+            "count": int(matrix.shape[0]),
+            "fingerprint": fingerprint,
+            "vectors_file": vectors_file,
+            "ids": list(ids),
+            "documents": list(documents),
+            "metadatas": list(metadatas),
+        }
+        _replace_atomically(os.path.join(directory, _META_FILE), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        for stale in glob.glob(os.path.join(directory, f"{_VECTORS_PREFIX}*.f32")):
+            if os.path.basename(stale) != vectors_file:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+        return cls.load(directory, embedding_function)
+
+    @classmethod
+    def load(cls, directory: str, embedding_function: Any) -> "NumpyVectorStore":
+        with open(os.path.join(directory, _META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        count, dim = int(meta["count"]), int(meta["dim"])
+        if count and dim:
+            vectors = np.memmap(os.path.join(directory, meta["vectors_file"]), dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        return cls(vectors, meta["ids"], meta["documents"], meta["metadatas"], embedding_function)
+
+    @classmethod
+    def load_or_build(
+        cls,
+        directory: str,
+        ids: Sequence[str],
+        documents: Sequence[str],
+        metadatas: Sequence[dict[str, Any]],
+        embedding_function: Any,
+    ) -> tuple["NumpyVectorStore", bool]:
+        """Load the persisted index if it matches the given corpus, else rebuild it. Returns (store, rebuilt)."""
+        try:
+            with open(os.path.join(directory, _META_FILE), "r", encoding="utf-8") as f:
+                fingerprint = json.load(f).get("fingerprint")
+            if fingerprint == cls._fingerprint(ids, documents, metadatas):
+                store = cls.load(directory, embedding_function)
+                # Same key but vectors the model cannot query (e.g. a different FAKE_EMBEDDINGS_DIM): rebuild.
+                if not len(store) or len(embedding_function.embed_query("dim")) == store._vectors.shape[1]:
+                    return store, False
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        return cls.build(directory, ids, documents, metadatas, embedding_function), True
+
+    # --- queries ------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _mask(self, where: dict[str, Any]) -> np.ndarray:
+        n = len(self._ids)
+        if "$and" in where:
+            return np.logical_and.reduce([self._mask(c) for c in where["$and"]] or [np.ones(n, dtype=bool)])
+        if "$or" in where:
+            return np.logical_or.reduce([self._mask(c) for c in where["$or"]] or [np.zeros(n, dtype=bool)])
+        mask = np.ones(n, dtype=bool)
+        for key, value in where.items():
+            if isinstance(value, dict):
+                if set(value) != {"$eq"}:
+                    raise ValueError(f"Operador no soportado en NumpyVectorStore: {value}")
+                value = value["$eq"]
+            col = self._columns.get(key)
+            if col is None:
+                return np.zeros(n, dtype=bool)
+            mask &= np.asarray(col == value, dtype=bool)
+        return mask
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: Sequence[float], k: int = 4, filter: Optional[dict[str, Any]] = None
+    ) -> list[tuple[Document, float]]:
+        if not self._ids or k <= 0:
+            return []
+        q = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(q))
+        if norm > 0:
+            q = q / norm
+        sims = self._vectors @ q
+        if filter:
+            candidates = np.flatnonzero(self._mask(filter))
+            if candidates.size == 0:
+                return []
+            sims = sims[candidates]
+        else:
+            candidates = None
+        k = min(k, sims.shape[0])
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        out: list[tuple[Document, float]] = []
+        for j in top:
+            i = int(candidates[j]) if candidates is not None else int(j)
+            doc = Document(page_content=self._documents[i], metadata=dict(self._metadatas[i]))
+            out.append((doc, float(2.0 - 2.0 * sims[j])))
+        return out
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict[str, Any]] = None, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict[str, Any]] = None, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Optional[Sequence[str]] = None,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        """Chroma-style `get` (ids + requested fields)."""
+        include = ["documents", "metadatas"] if include is None else list(include)
+        idx = np.arange(len(self._ids))
+        if where:
+            idx = idx[self._mask(where)]
+        if ids is not None:
+            wanted = set(ids)
+            idx = np.array([i for i in idx if self._ids[i] in wanted], dtype=int)
+        start = offset or 0
+        idx = idx[start : start + limit] if limit is not None else idx[start:]
+        out: dict[str, Any] = {"ids": [self._ids[i] for i in idx]}
+        if "documents" in include:
+            out["documents"] = [self._documents[i] for i in idx]
+        if "metadatas" in include:
+            out["metadatas"] = [dict(self._metadatas[i]) for i in idx]
+        if "embeddings" in include:
+            out["embeddings"] = np.asarray(self._vectors[idx]) if len(idx) else np.zeros((0, self._vectors.shape[1]), dtype=np.float32)
+        return out
@@ -0,0 +1,220 @@
+"""
+Índice vectorial de playlists por usuario: preselección de las top-K para el prompt.
+
+Every playlist is embedded as "name: description" into the `playlists` collection of the
+memory Chroma client (metadata: user_id, playlist_id), so list_playlists can hand the
+agent only the PLAYLIST_TOP_K=8 playlists closest to the turn's mood/activity instead of
+the whole catalog.
+
+The index is maintained incrementally from db.repositories.playlists: after each commit,
+create/update enqueue an upsert of that row and delete enqueues its removal. A background
+thread applies them in batches (the defaults seeded at signup usually go in one), so
+a playlist write never waits for, nor fails because of, the embedding model. A search
+waits briefly for the user's pending changes and then only queries the index. The DB
+stays the source of truth: results are checked against the user's rows, and a user is
+reconciled with the DB (missing/changed rows upserted, stale ids deleted) once per
+process, or again after a failed update. PLAYLIST_TOP_K=0 disables the index.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import queue
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+if TYPE_CHECKING:
+    from db.repositories.playlists import PlaylistRow
+
+PLAYLIST_COLLECTION = "playlists"
+# How long a search waits for the user's queued index updates before querying anyway.
+_PENDING_WAIT_S = 2.0
+
+_synced_lock = threading.Lock()
+_synced: set[tuple[str, int]] = set()
+
+_jobs: "queue.Queue[tuple[contextvars.Context, int, int, Optional[PlaylistRow]]]" = queue.Queue()
+_worker: Optional[threading.Thread] = None
+_start_lock = threading.Lock()
+_pending_cond = threading.Condition()
+_pending: Counter = Counter()
+_stats = {"upserts": 0, "deletes": 0, "batches": 0, "errors": 0, "reconciles": 0}
+
+
+def playlist_top_k() -> int:
+    return max(0, int(os.getenv("PLAYLIST_TOP_K", "8")))
+
+
+def playlist_index_enabled() -> bool:
+    return playlist_top_k() > 0
+
+
+def _store():
+    from vectorstores.stores import _memory_store_for_collection
+
+    return _memory_store_for_collection(PLAYLIST_COLLECTION)
+
+
+def _doc_id(playlist_id: int) -> str:
+    return f"playlist_{int(playlist_id)}"
+
+
+def _text(p: "PlaylistRow") -> str:
+    return f"{p.name}: {p.description}"
+
+
+def index_playlists(playlists: Iterable["PlaylistRow"]) -> None:
+    """Upsert (embed) the given playlists."""
+    rows = list(playlists)
+    if not rows or not playlist_index_enabled():
+        return
+    _store().add_texts(
+        [_text(p) for p in rows],
+        metadatas=[{"user_id": int(p.user_id), "playlist_id": int(p.id), "name": p.name} for p in rows],
+        ids=[_doc_id(p.id) for p in rows],
+    )
+
+
+def forget_playlists(playlist_ids: Iterable[int]) -> None:
+    ids = [_doc_id(i) for i in playlist_ids]
+    if not ids or not playlist_index_enabled():
+        return
+    _store().delete(ids=ids)
+
+
+# --- write path (repository hooks) ----------------------------------------
+
+
+def on_playlist_saved(playlist: "PlaylistRow") -> None:
+    """Repository hook, after commit: queue the upsert of a created/updated playlist."""
+    _submit(playlist.user_id, playlist.id, playlist)
+
+
+def on_playlist_deleted(user_id: int, playlist_id: int) -> None:
+    """Repository hook, after commit: queue the removal of a deleted playlist."""
+    _submit(user_id, playlist_id, None)
+
+
+def _submit(user_id: int, playlist_id: int, row: Optional["PlaylistRow"]) -> None:
+    if not playlist_index_enabled():
+        return
+    # The worker runs each change in the writer's context (memory scope of the request).
+    with _pending_cond:
+        _pending[int(user_id)] += 1
+    _ensure_worker()
+    _jobs.put((contextvars.copy_context(), int(user_id), int(playlist_id), row))
+
+
+def _ensure_worker() -> None:
+    global _worker
+    if _worker is not None:
+        return
+    with _start_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="playlist-index", daemon=True)
+            _worker.start()
+
+
+def _run() -> None:
+    while True:
+        batch = [_jobs.get()]
+        while True:
+            try:
+                batch.append(_jobs.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _apply(batch)
+        finally:
+            with _pending_cond:
+                for _, user_id, _, _ in batch:
+                    _pending[user_id] -= 1
+                    if _pending[user_id] <= 0:
+                        del _pending[user_id]
+                _pending_cond.notify_all()
+
+
+def _apply(batch: list[tuple[contextvars.Context, int, int, Optional["PlaylistRow"]]]) -> None:
+    from vectorstores.stores import memory_store_key
+
+    # Per memory store: the last change of each playlist wins (one upsert + one delete call).
+    groups: dict[str, tuple[contextvars.Context, dict[int, tuple[int, Optional["PlaylistRow"]]]]] = {}
+    for ctx, user_id, playlist_id, row in batch:
+        key = ctx.run(memory_store_key)
+        groups.setdefault(key, (ctx, {}))[1][playlist_id] = (user_id, row)
+
+    for key, (ctx, changes) in groups.items():
+        upserts = [row for _, row in changes.values() if row is not None]
+        deletes = [playlist_id for playlist_id, (_, row) in changes.items() if row is None]
+        try:
+            ctx.run(index_playlists, upserts)
+            ctx.run(forget_playlists, deletes)
+            _stats["upserts"] += len(upserts)
+            _stats["deletes"] += len(deletes)
+            _stats["batches"] += 1
+        except Exception as e:
+            _stats["errors"] += 1
+            # The index is behind the DB: reconcile those users before their next search.
+            with _synced_lock:
+                _synced.difference_update({(key, user_id) for user_id, _ in changes.values()})
+            print(f"⚠️ No se pudo actualizar el índice de playlists ({len(changes)} cambios): {e}")
+
+
+def wait_for_index(user_id: Optional[int] = None, timeout: float = 5.0) -> bool:
+    """Wait until the queued changes of `user_id` (None: of everyone) are applied."""
+    def done() -> bool:
+        return not _pending if user_id is None else _pending.get(int(user_id), 0) <= 0
+
+    with _pending_cond:
+        return _pending_cond.wait_for(done, timeout)
+
+
+def playlist_index_stats() -> dict[str, Any]:
+    with _pending_cond:
+        return {**_stats, "pending": sum(_pending.values())}
+
+
+# --- read path -------------------------------------------------------------
+
+
+def sync_user_playlists(user_id: int, playlists: list["PlaylistRow"], *, force: bool = False) -> None:
+    """Reconcile the user's index with `playlists` (their DB rows); once per process unless forced."""
+    from vectorstores.stores import memory_store_key
+
+    key = (memory_store_key(), int(user_id))
+    if not force and key in _synced:
+        return
+    collection = _store()._collection
+    indexed = collection.get(where={"user_id": int(user_id)}, include=["documents"])
+    current = dict(zip(indexed["ids"], indexed["documents"] or []))
+    wanted = {_doc_id(p.id): p for p in playlists}
+    stale = [doc_id for doc_id in current if doc_id not in wanted]
+    if stale:
+        collection.delete(ids=stale)
+    index_playlists([p for doc_id, p in wanted.items() if current.get(doc_id) != _text(p)])
+    with _synced_lock:
+        _synced.add(key)
+        _stats["reconciles"] += 1
+
+
+def top_playlists(user_id: int, playlists: list["PlaylistRow"], query: str, k: int) -> list["PlaylistRow"]:
+    """
+    The `k` playlists of `playlists` (all of the user's rows) most similar to `query`, best
+    first. Without a query: the `k` most recently updated.
+    """
+    if len(playlists) <= k:
+        return playlists
+    if not query.strip():
+        return sorted(playlists, key=lambda p: p.updated_at, reverse=True)[:k]
+    wait_for_index(user_id, _PENDING_WAIT_S)
+    sync_user_playlists(user_id, playlists)
+    by_id = {p.id: p for p in playlists}
+    hits = _store().similarity_search(query, k=k, filter={"user_id": int(user_id)})
+    ranked: list["PlaylistRow"] = []
+    for doc in hits:
+        p = by_id.get(doc.metadata.get("playlist_id"))
+        if p is not None and p not in ranked:
+            ranked.append(p)
+    return ranked
@@ -0,0 +1,151 @@
+"""
+Índice de recencia de la memoria: los N contextos más nuevos de un usuario, sin embeddings.
+
+Chroma has no ordered access path, so "latest contexts" used to be a semantic search for
+the dummy query "contexto previo" (one embedding call, arbitrary results). save_context
+also writes (doc_id, user_id, ts) to the `memory_recent` table, and the newest N are an
+indexed ORDER BY ts DESC LIMIT N followed by a Chroma get(ids=...): O(N) whatever the
+store size.
+
+The index is self-healing: ids no longer in Chroma (compaction, manual deletes) are
+pruned when read, and a user whose index holds fewer than N rows is backfilled once per
+process from a metadata-only scan (contexts saved before the index existed). If the DB
+is unavailable, reads fall back to that metadata-only scan. In-memory stores
+(vectorstores.stores.ephemeral_memory) are small and short-lived: they skip the table
+and always use the scan.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from vectorstores.retention import _doc_timestamp
+
+# (doc_id, document, metadata)
+RecentContext = tuple[str, str, dict[str, Any]]
+
+_table_lock = threading.Lock()
+_table_ready = False
+_backfilled: set[tuple[str, Optional[int]]] = set()
+
+
+@contextmanager
+def _session() -> Iterator[Any]:
+    global _table_ready
+    from db.models import MemoryRecent
+    from db.session import engine
+    from db.unit_of_work import request_session
+
+    # The CLI never runs init_db(): create just this table on first use.
+    if not _table_ready:
+        with _table_lock:
+            if not _table_ready:
+                MemoryRecent.__table__.create(bind=engine, checkfirst=True)
+                _table_ready = True
+    # Within /chat: the request's session (db.unit_of_work).
+    with request_session() as db:
+        yield db
+
+
+def record_recent(doc_id: str, user_id: Optional[int], ts: float) -> None:
+    record_recent_many([(doc_id, user_id, ts)])
+
+
+def record_recent_many(rows: Iterable[tuple[str, Optional[int], float]]) -> None:
+    from db.repositories.memory_recent import upsert_recent
+    from vectorstores.stores import get_memory_scope, memory_store_key
+
+    if get_memory_scope() is not None:
+        return
+    try:
+        with _session() as db:
+            upsert_recent(db, memory_store_key(), rows)
+    except SQLAlchemyError as e:
+        # Not fatal: the docs are in Chroma and the next read of the user backfills them.
+        print(f"⚠️ No se pudo actualizar el índice de recencia: {e}")
+
+
+def forget_recent(doc_ids: Iterable[str]) -> None:
+    from db.repositories.memory_recent import delete_recent
+    from vectorstores.stores import get_memory_scope, memory_store_key
+
+    doc_ids = list(doc_ids)
+    if not doc_ids or get_memory_scope() is not None:
+        return
+    try:
+        with _session() as db:
+            delete_recent(db, memory_store_key(), doc_ids)
+    except SQLAlchemyError as e:
+        print(f"⚠️ No se pudo actualizar el índice de recencia: {e}")
+
+
+def _user_rows(store: Any, user_id: Optional[int], where: Optional[dict[str, Any]] = None) -> list[tuple[str, dict]]:
+    """Metadata-only scan of a user's contexts (no documents, no embeddings)."""
+    if where is None and user_id is not None:
+        where = {"user_id": int(user_id)}
+    data = store.get(where=where, include=["metadatas"]) if where else store.get(include=["metadatas"])
+    rows = zip(data.get("ids") or [], data.get("metadatas") or [])
+    if user_id is None:
+        return [(i, m or {}) for i, m in rows if (m or {}).get("user_id") is None]
+    return [(i, m or {}) for i, m in rows]
+
+
+def _fetch(store: Any, ids: list[str]) -> dict[str, RecentContext]:
+    got = store.get(ids=ids, include=["documents", "metadatas"])
+    return {i: (i, d or "", m or {}) for i, d, m in zip(got["ids"], got["documents"], got["metadatas"])}
+
+
+def scan_recent_contexts(
+    store: Any, user_id: Optional[int], n: int, where: Optional[dict[str, Any]] = None
+) -> list[RecentContext]:
+    """Newest `n` contexts via a metadata scan (used with metadata filters and as fallback)."""
+    rows = sorted(_user_rows(store, user_id, where), key=lambda r: _doc_timestamp(r[1]), reverse=True)[: max(0, n)]
+    if not rows:
+        return []
+    by_id = _fetch(store, [doc_id for doc_id, _ in rows])
+    return [by_id[doc_id] for doc_id, _ in rows if doc_id in by_id]
+
+
+def recent_contexts(store: Any, user_id: Optional[int], n: int) -> list[RecentContext]:
+    """The user's `n` newest contexts in `store`, newest first, without embedding anything."""
+    from vectorstores.stores import get_memory_scope, memory_store_key
+
+    if n <= 0:
+        return []
+    if get_memory_scope() is not None:
+        return scan_recent_contexts(store, user_id, n)
+    key = memory_store_key()
+    try:
+        with _session() as db:
+            return _indexed_recent(db, store, key, user_id, n)
+    except SQLAlchemyError as e:
+        print(f"⚠️ Índice de recencia no disponible, usando escaneo de metadata: {e}")
+        return scan_recent_contexts(store, user_id, n)
+
+
+def _indexed_recent(db: Any, store: Any, key: str, user_id: Optional[int], n: int) -> list[RecentContext]:
+    from db.repositories.memory_recent import delete_recent, newest_recent, upsert_recent
+
+    ids = newest_recent(db, key, user_id, n)
+    if len(ids) < n and (key, user_id) not in _backfilled:
+        upsert_recent(db, key, [(i, user_id, _doc_timestamp(m)) for i, m in _user_rows(store, user_id)])
+        _backfilled.add((key, user_id))
+        ids = newest_recent(db, key, user_id, n)
+
+    out: list[RecentContext] = []
+    while ids:
+        by_id = _fetch(store, ids)
+        out += [by_id[i] for i in ids if i in by_id]
+        missing = [i for i in ids if i not in by_id]
+        if not missing or len(out) >= n:
+            if missing:
+                delete_recent(db, key, missing)
+            break
+        # Stale rows: prune them and read the next page.
+        delete_recent(db, key, missing)
+        ids = newest_recent(db, key, user_id, n - len(out), offset=len(out))
+    return out
@@ -0,0 +1,308 @@
+"""Retención, deduplicación y compactación del vector store de memoria."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every process compacts.
+    fcntl = None
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    Per-user limits for the memory store. A value <= 0 disables that rule.
+    """
+
+    max_docs_per_user: int = 500
+    max_age_days: float = 180.0
+    # Cosine similarity above which two contexts of the same user are merged.
+    dedup_threshold: float = 0.97
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        return cls(
+            max_docs_per_user=_env_int("MEMORY_MAX_DOCS_PER_USER", cls.max_docs_per_user),
+            max_age_days=_env_float("MEMORY_MAX_AGE_DAYS", cls.max_age_days),
+            dedup_threshold=_env_float("MEMORY_DEDUP_THRESHOLD", cls.dedup_threshold),
+        )
+
+
+@dataclass
+class CompactionReport:
+    users_scanned: int = 0
+    docs_scanned: int = 0
+    expired_removed: int = 0
+    duplicates_merged: int = 0
+    overflow_removed: int = 0
+    bytes_reclaimed: int = 0
+    duration_s: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def docs_removed(self) -> int:
+        return self.expired_removed + self.duplicates_merged + self.overflow_removed
+
+    def as_dict(self) -> dict[str, Any]:
+        out = asdict(self)
+        out["docs_removed"] = self.docs_removed
+        return out
+
+
+def memory_doc_id(content: str, user_id: Optional[int]) -> str:
+    """
+    Deterministic id for a memory document (user + whitespace/case-normalized content).
+
+    Used as the Chroma id so re-saving the same context is an idempotent upsert.
+    """
+    normalized = " ".join((content or "").split()).lower()
+    owner = str(int(user_id)) if user_id is not None else "-"
+    digest = hashlib.sha256(f"{owner}\x00{normalized}".encode("utf-8")).hexdigest()
+    return f"ctx_{digest[:32]}"
+
+
+def _doc_timestamp(metadata: dict[str, Any]) -> float:
+    ts = metadata.get("ts")
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    # Legacy documents only carry the ISO timestamp.
+    try:
+        return datetime.fromisoformat(str(metadata.get("timestamp"))).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _doc_bytes(document: Optional[str], metadata: Optional[dict[str, Any]], embedding: Any) -> int:
+    size = len((document or "").encode("utf-8"))
+    size += len(json.dumps(metadata or {}, ensure_ascii=False).encode("utf-8"))
+    if embedding is not None:
+        size += 4 * len(embedding)  # float32 per dimension
+    return size
+
+
+def _compact_group(
+    store: Any,
+    ids: list[str],
+    policy: RetentionPolicy,
+    now: float,
+    report: CompactionReport,
+    dry_run: bool,
+) -> None:
+    got = store.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+    embeddings = got.get("embeddings")
+    if embeddings is None:
+        embeddings = [None] * len(got["ids"])
+    rows = list(zip(got["ids"], got["documents"], got["metadatas"], embeddings))
+    # Newest first: the survivor of a duplicate cluster is always the latest save.
+    rows.sort(key=lambda r: _doc_timestamp(r[2] or {}), reverse=True)
+    report.docs_scanned += len(rows)
+
+    to_delete: list[str] = []
+    merged_into: dict[str, int] = {}
+
+    cutoff = now - policy.max_age_days * 86400 if policy.max_age_days > 0 else None
+    kept: list[tuple[str, dict[str, Any]]] = []
+    # Unit vectors of kept rows, preallocated once (rows with no embedding are never compared).
+    kept_vecs: Optional[np.ndarray] = None
+    kept_vec_ids: list[str] = []
+
+    for doc_id, document, metadata, embedding in rows:
+        metadata = metadata or {}
+        if cutoff is not None and _doc_timestamp(metadata) < cutoff:
+            to_delete.append(doc_id)
+            report.expired_removed += 1
+            report.bytes_reclaimed += _doc_bytes(document, metadata, embedding)
+            continue
+
+        if policy.dedup_threshold > 0 and embedding is not None and len(embedding):
+            vec = np.asarray(embedding, dtype=np.float32)
+            norm = float(np.linalg.norm(vec))
+            if norm > 0:
+                vec = vec / norm
+            if kept_vecs is None:
+                kept_vecs = np.empty((len(rows), vec.shape[0]), dtype=np.float32)
+            n = len(kept_vec_ids)
+            if n:
+                sims = kept_vecs[:n] @ vec
+                best = int(np.argmax(sims))
+                if float(sims[best]) >= policy.dedup_threshold:
+                    survivor_id = kept_vec_ids[best]
+                    merged_into[survivor_id] = (
+                        merged_into.get(survivor_id, 0) + 1 + int(metadata.get("merged_count", 0) or 0)
+                    )
+                    to_delete.append(doc_id)
+                    report.duplicates_merged += 1
+                    report.bytes_reclaimed += _doc_bytes(document, metadata, embedding)
+                    continue
+            kept_vecs[n] = vec
+            kept_vec_ids.append(doc_id)
+
+        kept.append((doc_id, metadata))
+
+    if policy.max_docs_per_user > 0 and len(kept) > policy.max_docs_per_user:
+        overflow = {doc_id for doc_id, _ in kept[policy.max_docs_per_user:]}
+        by_id = {r[0]: r for r in rows}
+        for doc_id in overflow:
+            _, document, metadata, embedding = by_id[doc_id]
+            report.bytes_reclaimed += _doc_bytes(document, metadata, embedding)
+            merged_into.pop(doc_id, None)
+        to_delete.extend(overflow)
+        report.overflow_removed += len(overflow)
+        kept = kept[: policy.max_docs_per_user]
+
+    if dry_run:
+        return
+
+    for i in range(0, len(to_delete), 500):
+        store.delete(ids=to_delete[i : i + 500])
+    if to_delete:
+        from vectorstores.recency import forget_recent
+
+        forget_recent(to_delete)
+
+    if merged_into:
+        # Metadata-only update: keeps the stored embedding (no re-embedding).
+        kept_meta = dict(kept)
+        upd_ids = list(merged_into)
+        upd_metas = []
+        for doc_id in upd_ids:
+            meta = dict(kept_meta[doc_id])
+            meta["merged_count"] = int(meta.get("merged_count", 0) or 0) + merged_into[doc_id]
+            upd_metas.append(meta)
+        store._collection.update(ids=upd_ids, metadatas=upd_metas)
+
+
+def compact_memory(
+    vectorstore: Any = None,
+    policy: Optional[RetentionPolicy] = None,
+    *,
+    now: Optional[float] = None,
+    dry_run: bool = False,
+) -> CompactionReport:
+    """
+    Apply the retention policy to every memory collection (or just `vectorstore`), per user:
+
+    - drop contexts older than `max_age_days`
+    - merge near-duplicates (cosine >= `dedup_threshold`), keeping the newest one
+    - keep at most `max_docs_per_user` contexts (newest first)
+    """
+    from vectorstores.stores import iter_memory_vectorstores
+
+    stores = [vectorstore] if vectorstore is not None else list(iter_memory_vectorstores())
+    policy = policy or RetentionPolicy.from_env()
+    now = time.time() if now is None else now
+    report = CompactionReport(dry_run=dry_run)
+    started = time.perf_counter()
+
+    for store in stores:
+        # First pass is metadata-only; embeddings are loaded one user at a time.
+        data = store.get(include=["metadatas"])
+        groups: dict[Any, list[str]] = {}
+        for doc_id, metadata in zip(data.get("ids") or [], data.get("metadatas") or []):
+            groups.setdefault((metadata or {}).get("user_id"), []).append(doc_id)
+
+        for ids in groups.values():
+            report.users_scanned += 1
+            _compact_group(store, ids, policy, now, report, dry_run)
+
+    report.duration_s = round(time.perf_counter() - started, 3)
+    return report
+
+
+# Background compaction job (started by the API on startup).
+_worker: Optional[threading.Thread] = None
+_stop = threading.Event()
+_last_report: Optional[CompactionReport] = None
+
+
+def get_last_compaction_report() -> Optional[CompactionReport]:
+    return _last_report
+
+
+def _try_compaction_lock() -> Optional[Any]:
+    """
+    Non-blocking exclusive file lock so only one API worker compacts per interval.
+    Returns the open lock file (release by closing it) or None if another process holds it.
+    """
+    if fcntl is None:
+        return open(os.devnull, "w")
+    from vectorstores.stores import _memory_dir
+
+    path = os.getenv("MEMORY_COMPACTION_LOCK", os.path.join(_memory_dir(), ".compaction.lock"))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path, "w")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _compaction_loop(interval_s: float) -> None:
+    global _last_report
+    while not _stop.wait(interval_s):
+        lock = _try_compaction_lock()
+        if lock is None:
+            continue
+        try:
+            _last_report = compact_memory()
+            r = _last_report
+            print(
+                f"🧹 Memoria compactada: {r.docs_removed} docs eliminados "
+                f"({r.expired_removed} expirados, {r.duplicates_merged} duplicados, {r.overflow_removed} excedentes), "
+                f"{r.bytes_reclaimed} bytes liberados en {r.duration_s}s"
+            )
+        except Exception as e:
+            print(f"⚠️ Error compactando memoria: {str(e)}")
+        finally:
+            lock.close()
+
+
+def start_compaction_worker(interval_s: Optional[float] = None) -> bool:
+    """
+    Start the periodic compaction thread (MEMORY_COMPACTION_INTERVAL_S, 0 disables).
+    Returns False when disabled or already running.
+    """
+    global _worker
+    if interval_s is None:
+        interval_s = _env_float("MEMORY_COMPACTION_INTERVAL_S", 3600.0)
+    if interval_s <= 0 or (_worker is not None and _worker.is_alive()):
+        return False
+    _stop.clear()
+    _worker = threading.Thread(target=_compaction_loop, args=(interval_s,), name="memory-compaction", daemon=True)
+    _worker.start()
+    return True
+
+
+def stop_compaction_worker(timeout: float = 5.0) -> None:
+    global _worker
+    _stop.set()
+    if _worker is not None:
+        _worker.join(timeout=timeout)
+    _worker = None
@@ -1,16 +1,118 @@
 """Inicialización y gestión de vector stores con ChromaDB."""
 
 import os
+import contextvars
 import json
-from typing import Optional
+import re
+import threading
+import unicodedata
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, Optional, Union
+import chromadb
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
 
 from config.embeddings import EMBEDDING_MODEL
 
+if TYPE_CHECKING:
+    from vectorstores.numpy_store import NumpyVectorStore
+
 # Instancias globales de vector stores (se inicializan al arrancar)
 memory_vectorstore: Optional[Chroma] = None
-knowledge_vectorstore: Optional[Chroma] = None
+knowledge_vectorstore: Optional[Union[Chroma, "NumpyVectorStore"]] = None
+
+# Memory partitions (MEMORY_PARTITIONING=user|bucket) share one client per persist directory.
+_memory_client: Optional["chromadb.ClientAPI"] = None
+_memory_partitions: dict[str, Chroma] = {}
+_memory_lock = threading.Lock()
+# Initializers can race between the startup warmup thread and early requests.
+_memory_init_lock = threading.Lock()
+_knowledge_lock = threading.RLock()
+
+# langchain_chroma's default collection name: keeps pre-partitioning stores readable.
+SHARED_MEMORY_COLLECTION = "langchain"
+MEMORY_PARTITION_PREFIX = "memory_"
+# Knowledge collection name when running against a Chroma server (shared with memory).
+KNOWLEDGE_SERVER_COLLECTION = "knowledge"
+
+
+class EphemeralMemoryScope:
+    """
+    In-memory memory store for isolated runs (benchmark cases): its own Chroma database
+    inside the process-wide ephemeral system, so nothing touches CHROMA_MEMORY_DIR and
+    scopes never see each other's contexts. close() drops the database.
+    """
+
+    def __init__(self, name: Optional[str] = None) -> None:
+        self.name = name or uuid.uuid4().hex[:12]
+        # Unique even if two scopes reuse a name (e.g. the same case run twice).
+        self.database = f"scope_{self.name}_{uuid.uuid4().hex[:8]}"
+        self._client: Optional["chromadb.ClientAPI"] = None
+        self._stores: dict[str, Chroma] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> str:
+        return f"ephemeral:{self.database}"
+
+    def client(self) -> "chromadb.ClientAPI":
+        with self._lock:
+            if self._client is None:
+                from chromadb.config import Settings
+
+                chromadb.AdminClient(Settings(is_persistent=False)).create_database(self.database)
+                self._client = chromadb.EphemeralClient(database=self.database)
+            return self._client
+
+    def store(self, collection_name: str) -> Chroma:
+        client = self.client()
+        with self._lock:
+            store = self._stores.get(collection_name)
+            if store is None:
+                store = Chroma(client=client, collection_name=collection_name, embedding_function=EMBEDDING_MODEL)
+                self._stores[collection_name] = store
+            return store
+
+    def close(self) -> None:
+        with self._lock:
+            self._stores.clear()
+            if self._client is None:
+                return
+            self._client = None
+        from chromadb.config import Settings
+
+        chromadb.AdminClient(Settings(is_persistent=False)).delete_database(self.database)
+
+
+_memory_scope: contextvars.ContextVar[Optional[EphemeralMemoryScope]] = contextvars.ContextVar(
+    "memory_scope", default=None
+)
+
+
+def set_memory_scope(scope: Optional[EphemeralMemoryScope]) -> contextvars.Token:
+    return _memory_scope.set(scope)
+
+
+def reset_memory_scope(token: contextvars.Token) -> None:
+    _memory_scope.reset(token)
+
+
+def get_memory_scope() -> Optional[EphemeralMemoryScope]:
+    return _memory_scope.get()
+
+
+@contextmanager
+def ephemeral_memory(name: Optional[str] = None) -> Iterator[EphemeralMemoryScope]:
+    """Route every memory store access in this context to a fresh in-memory store."""
+    scope = EphemeralMemoryScope(name)
+    token = set_memory_scope(scope)
+    try:
+        yield scope
+    finally:
+        reset_memory_scope(token)
+        scope.close()
 
 
 def _ensure_dir(path: str) -> None:
@@ -23,11 +125,15 @@ def reset_vectorstores(*, reset_memory: bool = True, reset_knowledge: bool = Fal
 
     Useful for benchmarks/tests that want to switch persistence directories on the fly.
     """
-    global memory_vectorstore, knowledge_vectorstore
+    global memory_vectorstore, knowledge_vectorstore, _memory_client, _knowledge_generation
     if reset_memory:
         memory_vectorstore = None
+        with _memory_lock:
+            _memory_partitions.clear()
+            _memory_client = None
     if reset_knowledge:
         knowledge_vectorstore = None
+        _knowledge_generation += 1
 
 
 def _memory_dir() -> str:
@@ -38,92 +144,338 @@ def _knowledge_dir() -> str:
     return os.getenv("CHROMA_KNOWLEDGE_DIR", "./chroma_knowledge")
 
 
+def _knowledge_backend() -> str:
+    # chroma: persisted Chroma collection | numpy: in-process exact search (memory-mapped matrix)
+    return os.getenv("KNOWLEDGE_BACKEND", "chroma").strip().lower()
+
+
+def _numpy_knowledge_dir() -> str:
+    return os.getenv("NUMPY_KNOWLEDGE_DIR", "./numpy_knowledge")
+
+
+def _chroma_server() -> Optional[tuple[str, int]]:
+    # Multi-worker deployments: a Chroma server (`chroma run --path ... --port 8001`) instead
+    # of each process opening the same persist directory, which is not multi-process safe.
+    host = os.getenv("CHROMA_SERVER_HOST", "").strip()
+    if not host:
+        return None
+    return host, int(os.getenv("CHROMA_SERVER_PORT", "8000"))
+
+
+def _chroma_server_client() -> "chromadb.ClientAPI":
+    host, port = _chroma_server()
+    return chromadb.HttpClient(host=host, port=port)
+
+
+def memory_store_key() -> str:
+    """Identity of the memory location (persist dir or server) for side indexes kept outside Chroma."""
+    scope = get_memory_scope()
+    if scope is not None:
+        return scope.key
+    server = _chroma_server()
+    if server is not None:
+        return f"chroma://{server[0]}:{server[1]}"
+    return os.path.abspath(_memory_dir())
+
+
+def _memory_partitioning() -> str:
+    # shared: one collection filtered by user_id | user: one collection per user | bucket: hash buckets
+    return os.getenv("MEMORY_PARTITIONING", "shared").strip().lower()
+
+
+def _memory_partition_buckets() -> int:
+    return max(1, int(os.getenv("MEMORY_PARTITION_BUCKETS", "64")))
+
+
+def memory_collection_name(
+    user_id: Optional[int], *, strategy: Optional[str] = None, buckets: Optional[int] = None
+) -> str:
+    """
+    Name of the memory collection that holds `user_id`'s contexts under the given
+    partitioning strategy (defaults to MEMORY_PARTITIONING / MEMORY_PARTITION_BUCKETS).
+    Contexts without a user always live in the shared collection.
+    """
+    strategy = (strategy or _memory_partitioning()).strip().lower()
+    if user_id is None or strategy == "shared":
+        return SHARED_MEMORY_COLLECTION
+    if strategy == "user":
+        return f"{MEMORY_PARTITION_PREFIX}u_{int(user_id)}"
+    if strategy == "bucket":
+        n = buckets or _memory_partition_buckets()
+        bucket = zlib.crc32(str(int(user_id)).encode("ascii")) % n
+        return f"{MEMORY_PARTITION_PREFIX}b_{bucket}"
+    raise ValueError(f"MEMORY_PARTITIONING inválido: {strategy!r} (shared|user|bucket)")
+
+
+def _get_memory_client() -> "chromadb.ClientAPI":
+    global _memory_client
+    scope = get_memory_scope()
+    if scope is not None:
+        return scope.client()
+    with _memory_lock:
+        if _memory_client is None:
+            if _chroma_server() is not None:
+                _memory_client = _chroma_server_client()
+            else:
+                persist_directory = _memory_dir()
+                _ensure_dir(persist_directory)
+                _memory_client = chromadb.PersistentClient(path=persist_directory)
+        return _memory_client
+
+
 def initialize_memory_vectorstore() -> Chroma:
     """
     Inicializa el vector store de memoria con ChromaDB.
     Si ya existe, lo carga. Si no, lo crea.
     """
     global memory_vectorstore
+
+    scope = get_memory_scope()
+    if scope is not None:
+        return scope.store(SHARED_MEMORY_COLLECTION)
     
     if memory_vectorstore is not None:
         return memory_vectorstore
     
-    persist_directory = _memory_dir()
-    _ensure_dir(persist_directory)
-    
-    # Intentar cargar vector store existente
-    if os.path.exists(persist_directory) and os.listdir(persist_directory):
-        memory_vectorstore = Chroma(
-            persist_directory=persist_directory,
-            embedding_function=EMBEDDING_MODEL
+    with _memory_init_lock:
+        if memory_vectorstore is not None:
+            return memory_vectorstore
+
+        persist_directory = _memory_dir()
+        existed = _chroma_server() is not None or (
+            os.path.exists(persist_directory) and bool(os.listdir(persist_directory))
         )
-        print("✅ Vector store de memoria cargado")
-    else:
-        # Crear nuevo vector store vacío
+        
         memory_vectorstore = Chroma(
-            persist_directory=persist_directory,
+            client=_get_memory_client(),
+            collection_name=SHARED_MEMORY_COLLECTION,
             embedding_function=EMBEDDING_MODEL
         )
-        print("✅ Vector store de memoria creado (vacío)")
+        if existed:
+            print("✅ Vector store de memoria cargado")
+        else:
+            print("✅ Vector store de memoria creado (vacío)")
     
     return memory_vectorstore
 
 
-def initialize_knowledge_vectorstore() -> Chroma:
+def _memory_store_for_collection(name: str) -> Chroma:
+    scope = get_memory_scope()
+    if scope is not None:
+        return scope.store(name)
+    if name == SHARED_MEMORY_COLLECTION:
+        return initialize_memory_vectorstore()
+    store = _memory_partitions.get(name)
+    if store is None:
+        client = _get_memory_client()
+        with _memory_lock:
+            store = _memory_partitions.get(name)
+            if store is None:
+                store = Chroma(client=client, collection_name=name, embedding_function=EMBEDDING_MODEL)
+                _memory_partitions[name] = store
+    return store
+
+
+def get_memory_vectorstore(user_id: Optional[int] = None) -> Chroma:
     """
-    Inicializa el vector store de conocimiento musical con ChromaDB.
-    Carga datos de knowledge_base.json.
+    Memory vector store holding `user_id`'s contexts (partition chosen by MEMORY_PARTITIONING).
+    """
+    return _memory_store_for_collection(memory_collection_name(user_id))
+
+
+def list_memory_collections() -> list[str]:
+    """All memory collections on disk (shared + partitions), whatever the current strategy."""
+    names = [getattr(c, "name", c) for c in _get_memory_client().list_collections()]
+    return sorted(n for n in names if n == SHARED_MEMORY_COLLECTION or n.startswith(MEMORY_PARTITION_PREFIX))
+
+
+def iter_memory_vectorstores() -> Iterator[Chroma]:
+    for name in list_memory_collections():
+        yield _memory_store_for_collection(name)
+
+
+# Campos de knowledge_base.json indexados también como un booleano por valor
+# (p.ej. actividad__estudio=True) para poder prefiltrar con `where`.
+KNOWLEDGE_FILTER_FIELDS = ("genero", "actividad", "mood", "condiciones_ambientales", "tiempo_dia")
+# Bump when the indexed metadata layout changes: persisted stores with an older schema are rebuilt.
+KNOWLEDGE_SCHEMA_VERSION = 2
+
+# Incremented every time the knowledge store is (re)built or reset, so derived
+# indexes (BM25, caches) know when to rebuild.
+_knowledge_generation = 0
+
+
+def knowledge_index_generation() -> int:
+    return _knowledge_generation
+
+
+def knowledge_token(value: str) -> str:
+    """Normalized token for a metadata value: lowercase, no accents, `_` separators."""
+    folded = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "_", folded).strip("_")
+
+
+def knowledge_field_key(field: str, value: str) -> str:
+    return f"{field}__{knowledge_token(value)}"
+
+
+def _knowledge_metadata(item: dict) -> dict:
+    metadata = item.get('metadata', {})
+    
+    # Convertir listas en metadata a strings separados por comas (ChromaDB no acepta listas)
+    metadata_clean = {}
+    for key, value in metadata.items():
+        if isinstance(value, list):
+            metadata_clean[key] = ', '.join(str(v) for v in value)
+        else:
+            metadata_clean[key] = value
+
+        # Campos filtrables: un booleano por valor ("lo-fi, ambient" -> genero__lo_fi, genero__ambient)
+        if key in KNOWLEDGE_FILTER_FIELDS:
+            values = value if isinstance(value, list) else str(value).split(',')
+            for v in values:
+                if knowledge_token(v):
+                    metadata_clean[knowledge_field_key(key, v)] = True
+    metadata_clean['id'] = item.get('id', '')
+    metadata_clean['kb_schema'] = KNOWLEDGE_SCHEMA_VERSION
+    return metadata_clean
+
+
+def _knowledge_schema_outdated(store: Chroma) -> bool:
+    got = store.get(limit=1, include=["metadatas"])
+    metadatas = got.get("metadatas") or []
+    if not metadatas:
+        return True
+    return (metadatas[0] or {}).get("kb_schema") != KNOWLEDGE_SCHEMA_VERSION
+
+
+def _load_knowledge_items() -> tuple[list[str], list[Document]]:
+    with open('data/knowledge_base.json', 'r', encoding='utf-8') as f:
+        knowledge_items = json.load(f)
+    
+    documents = []
+    ids = []
+    for item in knowledge_items:
+        text = item.get('text', '')
+        documents.append(Document(page_content=text, metadata=_knowledge_metadata(item)))
+        ids.append(item.get('id') or f"kb_{len(ids):03d}")
+    return ids, documents
+
+
+def _index_knowledge(store: Chroma, *, reset: bool = False) -> None:
+    global _knowledge_generation
+    try:
+        if reset:
+            existing = store.get(include=[]).get("ids") or []
+            if existing:
+                store.delete(ids=existing)
+
+        ids, documents = _load_knowledge_items()
+        
+        if documents:
+            store.add_documents(documents, ids=ids)
+            # Chroma persiste automáticamente, no necesita .persist()
+            print(f"✅ Cargados {len(documents)} items de conocimiento al vector store")
+    except FileNotFoundError:
+        print("⚠️ No se encontró data/knowledge_base.json")
+    except Exception as e:
+        print(f"⚠️ Error cargando conocimiento: {str(e)}")
+    _knowledge_generation += 1
+
+
+def _numpy_knowledge_vectorstore(*, rebuild: bool = False) -> "NumpyVectorStore":
+    global _knowledge_generation
+    from vectorstores.numpy_store import NumpyVectorStore
+
+    try:
+        ids, documents = _load_knowledge_items()
+    except FileNotFoundError:
+        print("⚠️ No se encontró data/knowledge_base.json")
+        ids, documents = [], []
+    texts = [d.page_content for d in documents]
+    metadatas = [d.metadata for d in documents]
+    if rebuild:
+        store = NumpyVectorStore.build(_numpy_knowledge_dir(), ids, texts, metadatas, EMBEDDING_MODEL)
+        rebuilt = True
+    else:
+        store, rebuilt = NumpyVectorStore.load_or_build(_numpy_knowledge_dir(), ids, texts, metadatas, EMBEDDING_MODEL)
+    if rebuilt:
+        print(f"✅ Cargados {len(store)} items de conocimiento al índice NumPy")
+    else:
+        print("✅ Índice NumPy de conocimiento cargado")
+    _knowledge_generation += 1
+    return store
+
+
+def initialize_knowledge_vectorstore() -> Union[Chroma, "NumpyVectorStore"]:
+    """
+    Inicializa el vector store de conocimiento musical (KNOWLEDGE_BACKEND=chroma|numpy).
+    Carga datos de knowledge_base.json (y re-indexa si el esquema persistido es anterior).
     """
     global knowledge_vectorstore
     
     if knowledge_vectorstore is not None:
         return knowledge_vectorstore
+
+    with _knowledge_lock:
+        if knowledge_vectorstore is not None:
+            return knowledge_vectorstore
+
+        # Published only once fully indexed, so concurrent callers never see a partial store.
+        knowledge_vectorstore = _build_knowledge_vectorstore()
+    
+    return knowledge_vectorstore
+
+
+def _build_knowledge_vectorstore() -> Union[Chroma, "NumpyVectorStore"]:
+    if _knowledge_backend() == "numpy":
+        return _numpy_knowledge_vectorstore()
+
+    if _chroma_server() is not None:
+        store = Chroma(
+            client=_chroma_server_client(),
+            collection_name=KNOWLEDGE_SERVER_COLLECTION,
+            embedding_function=EMBEDDING_MODEL
+        )
+        if _knowledge_schema_outdated(store):
+            # Done once by scripts/prewarm.py before the workers fork (see gunicorn.conf.py).
+            _index_knowledge(store, reset=True)
+        else:
+            print("✅ Vector store de conocimiento cargado (servidor Chroma)")
+        return store
     
     persist_directory = _knowledge_dir()
     _ensure_dir(persist_directory)
     
     # Intentar cargar vector store existente
     if os.path.exists(persist_directory) and os.listdir(persist_directory):
-        knowledge_vectorstore = Chroma(
+        store = Chroma(
             persist_directory=persist_directory,
             embedding_function=EMBEDDING_MODEL
         )
-        print("✅ Vector store de conocimiento cargado")
+        if _knowledge_schema_outdated(store):
+            print("🔄 Re-indexando conocimiento (esquema de metadata anterior)")
+            _index_knowledge(store, reset=True)
+        else:
+            print("✅ Vector store de conocimiento cargado")
     else:
         # Crear nuevo vector store y cargar knowledge_base.json
-        knowledge_vectorstore = Chroma(
+        store = Chroma(
             persist_directory=persist_directory,
             embedding_function=EMBEDDING_MODEL
         )
-        
-        try:
-            with open('data/knowledge_base.json', 'r', encoding='utf-8') as f:
-                knowledge_items = json.load(f)
-            
-            documents = []
-            for item in knowledge_items:
-                text = item.get('text', '')
-                metadata = item.get('metadata', {})
-                
-                # Convertir listas en metadata a strings separados por comas (ChromaDB no acepta listas)
-                metadata_clean = {}
-                for key, value in metadata.items():
-                    if isinstance(value, list):
-                        metadata_clean[key] = ', '.join(str(v) for v in value)
-                    else:
-                        metadata_clean[key] = value
-                metadata_clean['id'] = item.get('id', '')
-                
-                documents.append(Document(page_content=text, metadata=metadata_clean))
-            
-            if documents:
-                knowledge_vectorstore.add_documents(documents)
-                # Chroma persiste automáticamente, no necesita .persist()
-                print(f"✅ Cargados {len(documents)} items de conocimiento al vector store")
-        except FileNotFoundError:
-            print("⚠️ No se encontró data/knowledge_base.json")
-        except Exception as e:
-            print(f"⚠️ Error cargando conocimiento: {str(e)}")
+        _index_knowledge(store)
     
-    return knowledge_vectorstore
+    return store
+
 
+def reindex_knowledge_vectorstore() -> Union[Chroma, "NumpyVectorStore"]:
+    """Rebuild the knowledge store from data/knowledge_base.json (after editing the file)."""
+    global knowledge_vectorstore
+    with _knowledge_lock:
+        if _knowledge_backend() == "numpy":
+            knowledge_vectorstore = _numpy_knowledge_vectorstore(rebuild=True)
+            return knowledge_vectorstore
+        store = initialize_knowledge_vectorstore()
+        _index_knowledge(store, reset=True)
+        return store